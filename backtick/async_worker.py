@@ -0,0 +1,274 @@
+"""An rq worker that runs coroutine tasks concurrently in an event loop."""
+
+import asyncio
+import concurrent.futures
+import inspect
+import sys
+import threading
+import time
+import traceback
+from typing import Any
+
+from rq import SimpleWorker
+from rq.job import Job
+from rq.queue import Queue
+from rq.registry import StartedJobRegistry
+from rq.timeouts import JobTimeoutException, TimerDeathPenalty
+from rq.utils import utcnow
+from rq.worker import WorkerStatus
+
+from backtick import limits, metrics, notifications, payloads, settings, tracing
+
+
+class AsyncWorker(
+    limits.LimitsMixin,
+    tracing.JobTracingMixin,
+    metrics.JobMetricsMixin,
+    payloads.PayloadMixin,
+    SimpleWorker,
+):
+    """Run the jobs of `async def` tasks concurrently in an event loop.
+
+    The event loop runs in a thread of the worker process. The worker keeps
+    dequeuing jobs while at most `max_jobs` coroutine jobs are in flight, and every
+    job is cancelled once it exceeds the timeout of its task. The jobs of sync tasks
+    are run in the worker process like `SimpleWorker` does.
+
+    Only the sync jobs are the current job of the worker. The coroutine jobs are
+    tracked on their own, and the event loop keeps their heartbeats going every
+    `job_monitoring_interval` seconds so that they stay in the started job registry
+    while they run.
+    """
+
+    def __init__(
+        self,
+        *args: Any,
+        max_jobs: int = settings.BACKTICK_ASYNC_WORKER_MAX_JOBS,
+        **kwargs: Any,
+    ) -> None:
+        kwargs.setdefault("job_class", notifications.NotifyingJob)
+        super().__init__(*args, **kwargs)
+        self.max_jobs = max_jobs
+        self._slots = threading.BoundedSemaphore(max_jobs)
+        self._futures: set[concurrent.futures.Future[None]] = set()
+        # The coroutine jobs in flight by id, only used in the event loop.
+        self._jobs: dict[str, Job] = {}
+        self._worker_thread_id = threading.get_ident()
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(
+            target=self._loop.run_forever, name="backtick-async-worker", daemon=True
+        )
+
+    def work(self, *args: Any, **kwargs: Any) -> bool:
+        self._worker_thread_id = threading.get_ident()
+        self._loop_thread.start()
+        heartbeats = asyncio.run_coroutine_threadsafe(
+            self._maintain_job_heartbeats(), self._loop
+        )
+        try:
+            return super().work(*args, **kwargs)
+        finally:
+            heartbeats.cancel()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop_thread.join()
+            # Let the cancelled heartbeats finish before closing the loop.
+            self._loop.run_until_complete(self._finish_tasks())
+            self._loop.close()
+
+    @staticmethod
+    async def _finish_tasks() -> None:
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def teardown(self) -> None:
+        # Let the jobs in flight finish before the worker is unregistered.
+        if self._futures:
+            self.log.info("Waiting for %d jobs to finish", len(self._futures))
+            concurrent.futures.wait(list(self._futures))
+        super().teardown()
+
+    def execute_job(self, job: Job, queue: Queue) -> None:
+        """Start a job on the event loop, or run it right away if it's sync.
+
+        Blocks while `max_jobs` coroutine jobs are already in flight.
+
+        Args:
+            job (Job): The job.
+            queue (Queue): The queue the job was dequeued from.
+        """
+
+        if not inspect.iscoroutinefunction(job.func):
+            super().execute_job(job, queue)
+            return
+
+        while not self._slots.acquire(timeout=self.dequeue_timeout / 2):
+            self.heartbeat()
+
+        self.set_state(WorkerStatus.BUSY)
+        metrics.observe_wait(job)
+        future = asyncio.run_coroutine_threadsafe(
+            self._run_job_async(job, queue), self._loop
+        )
+        self._futures.add(future)
+        future.add_done_callback(self._job_done)
+
+    def _job_done(self, future: concurrent.futures.Future[None]) -> None:
+        self._futures.discard(future)
+        self._slots.release()
+
+    def set_current_job_id(self, job_id: str | None, pipeline: Any = None) -> None:
+        # rq clears the current job once a job is handled, which the coroutine jobs
+        # do in other threads while a sync job may be running.
+        if threading.get_ident() == self._worker_thread_id:
+            super().set_current_job_id(job_id, pipeline=pipeline)
+
+    def prepare_async_job(self, job: Job, remove_from_intermediate_queue: bool) -> None:
+        """Mark a coroutine job as started.
+
+        This mirrors `Worker.prepare_job_execution` without making the job the
+        current job of the worker.
+
+        Args:
+            job (Job): The job.
+            remove_from_intermediate_queue (bool): Whether to remove the job from
+            the intermediate queue of its queue.
+        """
+
+        with self.connection.pipeline() as pipeline:
+            self.heartbeat(pipeline=pipeline)
+            job.heartbeat(
+                utcnow(), self.job_monitoring_interval + 60, pipeline=pipeline
+            )
+            job.prepare_for_execution(self.name, pipeline=pipeline)
+            if remove_from_intermediate_queue:
+                queue = self.queue_class(job.origin, connection=self.connection)
+                pipeline.lrem(queue.intermediate_queue_key, 1, job.id)
+            pipeline.execute()
+
+    def heartbeat_jobs(self, jobs: list[Job]) -> None:
+        """Extend the heartbeats of the coroutine jobs in flight.
+
+        Jobs that were deleted in the meantime, e.g. once they finished with a
+        `result_ttl` of 0, aren't created again.
+
+        Args:
+            jobs (list[Job]): The jobs.
+        """
+
+        with self.connection.pipeline() as pipeline:
+            for job in jobs:
+                job.heartbeat(
+                    utcnow(), self.job_monitoring_interval + 60, pipeline, xx=True
+                )
+            results = pipeline.execute()
+
+        # Every heartbeat is an HSET then a ZADD.
+        for job, created in zip(jobs, results[::2], strict=True):
+            if created == 1:
+                self.connection.delete(job.key)
+
+    async def _maintain_job_heartbeats(self) -> None:
+        while True:
+            await asyncio.sleep(self.job_monitoring_interval)
+            if self._jobs:
+                await asyncio.to_thread(self.heartbeat_jobs, list(self._jobs.values()))
+
+    async def _run_job_async(self, job: Job, queue: Queue) -> None:
+        self._jobs[job.id] = job
+        try:
+            # The span of the job is current in its asyncio task only.
+            with tracing.job_span(job):
+                await self.perform_job_async(job, queue)
+        finally:
+            del self._jobs[job.id]
+            if (job_limits := limits.job_limits(job, queue)).concurrency_caps:
+                await asyncio.to_thread(
+                    limits.release, self.connection, job, job_limits
+                )
+
+    async def perform_job_async(self, job: Job, queue: Queue) -> None:
+        """Perform a coroutine job.
+
+        This mirrors `Worker.perform_job`, with the bookkeeping run in threads so
+        that it doesn't block the other jobs.
+
+        Args:
+            job (Job): The job.
+            queue (Queue): The queue the job was dequeued from.
+        """
+
+        started_job_registry = queue.started_job_registry
+        timeout = job.timeout or self.queue_class.DEFAULT_TIMEOUT
+        started_at = time.monotonic()
+
+        try:
+            await asyncio.to_thread(self.prepare_async_job, job, len(self.queues) == 1)
+            await asyncio.to_thread(job.connection.persist, job.key)
+            if isinstance(job, payloads.PayloadJob):
+                await asyncio.to_thread(job.load_payload)
+
+            job.started_at = utcnow()
+            try:
+                rv = await asyncio.wait_for(
+                    job.func(*job.args, **job.kwargs),
+                    None if timeout == -1 else timeout,
+                )
+            except asyncio.TimeoutError as e:
+                raise JobTimeoutException(
+                    f"Task exceeded maximum timeout value ({timeout} seconds)"
+                ) from e
+            job.ended_at = utcnow()
+            job._result = rv
+        except Exception:
+            job.ended_at = utcnow()
+            await asyncio.to_thread(
+                self._handle_async_failure,
+                job,
+                queue,
+                started_job_registry,
+                sys.exc_info(),
+            )
+        else:
+            await asyncio.to_thread(
+                self._handle_async_success, job, queue, started_job_registry
+            )
+        metrics.observe_job(job, time.monotonic() - started_at)
+
+    def _handle_async_success(
+        self, job: Job, queue: Queue, started_job_registry: StartedJobRegistry
+    ) -> None:
+        try:
+            job.heartbeat(utcnow(), job.success_callback_timeout)
+            job.execute_success_callback(TimerDeathPenalty, job._result)
+        except Exception:
+            self._handle_async_failure(job, queue, started_job_registry, sys.exc_info())
+            return
+
+        self.handle_job_success(
+            job=job, queue=queue, started_job_registry=started_job_registry
+        )
+        self.log.info("%s: Job OK (%s)", job.origin, job.id)
+
+    def _handle_async_failure(
+        self,
+        job: Job,
+        queue: Queue,
+        started_job_registry: StartedJobRegistry,
+        exc_info: Any,
+    ) -> None:
+        exc_string = "".join(traceback.format_exception(*exc_info))
+
+        try:
+            job.heartbeat(utcnow(), job.failure_callback_timeout)
+            job.execute_failure_callback(TimerDeathPenalty, *exc_info)
+        except Exception:
+            exc_info = sys.exc_info()
+            exc_string = "".join(traceback.format_exception(*exc_info))
+
+        self.handle_job_failure(
+            job=job,
+            exc_string=exc_string,
+            queue=queue,
+            started_job_registry=started_job_registry,
+        )
+        self.handle_exception(job, *exc_info)
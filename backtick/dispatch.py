@@ -1,10 +1,388 @@
+import asyncio
+import base64
+import calendar
+import datetime
+import json
 import logging
-from typing import cast
+import time
+import uuid
+import zlib
+from collections.abc import Iterable, Iterator
+from typing import Any, cast
 
+import pydantic
+import redis
+import redis.asyncio
 import rq
 import rq.exceptions
+from rq.job import JobStatus
+from rq.registry import (
+    CanceledJobRegistry,
+    DeferredJobRegistry,
+    FailedJobRegistry,
+    FinishedJobRegistry,
+    ScheduledJobRegistry,
+    StartedJobRegistry,
+)
+from rq.results import Result
+from rq.utils import as_text, current_timestamp, decode_redis_hash, utcnow
 
-from backtick import dto, settings, utils
+from backtick import (
+    dto,
+    metrics,
+    notifications,
+    payloads,
+    scheduler,
+    settings,
+    task_registry,
+    tracing,
+    utils,
+)
+
+# The job hash fields read for GET /tasks. rq only writes `result` and `exc_info` to
+# the hash on Redis versions without streams and keeps them in a results stream else.
+_STATUS_FIELDS = (
+    "status",
+    "enqueued_at",
+    "started_at",
+    "ended_at",
+    "result",
+    "exc_info",
+)
+
+# The status reported for task ids without a job.
+TASK_NOT_FOUND = "not_found"
+
+# Task statuses read by `get_task_statuses_async`, keyed by task id, with the
+# monotonic time they expire at.
+_status_cache: dict[str, tuple[float, dto.TaskStatusDTO]] = {}
+
+# The position of an item in a batch, its task and its validated request.
+_BatchEntry = tuple[int, task_registry.TaskSpec, dto.ScheduleRequestDTO]
+
+# The registry a job sits in for each status, as removed by `rq.cancel_job`.
+_STATUS_REGISTRY_KEYS = {
+    JobStatus.FINISHED.value: FinishedJobRegistry.key_template,
+    JobStatus.DEFERRED.value: DeferredJobRegistry.key_template,
+    JobStatus.STARTED.value: StartedJobRegistry.key_template,
+    JobStatus.SCHEDULED.value: ScheduledJobRegistry.key_template,
+    JobStatus.FAILED.value: FailedJobRegistry.key_template,
+    JobStatus.STOPPED.value: FailedJobRegistry.key_template,
+    JobStatus.CANCELED.value: CanceledJobRegistry.key_template,
+}
+
+
+IDEMPOTENCY_KEY_PREFIX = "backtick:idempotency:"
+
+# Stores the task ids of a request under its idempotency key unless the key is already
+# taken, in which case the task ids of the first request are returned.
+# KEYS: the idempotency key.
+# ARGV: the comma separated task ids and the key TTL in seconds.
+_CLAIM_IDEMPOTENCY_KEY_SCRIPT = """
+local task_ids = redis.call("GET", KEYS[1])
+if task_ids then
+    return task_ids
+end
+redis.call("SET", KEYS[1], ARGV[1], "EX", ARGV[2])
+return false
+"""
+
+
+def _create_job(
+    queue: rq.Queue,
+    spec: task_registry.TaskSpec,
+    kwargs: dict[str, Any],
+    dt: datetime.datetime | None,
+    job_id: str | None = None,
+    payload: payloads.Payload | None = None,
+) -> rq.job.Job:
+    """Build a job for a task in memory without writing it to Redis.
+
+    Args:
+        queue (rq.Queue): The queue the job belongs to.
+        spec (task_registry.TaskSpec): The spec of the task.
+        kwargs (dict[str, Any]): The keyword arguments passed to the task.
+        dt (datetime.datetime | None): The UTC datetime to schedule the job at or
+        None to enqueue it right away.
+        job_id (str | None): The job id, or None to generate one.
+        payload (payloads.Payload | None): The offloaded kwargs, which the job then
+        refers to instead of carrying `kwargs`.
+
+    Returns:
+        rq.job.Job: The job.
+    """
+    options = spec.enqueue_options
+    job = queue.create_job(
+        spec.func,
+        kwargs={} if payload else kwargs,
+        status=JobStatus.SCHEDULED if dt else JobStatus.QUEUED,
+        timeout=options["timeout"],
+        result_ttl=options["result_ttl"],
+        ttl=options["ttl"],
+        failure_ttl=options["failure_ttl"],
+        description=options["description"],
+        depends_on=options["depends_on"],
+        meta=tracing.inject(options["meta"], scheduled_at=dt),
+        retry=options["retry"],
+        on_success=options["on_success"],
+        on_failure=options["on_failure"],
+        job_id=job_id,
+    )
+    if dt and options["at_front"]:
+        job.enqueue_at_front = True
+    if payload:
+        cast(payloads.PayloadJob, job).payload_ref = payload.digest
+    return job
+
+
+def _prepare_payload(
+    queue: rq.Queue, kwargs: dict[str, Any]
+) -> payloads.Payload | None:
+    """Offload the kwargs of a request if they're large and the jobs can refer to them.
+
+    Args:
+        queue (rq.Queue): The queue the jobs belong to.
+        kwargs (dict[str, Any]): The keyword arguments passed to the task.
+
+    Returns:
+        payloads.Payload | None: The payload, or None to keep the kwargs in the jobs.
+    """
+    if not issubclass(queue.job_class, payloads.PayloadJob):
+        return None
+    return payloads.prepare(kwargs)
+
+
+def _buffer_job(
+    pipeline: redis.client.Pipeline | redis.asyncio.client.Pipeline,
+    queue: rq.Queue,
+    job: rq.job.Job,
+    dt: datetime.datetime | None,
+    at_front: bool = False,
+) -> None:
+    """Buffer the commands that put a job on its queue or scheduled registry.
+
+    This writes the same keys as `rq.Queue.enqueue` and `rq.Queue.enqueue_at` but
+    never talks to Redis on its own, so many jobs can share a pipeline round trip.
+    Scheduled jobs go to the sharded scheduler instead when
+    `settings.BACKTICK_SCHEDULER_SHARDS` is set.
+
+    Args:
+        pipeline (redis.client.Pipeline | redis.asyncio.client.Pipeline): The
+        pipeline to buffer the commands on.
+        queue (rq.Queue): The queue the job belongs to.
+        job (rq.job.Job): The job built by `_create_job`.
+        dt (datetime.datetime | None): The UTC datetime to schedule the job at or
+        None to enqueue it right away.
+        at_front (bool): Whether to push an immediate job to the front of the queue.
+
+    Returns:
+        None
+    """
+    pipeline.sadd(queue.redis_queues_keys, queue.key)
+
+    if dt:
+        pipeline.hset(job.key, mapping=job.to_dict())
+        if settings.BACKTICK_SCHEDULER_SHARDS:
+            scheduler.buffer_scheduled_job(pipeline, queue.name, job.id, dt.timestamp())
+        else:
+            pipeline.zadd(
+                ScheduledJobRegistry.key_template.format(queue.name),
+                {job.id: calendar.timegm(dt.utctimetuple())},
+            )
+        return
+
+    job.enqueued_at = utcnow()
+    pipeline.hset(job.key, mapping=job.to_dict())
+    job.cleanup(ttl=job.ttl, pipeline=pipeline)
+    queue.push_job_id(job.id, pipeline=pipeline, at_front=at_front)
+
+
+def schedule_jobs_bulk(
+    *,
+    queue: rq.Queue,
+    spec: task_registry.TaskSpec,
+    datetimes: list[datetime.datetime],
+    kwargs: dict[str, Any],
+    job_ids: list[str] | None = None,
+) -> list[str]:
+    """Schedule one job per datetime with pipelined Redis writes.
+
+    Jobs are built in memory and flushed in chunks of
+    `settings.BACKTICK_PIPELINE_CHUNK_SIZE`, so scheduling N datetimes costs
+    roughly N / chunk size round trips instead of a few per datetime. Large kwargs
+    are stored once and shared by the jobs, see `backtick.payloads`.
+
+    Args:
+        queue (rq.Queue): The queue to schedule the jobs on.
+        spec (task_registry.TaskSpec): The spec of the task.
+        datetimes (list[datetime.datetime]): The UTC datetimes to schedule at.
+        kwargs (dict[str, Any]): The keyword arguments passed to the task.
+        job_ids (list[str] | None): The ids of the jobs, one per datetime, or None
+        to generate them.
+
+    Returns:
+        list[str]: The ids of the scheduled jobs, in the order of `datetimes`.
+    """
+
+    chunk_size = settings.BACKTICK_PIPELINE_CHUNK_SIZE
+    ids: list[str | None] = list(job_ids) if job_ids else [None] * len(datetimes)
+    scheduled_ids = []
+    payload = _prepare_payload(queue, kwargs)
+
+    for start in range(0, len(datetimes), chunk_size):
+        with queue.connection.pipeline() as pipeline:
+            chunk = datetimes[start : start + chunk_size]
+            # Every job refers to the payload before the first ones can run and
+            # release it, so the payload outlives the later chunks.
+            if payload and not start:
+                payloads.buffer_store(pipeline, payload, len(datetimes))
+
+            for dt, job_id in zip(chunk, ids[start : start + chunk_size], strict=True):
+                job = _create_job(queue, spec, kwargs, dt, job_id, payload)
+                _buffer_job(pipeline, queue, job, dt)
+                logging.info("Task %s scheduled at %s", job.id, dt)
+                scheduled_ids.append(job.id)
+
+            pipeline.execute()
+
+    return scheduled_ids
+
+
+def _enqueue_job(
+    *,
+    queue: rq.Queue,
+    spec: task_registry.TaskSpec,
+    kwargs: dict[str, Any],
+    job_id: str | None = None,
+) -> str:
+    """Enqueue a job to run right away.
+
+    Large kwargs are offloaded like the ones of scheduled jobs, see
+    `backtick.payloads`. Jobs with dependencies go through rq's WATCH based enqueue,
+    which defers them until their dependencies have finished, others are written
+    with a single pipeline round trip.
+
+    Args:
+        queue (rq.Queue): The queue to enqueue the job on.
+        spec (task_registry.TaskSpec): The spec of the task.
+        kwargs (dict[str, Any]): The keyword arguments passed to the task.
+        job_id (str | None): The job id, or None to generate one.
+
+    Returns:
+        str: The id of the job.
+    """
+
+    at_front = bool(spec.enqueue_options["at_front"])
+    payload = _prepare_payload(queue, kwargs)
+    job = _create_job(queue, spec, kwargs, None, job_id, payload)
+
+    depends_on = spec.enqueue_options["depends_on"]
+
+    if payload or not depends_on:
+        with queue.connection.pipeline() as pipeline:
+            if payload:
+                payloads.buffer_store(pipeline, payload, 1)
+            if not depends_on:
+                _buffer_job(pipeline, queue, job, None, at_front=at_front)
+            pipeline.execute()
+
+    if depends_on:
+        queue.enqueue_job(job, at_front=at_front)
+
+    logging.info("Task %s scheduled", job.id)
+    return job.id
+
+
+def _idempotency_key(schedule_request_dto: dto.ScheduleRequestDTO) -> str:
+    """Get the Redis key of the idempotency key of a request.
+
+    Keys are scoped per task, so different tasks can use the same keys.
+
+    Args:
+        schedule_request_dto (dto.ScheduleRequestDTO): The schedule request dto.
+
+    Returns:
+        str: The Redis key.
+    """
+    return (
+        f"{IDEMPOTENCY_KEY_PREFIX}{schedule_request_dto.task_name}:"
+        f"{schedule_request_dto.idempotency_key}"
+    )
+
+
+def _claim_idempotency_key(
+    connection: redis.Redis, schedule_request_dto: dto.ScheduleRequestDTO
+) -> tuple[list[str], bool]:
+    """Claim the idempotency key of a request for a new set of task ids.
+
+    The check and the claim are a single atomic script call, so concurrent retries
+    of a request can't both schedule their tasks.
+
+    Args:
+        connection (redis.Redis): The connection of the task queue.
+        schedule_request_dto (dto.ScheduleRequestDTO): The schedule request dto.
+
+    Returns:
+        tuple[list[str], bool]: The task ids to use and whether they belong to a
+        previous request with the same key, in which case nothing should be
+        scheduled.
+    """
+
+    job_ids = [str(uuid.uuid4()) for _ in _job_datetimes(schedule_request_dto)]
+    original_ids = connection.register_script(_CLAIM_IDEMPOTENCY_KEY_SCRIPT)(
+        keys=[_idempotency_key(schedule_request_dto)],
+        args=[",".join(job_ids), settings.BACKTICK_IDEMPOTENCY_TTL],
+    )
+    if original_ids:
+        return as_text(original_ids).split(","), True
+    return job_ids, False
+
+
+async def _claim_idempotency_key_async(
+    connection: redis.asyncio.Redis, schedule_request_dto: dto.ScheduleRequestDTO
+) -> tuple[list[str], bool]:
+    """Claim the idempotency key of a request without blocking the event loop.
+
+    This is the asyncio counterpart of `_claim_idempotency_key`.
+
+    Args:
+        connection (redis.asyncio.Redis): The connection of the task queue.
+        schedule_request_dto (dto.ScheduleRequestDTO): The schedule request dto.
+
+    Returns:
+        tuple[list[str], bool]: The task ids to use and whether they belong to a
+        previous request with the same key.
+    """
+
+    job_ids = [str(uuid.uuid4()) for _ in _job_datetimes(schedule_request_dto)]
+    original_ids = await connection.register_script(_CLAIM_IDEMPOTENCY_KEY_SCRIPT)(
+        keys=[_idempotency_key(schedule_request_dto)],
+        args=[",".join(job_ids), settings.BACKTICK_IDEMPOTENCY_TTL],
+    )
+    if original_ids:
+        return as_text(original_ids).split(","), True
+    return job_ids, False
+
+
+def _duplicate_response(
+    schedule_request_dto: dto.ScheduleRequestDTO, job_ids: list[str]
+) -> dto.ScheduleResponseDTO:
+    """Build the response to a request whose idempotency key was already used.
+
+    Args:
+        schedule_request_dto (dto.ScheduleRequestDTO): The schedule request dto.
+        job_ids (list[str]): The task ids of the first request.
+
+    Returns:
+        dto.ScheduleResponseDTO: The schedule response dto.
+    """
+
+    logging.info(
+        "Idempotency key %s already used by tasks %s",
+        schedule_request_dto.idempotency_key,
+        ", ".join(job_ids),
+    )
+    return dto.ScheduleResponseDTO(task_ids=job_ids, message="Tasks already scheduled")
 
 
 def submit_tasks(
@@ -12,6 +390,9 @@ def submit_tasks(
 ) -> dto.ScheduleResponseDTO:
     """Schedule tasks on a worker.
 
+    A request with an idempotency key that was already used returns the task ids of
+    the first request instead of scheduling the tasks again.
+
     Args:
         schedule_dto (dto.ScheduleRequestDTO): The schedule request dto.
 
@@ -24,75 +405,691 @@ def submit_tasks(
     datetimes = schedule_request_dto.datetimes
     kwargs = schedule_request_dto.kwargs
 
-    task = cast(rq.job.Job, utils.discover_task(settings.BACKTICK_TASKS[task_name]))
-
-    queue_name = task.queue
-    connection = task.connection
-    timeout = task.timeout
-    result_ttl = task.result_ttl
-    ttl = task.ttl
-    queue_class = task.queue_class
-    depends_on = task.depends_on
-    at_front = task.at_front
-    meta = task.meta
-    description = task.description
-    failure_ttl = task.failure_ttl
-    retry = task.retry
-    on_failure = task.on_failure
-    on_success = task.on_success
-
-    queue = queue_class(name=queue_name, connection=connection)
-    if datetimes:
-        job_ids = []
+    with metrics.phase("schedule", "discovery"):
+        spec = task_registry.get_registry().get(task_name)
+        queue = spec.get_queue()
 
-        for dt in datetimes:
-            job = queue.enqueue_at(
-                dt,
-                task,
-                kwargs=kwargs,
-                timeout=timeout,
-                result_ttl=result_ttl,
-                ttl=ttl,
-                depends_on=depends_on,
-                at_front=at_front,
-                meta=meta,
-                description=description,
-                failure_ttl=failure_ttl,
-                retry=retry,
-                on_failure=on_failure,
-                on_success=on_success,
+    with metrics.phase("schedule", "redis"):
+        job_ids = None
+        if schedule_request_dto.idempotency_key:
+            job_ids, duplicate = _claim_idempotency_key(
+                queue.connection, schedule_request_dto
             )
-            logging.info("Task %s scheduled at %s", job.id, dt)
-            job_ids.append(job.id)
-    else:
-        job = queue.enqueue(
-            task,
-            kwargs=kwargs,
-            timeout=timeout,
-            result_ttl=result_ttl,
-            ttl=ttl,
-            depends_on=depends_on,
-            at_front=at_front,
-            meta=meta,
-            description=description,
-            failure_ttl=failure_ttl,
-            retry=retry,
-            on_failure=on_failure,
-            on_success=on_success,
-        )
-        logging.info("Task %s scheduled", job.id)
-        job_ids = [job.id]
+            if duplicate:
+                return _duplicate_response(schedule_request_dto, job_ids)
+
+        try:
+            if datetimes:
+                job_ids = schedule_jobs_bulk(
+                    queue=queue,
+                    spec=spec,
+                    datetimes=datetimes,
+                    kwargs=kwargs,
+                    job_ids=job_ids,
+                )
+            else:
+                job_ids = [
+                    _enqueue_job(
+                        queue=queue,
+                        spec=spec,
+                        kwargs=kwargs,
+                        job_id=job_ids[0] if job_ids else None,
+                    )
+                ]
+        except redis.RedisError:
+            # Let a retry of the request schedule the tasks.
+            if schedule_request_dto.idempotency_key:
+                queue.connection.delete(_idempotency_key(schedule_request_dto))
+            raise
+
+    metrics.ENQUEUED_TASKS.labels(spec.name, queue.name).inc(len(job_ids))
+    return dto.ScheduleResponseDTO(
+        task_ids=job_ids, message="Tasks scheduled successfully"
+    )
+
+
+async def submit_tasks_async(
+    *, schedule_request_dto: dto.ScheduleRequestDTO
+) -> dto.ScheduleResponseDTO:
+    """Schedule tasks on a worker without blocking the event loop.
+
+    This is the asyncio counterpart of `submit_tasks` and writes the same jobs.
+
+    Args:
+        schedule_request_dto (dto.ScheduleRequestDTO): The schedule request dto.
 
+    Returns:
+        dto.ScheduleResponseDTO: The schedule response dto.
+    """
+
+    with metrics.phase("schedule", "discovery"):
+        spec = task_registry.get_registry().get(schedule_request_dto.task_name)
+
+        # Immediate jobs with dependencies need rq's WATCH based enqueue.
+        if spec.enqueue_options["depends_on"] and not schedule_request_dto.datetimes:
+            return await asyncio.to_thread(
+                submit_tasks, schedule_request_dto=schedule_request_dto
+            )
+
+        queue = spec.get_queue()
+    connection = utils.get_async_redis(queue.connection)
+    at_front = bool(spec.enqueue_options["at_front"])
+    chunk_size = settings.BACKTICK_PIPELINE_CHUNK_SIZE
+    datetimes = _job_datetimes(schedule_request_dto)
+    ids: list[str | None] = [None] * len(datetimes)
+    job_ids = []
+    payload = _prepare_payload(queue, schedule_request_dto.kwargs)
+
+    with metrics.phase("schedule", "redis"):
+        if schedule_request_dto.idempotency_key:
+            claimed_ids, duplicate = await _claim_idempotency_key_async(
+                connection, schedule_request_dto
+            )
+            if duplicate:
+                return _duplicate_response(schedule_request_dto, claimed_ids)
+            ids = list(claimed_ids)
+
+        try:
+            for start in range(0, len(datetimes), chunk_size):
+                async with connection.pipeline() as pipeline:
+                    chunk = datetimes[start : start + chunk_size]
+                    # Every job refers to the payload before the first ones can
+                    # run and release it, so the payload outlives the later chunks.
+                    if payload and not start:
+                        payloads.buffer_store(pipeline, payload, len(datetimes))
+
+                    for dt, job_id in zip(
+                        chunk, ids[start : start + chunk_size], strict=True
+                    ):
+                        job = _create_job(
+                            queue,
+                            spec,
+                            schedule_request_dto.kwargs,
+                            dt,
+                            job_id,
+                            payload,
+                        )
+                        _buffer_job(pipeline, queue, job, dt, at_front=at_front)
+                        logging.info("Task %s scheduled at %s", job.id, dt or "now")
+                        job_ids.append(job.id)
+
+                    await pipeline.execute()
+        except redis.RedisError:
+            # Let a retry of the request schedule the tasks.
+            if schedule_request_dto.idempotency_key:
+                await connection.delete(_idempotency_key(schedule_request_dto))
+            raise
+
+    metrics.ENQUEUED_TASKS.labels(spec.name, queue.name).inc(len(job_ids))
     return dto.ScheduleResponseDTO(
         task_ids=job_ids, message="Tasks scheduled successfully"
     )
 
 
+def _job_datetimes(
+    item: dto.ScheduleRequestDTO,
+) -> list[datetime.datetime | None]:
+    """Return the datetimes of a request, where None stands for an immediate job.
+
+    Args:
+        item (dto.ScheduleRequestDTO): The schedule request dto.
+
+    Returns:
+        list[datetime.datetime | None]: One entry per job to create.
+    """
+    return list(item.datetimes) if item.datetimes else [None]
+
+
+def _format_validation_error(exc: pydantic.ValidationError) -> str:
+    """Flatten a pydantic validation error into a single line.
+
+    Args:
+        exc (pydantic.ValidationError): The validation error.
+
+    Returns:
+        str: The error messages joined by semicolons.
+    """
+    messages = []
+    for error in exc.errors():
+        loc = ".".join(str(part) for part in error["loc"] if part != "__root__")
+        messages.append(f"{loc}: {error['msg']}" if loc else error["msg"])
+    return "; ".join(messages)
+
+
+def _group_batch(
+    batch_schedule_request_dto: dto.BatchScheduleRequestDTO,
+    results: list[dto.BatchScheduleItemDTO],
+) -> list[tuple[rq.Queue, list[_BatchEntry]]]:
+    """Validate the batch items and group the valid ones per queue and serializer.
+
+    Args:
+        batch_schedule_request_dto (dto.BatchScheduleRequestDTO): The batch schedule
+        request dto.
+        results (list[dto.BatchScheduleItemDTO]): The per-item results, where the
+        validation errors are recorded.
+
+    Returns:
+        list[tuple[rq.Queue, list[_BatchEntry]]]: The queue and the entries of each
+        group.
+    """
+
+    groups: dict[tuple[int, str, str | None], tuple[rq.Queue, list[_BatchEntry]]] = {}
+
+    for index, raw_item in enumerate(batch_schedule_request_dto.requests):
+        try:
+            item = dto.ScheduleRequestDTO.parse_obj(raw_item)
+        except pydantic.ValidationError as exc:
+            results[index] = dto.BatchScheduleItemDTO(
+                error=_format_validation_error(exc)
+            )
+            continue
+
+        spec = task_registry.get_registry().get(item.task_name)
+        queue = spec.get_queue()
+        key = (id(queue.connection), queue.name, spec.serializer)
+        if key not in groups:
+            groups[key] = (queue, [])
+        groups[key][1].append((index, spec, item))
+
+    return list(groups.values())
+
+
+def _chunk_batch_group(
+    entries: list[_BatchEntry],
+) -> tuple[list[_BatchEntry], list[list[_BatchEntry]]]:
+    """Pack the entries of a group into pipeline sized chunks.
+
+    Entries are packed into chunks of about `settings.BACKTICK_PIPELINE_CHUNK_SIZE`
+    jobs without splitting an item across chunks, so a Redis error only fails the
+    items of the pipeline it happened in.
+
+    Args:
+        entries (list[_BatchEntry]): The entries of the group.
+
+    Returns:
+        tuple[list[_BatchEntry], list[list[_BatchEntry]]]: The entries that are
+        submitted one by one and the chunks of the remaining entries.
+    """
+
+    chunk_size = settings.BACKTICK_PIPELINE_CHUNK_SIZE
+    fallback: list[_BatchEntry] = []
+    chunks: list[list[_BatchEntry]] = []
+    chunk_jobs = 0
+
+    for entry in entries:
+        _, spec, item = entry
+
+        # Immediate jobs with dependencies need rq's WATCH based enqueue.
+        if spec.enqueue_options["depends_on"] and not item.datetimes:
+            fallback.append(entry)
+            continue
+
+        # Idempotency keys are claimed per request.
+        if item.idempotency_key:
+            fallback.append(entry)
+            continue
+
+        if not chunks or chunk_jobs >= chunk_size:
+            chunks.append([])
+            chunk_jobs = 0
+        chunks[-1].append(entry)
+        chunk_jobs += len(_job_datetimes(item))
+
+    return fallback, chunks
+
+
+def _buffer_batch_chunk(
+    pipeline: redis.client.Pipeline | redis.asyncio.client.Pipeline,
+    queue: rq.Queue,
+    chunk: list[_BatchEntry],
+) -> dict[int, list[str]]:
+    """Buffer the jobs of a chunk of batch entries on a pipeline.
+
+    Args:
+        pipeline (redis.client.Pipeline | redis.asyncio.client.Pipeline): The
+        pipeline to buffer the commands on.
+        queue (rq.Queue): The queue shared by the entries.
+        chunk (list[_BatchEntry]): The entries.
+
+    Returns:
+        dict[int, list[str]]: The job ids of each entry, keyed by batch index.
+    """
+
+    job_ids: dict[int, list[str]] = {}
+
+    for index, spec, item in chunk:
+        at_front = bool(spec.enqueue_options["at_front"])
+        job_ids[index] = []
+        datetimes = _job_datetimes(item)
+        if payload := _prepare_payload(queue, item.kwargs):
+            payloads.buffer_store(pipeline, payload, len(datetimes))
+
+        for dt in datetimes:
+            job = _create_job(queue, spec, item.kwargs, dt, payload=payload)
+            _buffer_job(pipeline, queue, job, dt, at_front=at_front)
+            job_ids[index].append(job.id)
+
+    return job_ids
+
+
+def _record_batch_chunk(
+    results: list[dto.BatchScheduleItemDTO],
+    queue: rq.Queue,
+    chunk: list[_BatchEntry],
+    job_ids: dict[int, list[str]],
+    exc: redis.RedisError | None = None,
+) -> None:
+    """Record the outcome of a chunk of batch entries.
+
+    Args:
+        results (list[dto.BatchScheduleItemDTO]): The per-item results.
+        queue (rq.Queue): The queue shared by the entries.
+        chunk (list[_BatchEntry]): The entries.
+        job_ids (dict[int, list[str]]): The job ids of each entry of the chunk.
+        exc (redis.RedisError | None): The error raised by the pipeline, if any.
+
+    Returns:
+        None
+    """
+
+    for index, spec, _ in chunk:
+        ids = job_ids[index]
+        if exc:
+            results[index] = dto.BatchScheduleItemDTO(error=str(exc))
+        else:
+            logging.info("Tasks %s scheduled", ", ".join(ids))
+            metrics.ENQUEUED_TASKS.labels(spec.name, queue.name).inc(len(ids))
+            results[index] = dto.BatchScheduleItemDTO(task_ids=ids)
+
+
+def _record_batch_fallback(
+    results: list[dto.BatchScheduleItemDTO],
+    index: int,
+    response: dto.ScheduleResponseDTO | None = None,
+    exc: Exception | None = None,
+) -> None:
+    """Record the outcome of a batch entry submitted on its own.
+
+    Args:
+        results (list[dto.BatchScheduleItemDTO]): The per-item results.
+        index (int): The batch index of the entry.
+        response (dto.ScheduleResponseDTO | None): The response of `submit_tasks`.
+        exc (Exception | None): The error raised by `submit_tasks`, if any.
+
+    Returns:
+        None
+    """
+
+    if exc:
+        logging.error("Failed to schedule batch item %s", index, exc_info=exc)
+        results[index] = dto.BatchScheduleItemDTO(error=str(exc))
+    elif response:
+        results[index] = dto.BatchScheduleItemDTO(task_ids=response.task_ids)
+
+
+def _batch_response(
+    results: list[dto.BatchScheduleItemDTO],
+) -> dto.BatchScheduleResponseDTO:
+    """Build the batch schedule response dto.
+
+    Args:
+        results (list[dto.BatchScheduleItemDTO]): The per-item results.
+
+    Returns:
+        dto.BatchScheduleResponseDTO: The batch schedule response dto.
+    """
+
+    failed = sum(1 for result in results if result.error)
+    return dto.BatchScheduleResponseDTO(
+        results=results,
+        message=f"{len(results) - failed} of {len(results)} tasks scheduled",
+    )
+
+
+def submit_tasks_batch(
+    *, batch_schedule_request_dto: dto.BatchScheduleRequestDTO
+) -> dto.BatchScheduleResponseDTO:
+    """Schedule many, possibly different, tasks at once.
+
+    Every item is validated on its own. Valid items are grouped by connection and
+    queue and written with pipelined Redis calls, while invalid items and the items
+    that fail to be written are reported back without failing the rest of the batch.
+
+    Args:
+        batch_schedule_request_dto (dto.BatchScheduleRequestDTO): The batch schedule
+        request dto.
+
+    Returns:
+        dto.BatchScheduleResponseDTO: The batch schedule response dto with one
+        result per item, in the order of the request.
+    """
+
+    results = [dto.BatchScheduleItemDTO() for _ in batch_schedule_request_dto.requests]
+
+    for queue, entries in _group_batch(batch_schedule_request_dto, results):
+        fallback, chunks = _chunk_batch_group(entries)
+
+        for index, _, item in fallback:
+            try:
+                response = submit_tasks(schedule_request_dto=item)
+            except Exception as exc:
+                _record_batch_fallback(results, index, exc=exc)
+                continue
+            _record_batch_fallback(results, index, response)
+
+        for chunk in chunks:
+            with queue.connection.pipeline() as pipeline:
+                job_ids = _buffer_batch_chunk(pipeline, queue, chunk)
+                try:
+                    pipeline.execute()
+                except redis.RedisError as exc:
+                    logging.exception("Failed to schedule a batch of tasks")
+                    _record_batch_chunk(results, queue, chunk, job_ids, exc)
+                    continue
+            _record_batch_chunk(results, queue, chunk, job_ids)
+
+    return _batch_response(results)
+
+
+async def submit_tasks_batch_async(
+    *, batch_schedule_request_dto: dto.BatchScheduleRequestDTO
+) -> dto.BatchScheduleResponseDTO:
+    """Schedule many, possibly different, tasks at once without blocking the loop.
+
+    This is the asyncio counterpart of `submit_tasks_batch` and writes the same jobs.
+
+    Args:
+        batch_schedule_request_dto (dto.BatchScheduleRequestDTO): The batch schedule
+        request dto.
+
+    Returns:
+        dto.BatchScheduleResponseDTO: The batch schedule response dto with one
+        result per item, in the order of the request.
+    """
+
+    results = [dto.BatchScheduleItemDTO() for _ in batch_schedule_request_dto.requests]
+
+    for queue, entries in _group_batch(batch_schedule_request_dto, results):
+        fallback, chunks = _chunk_batch_group(entries)
+        connection = utils.get_async_redis(queue.connection)
+
+        for index, _, item in fallback:
+            try:
+                response = await asyncio.to_thread(
+                    submit_tasks, schedule_request_dto=item
+                )
+            except Exception as exc:
+                _record_batch_fallback(results, index, exc=exc)
+                continue
+            _record_batch_fallback(results, index, response)
+
+        for chunk in chunks:
+            async with connection.pipeline() as pipeline:
+                job_ids = _buffer_batch_chunk(pipeline, queue, chunk)
+                try:
+                    await pipeline.execute()
+                except redis.RedisError as exc:
+                    logging.exception("Failed to schedule a batch of tasks")
+                    _record_batch_chunk(results, queue, chunk, job_ids, exc)
+                    continue
+            _record_batch_chunk(results, queue, chunk, job_ids)
+
+    return _batch_response(results)
+
+
+def _cancel_job(
+    task_id: str, connection: redis.Redis, enqueue_dependents: bool
+) -> None:
+    """Cancel a job with rq, e.g. to enqueue its dependents.
+
+    The job publishes its cancellation like the jobs cancelled by backtick.
+
+    Args:
+        task_id (str): The task id.
+        connection (redis.Redis): The redis connection.
+        enqueue_dependents (bool): Whether to enqueue the dependents of the job.
+
+    Returns:
+        None
+    """
+
+    job = notifications.NotifyingJob.fetch(
+        task_id, connection=connection, serializer=utils.get_serializer()
+    )
+    job.cancel(enqueue_dependents=enqueue_dependents)
+
+
+def _buffer_cancel(
+    pipeline: redis.client.Pipeline | redis.asyncio.client.Pipeline,
+    job_id: str,
+    origin: str,
+    status: str,
+) -> None:
+    """Buffer the commands that cancel a job.
+
+    This writes the same keys as `rq.cancel_job` for a job without dependents to
+    enqueue, using the origin and status that were read beforehand.
+
+    Args:
+        pipeline (redis.client.Pipeline | redis.asyncio.client.Pipeline): The
+        pipeline to buffer the commands on.
+        job_id (str): The job id.
+        origin (str): The name of the queue the job belongs to.
+        status (str): The current status of the job.
+
+    Returns:
+        None
+    """
+
+    pipeline.hset(rq.job.Job.key_for(job_id), "status", JobStatus.CANCELED)
+    pipeline.lrem(rq.Queue.redis_queue_namespace_prefix + origin, 1, job_id)
+    if key_template := _STATUS_REGISTRY_KEYS.get(status):
+        pipeline.zrem(key_template.format(origin), job_id)
+    pipeline.zadd(
+        CanceledJobRegistry.key_template.format(origin),
+        {job_id: current_timestamp()},
+    )
+    notifications.publish(pipeline, job_id, origin, JobStatus.CANCELED)
+
+
+# Cancels jobs by id with the same writes as `_buffer_cancel`, atomically per chunk.
+# ARGV holds the canceled registry score, the enqueue dependents flag and the job ids.
+# Jobs with dependents to enqueue are left alone and reported back to be handed to rq.
+_CANCEL_JOBS_SCRIPT = (
+    """
+local registries = {"""
+    + ", ".join(
+        f'["{status}"] = "{key_template.format("")}"'
+        for status, key_template in _STATUS_REGISTRY_KEYS.items()
+    )
+    + f"""}}
+local results = {{}}
+for i = 3, #ARGV do
+    local job_id = ARGV[i]
+    local job_key = "{rq.job.Job.redis_job_namespace_prefix}" .. job_id
+    local origin, status = unpack(redis.call("HMGET", job_key, "origin", "status"))
+    if not origin then
+        results[#results + 1] = "{dto.CancelStatus.NOT_FOUND.value}"
+    elseif status == "{JobStatus.CANCELED.value}" then
+        results[#results + 1] = "{dto.CancelStatus.ALREADY_CANCELED.value}"
+    elseif ARGV[2] == "1" and redis.call("SCARD", job_key .. ":dependents") > 0 then
+        results[#results + 1] = "dependents"
+    else
+        redis.call("HSET", job_key, "status", "{JobStatus.CANCELED.value}")
+        redis.call("LREM", "{rq.Queue.redis_queue_namespace_prefix}" .. origin, 1, job_id)
+        if status and registries[status] then
+            redis.call("ZREM", registries[status] .. origin, job_id)
+        end
+        redis.call("ZADD", "{CanceledJobRegistry.key_template.format("")}" .. origin, ARGV[1], job_id)
+        redis.call("PUBLISH", "{notifications.CHANNEL_PREFIX}" .. origin, cjson.encode({{
+            task_id = job_id, queue = origin, status = "{JobStatus.CANCELED.value}"
+        }}))
+        results[#results + 1] = "{dto.CancelStatus.CANCELED.value}"
+    end
+end
+return results
+"""
+)
+
+
+def _cancel_chunks(
+    unschedule_request_dto: dto.UnscheduleRequestDTO,
+) -> list[list[str]]:
+    """Split the task ids of an unschedule request into script sized chunks.
+
+    Args:
+        unschedule_request_dto (dto.UnscheduleRequestDTO): The unschedule request dto.
+
+    Returns:
+        list[list[str]]: Chunks of at most `settings.BACKTICK_CANCEL_CHUNK_SIZE` ids.
+    """
+
+    task_ids = unschedule_request_dto.task_ids
+    chunk_size = settings.BACKTICK_CANCEL_CHUNK_SIZE
+    return [
+        task_ids[start : start + chunk_size]
+        for start in range(0, len(task_ids), chunk_size)
+    ]
+
+
+def _cancel_script_args(
+    unschedule_request_dto: dto.UnscheduleRequestDTO, chunk: list[str]
+) -> list[Any]:
+    """Build the ARGV of the cancel script for a chunk of task ids.
+
+    Args:
+        unschedule_request_dto (dto.UnscheduleRequestDTO): The unschedule request dto.
+        chunk (list[str]): The task ids.
+
+    Returns:
+        list[Any]: The script arguments.
+    """
+
+    enqueue_dependents = "1" if unschedule_request_dto.enqueue_dependents else "0"
+    return [current_timestamp(), enqueue_dependents, *chunk]
+
+
+def _bulk_unschedule_response(
+    results: list[dto.UnscheduleItemDTO],
+) -> dto.BulkUnscheduleResponseDTO:
+    """Build the bulk unschedule response dto.
+
+    Args:
+        results (list[dto.UnscheduleItemDTO]): The per-task results.
+
+    Returns:
+        dto.BulkUnscheduleResponseDTO: The bulk unschedule response dto.
+    """
+
+    canceled = sum(1 for r in results if r.status == dto.CancelStatus.CANCELED)
+    return dto.BulkUnscheduleResponseDTO(
+        results=results,
+        message=f"{canceled} of {len(results)} tasks unscheduled",
+    )
+
+
+def _canceled_ids(results: list[dto.UnscheduleItemDTO]) -> list[str]:
+    """Get the ids of the tasks that were cancelled, to release their payloads.
+
+    Args:
+        results (list[dto.UnscheduleItemDTO]): The per-task results.
+
+    Returns:
+        list[str]: The task ids.
+    """
+
+    return [r.task_id for r in results if r.status == dto.CancelStatus.CANCELED]
+
+
+def cancel_tasks_bulk(
+    *, unschedule_request_dto: dto.UnscheduleRequestDTO
+) -> dto.BulkUnscheduleResponseDTO:
+    """Cancel many tasks with a server side script.
+
+    The task ids are cancelled in chunks of `settings.BACKTICK_CANCEL_CHUNK_SIZE`,
+    each of them in a single atomic script call that doesn't load or deserialize
+    the jobs. Jobs whose dependents have to be enqueued are handed over to rq.
+
+    Args:
+        unschedule_request_dto (dto.UnscheduleRequestDTO): The unschedule request dto.
+
+    Returns:
+        dto.BulkUnscheduleResponseDTO: The bulk unschedule response dto with one
+        result per task id, in the order of the request.
+    """
+
+    connection = utils.get_redis()
+    script = connection.register_script(_CANCEL_JOBS_SCRIPT)
+    results = []
+
+    for chunk in _cancel_chunks(unschedule_request_dto):
+        statuses = script(args=_cancel_script_args(unschedule_request_dto, chunk))
+
+        for task_id, status in zip(chunk, statuses, strict=True):
+            if as_text(status) == "dependents":
+                _cancel_job(task_id, connection, enqueue_dependents=True)
+                status = dto.CancelStatus.CANCELED
+
+            logging.info("Task %s %s", task_id, as_text(status))
+            results.append(
+                dto.UnscheduleItemDTO(task_id=task_id, status=as_text(status))
+            )
+
+        payloads.release(connection, _canceled_ids(results[-len(chunk) :]))
+
+    return _bulk_unschedule_response(results)
+
+
+async def cancel_tasks_bulk_async(
+    *, unschedule_request_dto: dto.UnscheduleRequestDTO
+) -> dto.BulkUnscheduleResponseDTO:
+    """Cancel many tasks with a server side script without blocking the event loop.
+
+    This is the asyncio counterpart of `cancel_tasks_bulk`.
+
+    Args:
+        unschedule_request_dto (dto.UnscheduleRequestDTO): The unschedule request dto.
+
+    Returns:
+        dto.BulkUnscheduleResponseDTO: The bulk unschedule response dto with one
+        result per task id, in the order of the request.
+    """
+
+    script = utils.get_async_redis().register_script(_CANCEL_JOBS_SCRIPT)
+    results = []
+
+    for chunk in _cancel_chunks(unschedule_request_dto):
+        statuses = await script(args=_cancel_script_args(unschedule_request_dto, chunk))
+
+        for task_id, status in zip(chunk, statuses, strict=True):
+            if as_text(status) == "dependents":
+                await asyncio.to_thread(
+                    _cancel_job, task_id, utils.get_redis(), enqueue_dependents=True
+                )
+                status = dto.CancelStatus.CANCELED
+
+            logging.info("Task %s %s", task_id, as_text(status))
+            results.append(
+                dto.UnscheduleItemDTO(task_id=task_id, status=as_text(status))
+            )
+
+        await asyncio.to_thread(
+            payloads.release,
+            utils.get_redis(),
+            _canceled_ids(results[-len(chunk) :]),
+        )
+
+    return _bulk_unschedule_response(results)
+
+
 def cancel_tasks(
     *, unschedule_request_dto: dto.UnscheduleRequestDTO
 ) -> dto.UnscheduleResponseDTO:
     """Cancel a task.
 
+    Tasks that don't exist anymore or were already cancelled are skipped, so
+    they're left out of the response instead of failing the request.
+
     Args:
         unschedule_dto (dto.UnscheduleRequestDTO): The unschedule request dto.
 
@@ -103,19 +1100,446 @@ def cancel_tasks(
     # Cancel running jobs
     task_ids = unschedule_request_dto.task_ids
 
-    jobs = rq.job.Job.fetch_many(task_ids, connection=utils.get_redis())
-    task_ids = []
-
-    for job in jobs:
-        logging.info("Task %s", job.id)
-        rq.cancel_job(
-            job.id,
-            connection=job.connection,
-            serializer=job.serializer,
-            enqueue_dependents=unschedule_request_dto.enqueue_dependents,
+    with metrics.phase("unschedule", "redis"):
+        jobs = notifications.NotifyingJob.fetch_many(
+            task_ids, connection=utils.get_redis(), serializer=utils.get_serializer()
         )
-        task_ids.append(job.id)
+        task_ids = []
+
+        for job in jobs:
+            # Jobs that don't exist anymore or were already cancelled are skipped.
+            if job is None or job.get_status(refresh=False) == JobStatus.CANCELED:
+                continue
+
+            logging.info("Task %s", job.id)
+            job.cancel(enqueue_dependents=unschedule_request_dto.enqueue_dependents)
+            task_ids.append(job.id)
+
+        payloads.release(utils.get_redis(), task_ids)
+
+    return dto.UnscheduleResponseDTO(
+        task_ids=task_ids, message="Tasks unscheduled successfully"
+    )
+
+
+async def cancel_tasks_async(
+    *, unschedule_request_dto: dto.UnscheduleRequestDTO
+) -> dto.UnscheduleResponseDTO:
+    """Cancel tasks without blocking the event loop.
+
+    This is the asyncio counterpart of `cancel_tasks`. It reads the origin and
+    status of every job in one pipeline and cancels them in another. Jobs whose
+    dependents have to be enqueued are handed over to rq in a thread.
+
+    Args:
+        unschedule_request_dto (dto.UnscheduleRequestDTO): The unschedule request dto.
+
+    Returns:
+        dto.UnscheduleResponseDTO: The unschedule response dto.
+    """
+
+    requested_ids = unschedule_request_dto.task_ids
+    enqueue_dependents = unschedule_request_dto.enqueue_dependents
+    connection = utils.get_async_redis()
+
+    with metrics.phase("unschedule", "redis"):
+        async with connection.pipeline(transaction=False) as pipeline:
+            for task_id in requested_ids:
+                pipeline.hmget(rq.job.Job.key_for(task_id), "origin", "status")
+                pipeline.scard(rq.job.Job.dependents_key_for(task_id))
+            fields = await pipeline.execute()
+
+        task_ids = []
+        with_dependents = []
+
+        async with connection.pipeline() as pipeline:
+            for task_id, (origin, status), dependents in zip(
+                requested_ids, fields[::2], fields[1::2], strict=True
+            ):
+                # Skip the jobs that don't exist anymore or were already cancelled
+                if origin is None or as_text(status) == JobStatus.CANCELED:
+                    continue
+
+                logging.info("Task %s", task_id)
+                task_ids.append(task_id)
+                if enqueue_dependents and dependents:
+                    with_dependents.append(task_id)
+                else:
+                    _buffer_cancel(pipeline, task_id, as_text(origin), as_text(status))
+
+            await pipeline.execute()
+
+        for task_id in with_dependents:
+            await asyncio.to_thread(
+                _cancel_job, task_id, utils.get_redis(), enqueue_dependents=True
+            )
+
+        await asyncio.to_thread(payloads.release, utils.get_redis(), task_ids)
 
     return dto.UnscheduleResponseDTO(
         task_ids=task_ids, message="Tasks unscheduled successfully"
     )
+
+
+def _latest_exc_info(latest: list[Any]) -> str | None:
+    """Get the traceback of a failed job from its latest result.
+
+    Args:
+        latest (list[Any]): The latest entry of the results stream, if any.
+
+    Returns:
+        str | None: The traceback, or None if the latest result isn't a failure.
+    """
+
+    if not latest:
+        return None
+    exc_string = decode_redis_hash(latest[0][1]).get("exc_string")
+    return (
+        zlib.decompress(base64.b64decode(exc_string)).decode() if exc_string else None
+    )
+
+
+def _raised(exc_info: str | None, exception_types: set[str]) -> bool:
+    """Check whether a traceback ends with one of the given exception types.
+
+    Args:
+        exc_info (str | None): The traceback.
+        exception_types (set[str]): The exception class names, either bare like
+        `ValueError` or fully qualified like `httpx.ConnectError`.
+
+    Returns:
+        bool: Whether the exception is one of the given types.
+    """
+
+    lines = (exc_info or "").strip().splitlines()
+    if not lines:
+        return False
+    # The last line reads "module.ExceptionType: message".
+    exc_type = lines[-1].split(":", 1)[0].strip()
+    return exc_type in exception_types or exc_type.rsplit(".", 1)[-1] in exception_types
+
+
+def _throttle(started_at: float, count: int, rate: float) -> None:
+    """Sleep until `count` jobs can be requeued without exceeding `rate` per second.
+
+    Args:
+        started_at (float): The monotonic time the requeue started at.
+        count (int): The number of jobs requeued so far.
+        rate (float): The maximum number of jobs per second.
+
+    Returns:
+        None
+    """
+
+    delay = started_at + count / rate - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+
+
+def requeue_failed_chunks(
+    *,
+    queue_names: Iterable[str] = (),
+    task_names: Iterable[str] = (),
+    exception_types: Iterable[str] = (),
+    limit: int | None = None,
+    rate: float | None = None,
+    chunk_size: int | None = None,
+    dry_run: bool = False,
+) -> Iterator[list[str]]:
+    """Requeue failed jobs chunk by chunk, at a bounded rate.
+
+    The failed job registry of every queue is read in chunks. The matching jobs of a
+    chunk leave the registry and go back to their queue in a single pipeline, the
+    same way as `rq.registry.FailedJobRegistry.requeue`. Chunks are spaced out so
+    that no more than `rate` jobs are requeued per second.
+
+    Args:
+        queue_names (Iterable[str]): The names of the queues. Defaults to all the
+        queues of `settings.BACKTICK_QUEUES`.
+        task_names (Iterable[str]): Only requeue the jobs of these registered tasks.
+        exception_types (Iterable[str]): Only requeue the jobs that failed with one of
+        these exception types.
+        limit (int | None): The maximum number of jobs to requeue, or None for all.
+        rate (float | None): The maximum number of jobs requeued per second.
+        Defaults to `settings.BACKTICK_REQUEUE_RATE`.
+        chunk_size (int | None): The number of jobs read and requeued at a time.
+        Defaults to `settings.BACKTICK_REQUEUE_CHUNK_SIZE`, capped by the rate.
+        dry_run (bool): Only find the jobs that would be requeued.
+
+    Yields:
+        list[str]: The ids of the jobs requeued by every chunk, or that would be on a
+        dry run.
+    """
+
+    connection = utils.get_redis()
+    serializer = utils.get_serializer()
+    func_names = {settings.BACKTICK_TASKS[name] for name in task_names}
+    exception_types = set(exception_types)
+    rate = rate or settings.BACKTICK_REQUEUE_RATE
+    # A chunk never holds more than a second worth of jobs.
+    chunk_size = max(
+        1, int(min(chunk_size or settings.BACKTICK_REQUEUE_CHUNK_SIZE, rate))
+    )
+
+    total = 0
+    started_at = time.monotonic()
+
+    for queue_name in queue_names or settings.BACKTICK_QUEUES.values():
+        queue = rq.Queue(
+            queue_name,
+            connection=connection,
+            job_class=notifications.NotifyingJob,
+            serializer=serializer,
+        )
+        key = FailedJobRegistry(queue=queue).key
+        offset = 0
+
+        while limit is None or total < limit:
+            job_ids = [
+                as_text(job_id)
+                for job_id in connection.zrange(key, offset, offset + chunk_size - 1)
+            ]
+            if not job_ids:
+                break
+
+            jobs = notifications.NotifyingJob.fetch_many(
+                job_ids, connection=connection, serializer=serializer
+            )
+            if exception_types:
+                with connection.pipeline(transaction=False) as pipeline:
+                    for job_id in job_ids:
+                        pipeline.xrevrange(Result.get_key(job_id), count=1)
+                    latest = pipeline.execute()
+            else:
+                latest = [[]] * len(job_ids)
+
+            matched = [
+                job
+                for job, entries in zip(jobs, latest, strict=True)
+                if job is not None
+                and (not func_names or job.func_name in func_names)
+                and (
+                    not exception_types
+                    # rq only writes the traceback to the job on Redis without streams.
+                    or _raised(
+                        _latest_exc_info(entries) or job._exc_info, exception_types
+                    )
+                )
+            ]
+            if limit is not None:
+                matched = matched[: limit - total]
+            # Jobs that expired are dropped from the registry, like rq's cleanup does.
+            expired = [
+                job_id for job_id, job in zip(job_ids, jobs, strict=True) if job is None
+            ]
+
+            if not dry_run:
+                _throttle(started_at, total, rate)
+                with connection.pipeline() as pipeline:
+                    if expired:
+                        pipeline.zrem(key, *expired)
+                    for job in matched:
+                        pipeline.zrem(key, job.id)
+                        job.started_at = None
+                        job.ended_at = None
+                        job._exc_info = ""
+                        job.set_status(JobStatus.QUEUED, pipeline=pipeline)
+                        _buffer_job(pipeline, queue, job, None)
+                    pipeline.execute()
+
+            # Requeued jobs leave the registry, so only the kept ones move the offset.
+            offset += (
+                len(job_ids) if dry_run else len(job_ids) - len(matched) - len(expired)
+            )
+            total += len(matched)
+
+            elapsed = time.monotonic() - started_at
+            logging.info(
+                "%s %d failed jobs so far (queue %s, %.0f jobs/s)",
+                "Found" if dry_run else "Requeued",
+                total,
+                queue_name,
+                total / elapsed if elapsed else 0,
+            )
+            if matched:
+                yield [job.id for job in matched]
+
+
+def requeue_failed_tasks(
+    *, requeue_request_dto: dto.RequeueRequestDTO
+) -> dto.RequeueResponseDTO:
+    """Requeue failed tasks at `settings.BACKTICK_REQUEUE_RATE` tasks per second.
+
+    Args:
+        requeue_request_dto (dto.RequeueRequestDTO): The requeue request dto.
+
+    Returns:
+        dto.RequeueResponseDTO: The requeue response dto.
+    """
+
+    task_ids = [
+        task_id
+        for chunk in requeue_failed_chunks(
+            queue_names=requeue_request_dto.queues,
+            task_names=requeue_request_dto.task_names,
+            exception_types=requeue_request_dto.exception_types,
+            limit=requeue_request_dto.limit or settings.BACKTICK_REQUEUE_MAX_TASKS,
+            dry_run=requeue_request_dto.dry_run,
+        )
+        for task_id in chunk
+    ]
+
+    action = "would be requeued" if requeue_request_dto.dry_run else "requeued"
+    return dto.RequeueResponseDTO(
+        task_ids=task_ids, message=f"{len(task_ids)} failed tasks {action}"
+    )
+
+
+async def requeue_failed_tasks_async(
+    *, requeue_request_dto: dto.RequeueRequestDTO
+) -> dto.RequeueResponseDTO:
+    """Requeue failed tasks without blocking the event loop.
+
+    This runs `requeue_failed_tasks` in a thread, where it loads the jobs with rq and
+    waits between the chunks.
+
+    Args:
+        requeue_request_dto (dto.RequeueRequestDTO): The requeue request dto.
+
+    Returns:
+        dto.RequeueResponseDTO: The requeue response dto.
+    """
+
+    return await asyncio.to_thread(
+        requeue_failed_tasks, requeue_request_dto=requeue_request_dto
+    )
+
+
+def _load_result(data: bytes) -> Any:
+    """Deserialize the return value of a task for a JSON response.
+
+    Args:
+        data (bytes): The serialized return value.
+
+    Returns:
+        Any: The return value, its repr if it isn't JSON serializable, or None if it
+        can't be deserialized in the API process.
+    """
+
+    try:
+        value = utils.get_serializer().loads(data)
+    except Exception:
+        logging.warning("Failed to deserialize a task result", exc_info=True)
+        return None
+
+    try:
+        json.dumps(value)
+    except (TypeError, ValueError):
+        return repr(value)
+    return value
+
+
+def _task_status(
+    task_id: str, fields: list[bytes | None], latest: list[Any]
+) -> dto.TaskStatusDTO:
+    """Build the status of a task from its raw job fields and latest result.
+
+    Args:
+        task_id (str): The task id.
+        fields (list[bytes | None]): The values of `_STATUS_FIELDS`.
+        latest (list[Any]): The latest entry of the results stream, if any.
+
+    Returns:
+        dto.TaskStatusDTO: The task status.
+    """
+
+    status, enqueued_at, started_at, ended_at, result, exc_info = fields
+    if status is None:
+        return dto.TaskStatusDTO(task_id=task_id, status=TASK_NOT_FOUND)
+
+    # Both hold the same payloads as the hash fields, base64 encoded.
+    if latest:
+        payload = decode_redis_hash(latest[0][1])
+        if return_value := payload.get("return_value"):
+            result = base64.b64decode(return_value)
+        if exc_string := payload.get("exc_string"):
+            exc_info = base64.b64decode(exc_string)
+
+    return dto.TaskStatusDTO(
+        task_id=task_id,
+        status=as_text(status),
+        enqueued_at=utils.parse_date(enqueued_at),
+        started_at=utils.parse_date(started_at),
+        ended_at=utils.parse_date(ended_at),
+        result=_load_result(result) if result else None,
+        exc_info=zlib.decompress(exc_info).decode() if exc_info else None,
+    )
+
+
+def _cache_statuses(statuses: list[dto.TaskStatusDTO], now: float) -> None:
+    """Cache task statuses, evicting the expired and then the oldest entries.
+
+    Args:
+        statuses (list[dto.TaskStatusDTO]): The statuses read from Redis.
+        now (float): The monotonic time they were read at.
+
+    Returns:
+        None
+    """
+
+    max_size = settings.BACKTICK_STATUS_CACHE_SIZE
+    if len(_status_cache) + len(statuses) > max_size:
+        for task_id, (expires_at, _) in list(_status_cache.items()):
+            if expires_at <= now:
+                del _status_cache[task_id]
+        while _status_cache and len(_status_cache) + len(statuses) > max_size:
+            del _status_cache[next(iter(_status_cache))]
+
+    expires_at = now + settings.BACKTICK_STATUS_CACHE_TTL
+    for status in statuses:
+        _status_cache.pop(status.task_id, None)
+        _status_cache[status.task_id] = (expires_at, status)
+
+
+async def get_task_statuses_async(task_ids: list[str]) -> list[dto.TaskStatusDTO]:
+    """Get the status, timestamps, result and error of many tasks.
+
+    Only the needed job fields and the latest result are read, for every task id
+    in a single pipeline, without loading the jobs. Statuses are cached for
+    `settings.BACKTICK_STATUS_CACHE_TTL` seconds, so clients polling the same tasks
+    share the reads.
+
+    Args:
+        task_ids (list[str]): The task ids.
+
+    Returns:
+        list[dto.TaskStatusDTO]: One status per task id, in the order of `task_ids`.
+    """
+
+    now = time.monotonic()
+    statuses = {}
+    for task_id in task_ids:
+        cached = _status_cache.get(task_id)
+        if cached and cached[0] > now:
+            statuses[task_id] = cached[1]
+
+    missing = [
+        task_id for task_id in dict.fromkeys(task_ids) if task_id not in statuses
+    ]
+    if missing:
+        async with utils.get_async_redis().pipeline(transaction=False) as pipeline:
+            for task_id in missing:
+                pipeline.hmget(rq.job.Job.key_for(task_id), *_STATUS_FIELDS)
+                pipeline.xrevrange(Result.get_key(task_id), count=1)
+            replies = await pipeline.execute()
+
+        read = [
+            _task_status(task_id, fields, latest)
+            for task_id, fields, latest in zip(
+                missing, replies[::2], replies[1::2], strict=True
+            )
+        ]
+        _cache_statuses(read, now)
+        statuses.update((status.task_id, status) for status in read)
+
+    return [statuses[task_id] for task_id in task_ids]
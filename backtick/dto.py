@@ -1,9 +1,10 @@
 import datetime
+import enum
 from typing import Any
 
 from pydantic import BaseModel, root_validator, validator
 
-from backtick import settings, utils
+from backtick import settings, task_registry
 
 
 class ScheduleRequestDTO(BaseModel):
@@ -12,25 +13,28 @@ class ScheduleRequestDTO(BaseModel):
     task_name: str
     datetimes: list[datetime.datetime] | None = None
     kwargs: dict[str, Any] = {}
+    idempotency_key: str | None = None
 
     @root_validator()
     def check(cls, values: dict[str, Any]) -> dict[str, Any]:
+        registry = task_registry.get_registry()
+
         # Check if task is registered
-        if (task_name := values.get("task_name")) not in settings.BACKTICK_TASKS:
+        if (task_name := values.get("task_name")) not in registry:
             raise ValueError(f"Task {task_name} is not registered")
 
         # Check if task is discoverable
         try:
-            task = utils.discover_task(settings.BACKTICK_TASKS[task_name])
-        except (ImportError, AttributeError, ValueError):
+            spec = registry.get(str(task_name))
+        except (ImportError, AttributeError, ValueError, TypeError):
             raise ValueError(f"Registered task {task_name} is not discoverable")
 
         # Check task is keyword only
-        if not utils.check_keyword_only_func(task):
+        if not spec.keyword_only:
             raise ValueError(f"Task {task_name} is not keyword only")
 
         # Check if kwargs match the task kwargs
-        if not utils.check_func_kwargs_match_kwargs(task, values.get("kwargs", {})):
+        if not spec.check_kwargs(values.get("kwargs", {})):
             raise ValueError("Kwargs do not match task kwargs")
 
         return values
@@ -56,15 +60,137 @@ class ScheduleRequestDTO(BaseModel):
             raise ValueError(f"Datetime {v} is more than a month in the future")
         return v
 
+    @validator("idempotency_key")
+    def check_idempotency_key(cls, v: str | None) -> str | None:
+        if v is not None and not 0 < len(v) <= 255:
+            raise ValueError("Idempotency key must be between 1 and 255 characters")
+        return v
+
 
 class ScheduleResponseDTO(BaseModel):
     task_ids: list[str]
     message: str
 
 
+class BatchScheduleRequestDTO(BaseModel):
+    """The batch schedule request dto.
+
+    The items are kept as raw dicts so that each of them can be validated as a
+    `ScheduleRequestDTO` on its own without failing the whole batch.
+    """
+
+    requests: list[dict[str, Any]]
+
+    @validator("requests")
+    def check_requests(cls, v: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        if not v:
+            raise ValueError("Batch must contain at least one request")
+
+        if len(v) > settings.BACKTICK_BATCH_MAX_SIZE:
+            raise ValueError(
+                f"Batch must not contain more than {settings.BACKTICK_BATCH_MAX_SIZE} requests"
+            )
+        return v
+
+
+class BatchScheduleItemDTO(BaseModel):
+    task_ids: list[str] = []
+    error: str | None = None
+
+
+class BatchScheduleResponseDTO(BaseModel):
+    results: list[BatchScheduleItemDTO]
+    message: str
+
+
 class UnscheduleRequestDTO(BaseModel):
     task_ids: list[str]
     enqueue_dependents: bool
 
 
 UnscheduleResponseDTO = ScheduleResponseDTO
+
+
+class CancelStatus(str, enum.Enum):
+    """The outcome of cancelling a single task."""
+
+    CANCELED = "canceled"
+    NOT_FOUND = "not_found"
+    ALREADY_CANCELED = "already_canceled"
+
+
+class UnscheduleItemDTO(BaseModel):
+    task_id: str
+    status: CancelStatus
+
+
+class BulkUnscheduleResponseDTO(BaseModel):
+    results: list[UnscheduleItemDTO]
+    message: str
+
+
+class RequeueRequestDTO(BaseModel):
+    """The requeue request dto. Empty filters match every failed task."""
+
+    queues: list[str] = []
+    task_names: list[str] = []
+    exception_types: list[str] = []
+    limit: int | None = None
+    dry_run: bool = False
+
+    @validator("queues", each_item=True)
+    def check_queues(cls, v: str) -> str:
+        if v not in settings.BACKTICK_QUEUES.values():
+            raise ValueError(f"Queue {v} not found")
+        return v
+
+    @validator("task_names", each_item=True)
+    def check_task_names(cls, v: str) -> str:
+        if v not in settings.BACKTICK_TASKS:
+            raise ValueError(f"Task {v} is not registered")
+        return v
+
+    @validator("limit")
+    def check_limit(cls, v: int | None) -> int | None:
+        if v is not None and not 0 < v <= settings.BACKTICK_REQUEUE_MAX_TASKS:
+            raise ValueError(
+                f"Limit must be between 1 and {settings.BACKTICK_REQUEUE_MAX_TASKS}"
+            )
+        return v
+
+
+RequeueResponseDTO = ScheduleResponseDTO
+
+
+class TaskStatusDTO(BaseModel):
+    """The status of a task, `not_found` once the job has expired or never existed."""
+
+    task_id: str
+    status: str
+    enqueued_at: datetime.datetime | None = None
+    started_at: datetime.datetime | None = None
+    ended_at: datetime.datetime | None = None
+    result: Any = None
+    exc_info: str | None = None
+
+
+class TaskStatusResponseDTO(BaseModel):
+    results: list[TaskStatusDTO]
+
+
+class RegistryJobDTO(BaseModel):
+    """A job of a registry page, `at` being its registry score as a datetime."""
+
+    task_id: str
+    task_name: str | None = None
+    status: str | None = None
+    at: datetime.datetime | None = None
+    created_at: datetime.datetime | None = None
+    enqueued_at: datetime.datetime | None = None
+    started_at: datetime.datetime | None = None
+    ended_at: datetime.datetime | None = None
+
+
+class RegistryPageDTO(BaseModel):
+    results: list[RegistryJobDTO]
+    next_cursor: str | None
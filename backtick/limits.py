@@ -0,0 +1,354 @@
+"""Limits on how fast and how many of the jobs of a task or a queue the workers run.
+
+Rate limits are set per task with `@utils.task(rate_limit="100/s")` and per queue
+with `settings.BACKTICK_QUEUE_RATE_LIMITS`. They're enforced with the generic cell
+rate algorithm (GCRA): every limit keeps the theoretical arrival time of its next job
+in Redis, and a job is allowed when that time is at most `burst` emission intervals
+away.
+
+Concurrency caps are set per task with `@utils.task(max_concurrency=10)`. Every cap
+is a semaphore in Redis, a sorted set of the running jobs scored by when their lease
+expires. Leases last for the timeout of the job, plus a grace period, so the slots of
+the jobs of crashed workers are freed without a release.
+
+Both are shared by all the workers and enforced as the jobs are dequeued, with a
+single script call. A job over its limits isn't failed or waited for. It's deferred,
+and the worker dequeues the next job:
+
+* Jobs over a rate limit are scheduled for the first slot the limit allows, and the
+slot is reserved for them, so they come back spaced by the rate instead of competing
+for the next slot.
+* Jobs over a concurrency cap are scheduled a little later, with some jitter, since
+there's no telling when a slot frees up.
+
+Deferred jobs are moved back to their queue by the scheduler that moves the other
+scheduled jobs, rq's or the sharded one.
+"""
+
+import random
+from typing import Any, NamedTuple
+
+import redis
+import rq
+from rq.job import Job, JobStatus
+from rq.registry import ScheduledJobRegistry
+from rq.utils import as_text
+
+from backtick import metrics, scheduler, settings, utils
+
+KEY_PREFIX = "backtick:rate_limit:"
+RESERVATION_KEY_PREFIX = "backtick:rate_limit:reserved:"
+CONCURRENCY_KEY_PREFIX = "backtick:concurrency:"
+
+# Milliseconds a reserved slot is kept after its time, for schedulers running late.
+RESERVATION_GRACE = 3_600_000
+
+# Seconds the jobs without a timeout hold their concurrency slot for.
+UNLIMITED_LEASE = 86_400
+
+# Schedules the job KEYS[#KEYS - 2] at `at`, in milliseconds, in rq's scheduled job
+# registry or in the shard KEYS[#KEYS] of the sharded scheduler, and returns the delay
+# in seconds along with the reason. The job is taken off the intermediate list
+# KEYS[#KEYS - 1] its queue was dequeued into, else rq would fail it as stuck there.
+# ARGV: the job id, whether the scheduler is sharded, the bucket size in seconds and
+# the interval of the sharded schedulers in seconds.
+_DEFER = f"""
+local function defer(at, now, reason)
+    local job_id, timestamp = ARGV[1], at / 1000
+    redis.call("HSET", KEYS[#KEYS - 2], "status", "{JobStatus.SCHEDULED.value}")
+    redis.call("LREM", KEYS[#KEYS - 1], 1, job_id)
+    if ARGV[2] ~= "1" then
+        redis.call("ZADD", KEYS[#KEYS], timestamp, job_id)
+    else
+        local bucket_seconds = tonumber(ARGV[3])
+        local bucket = math.floor(timestamp / bucket_seconds)
+        redis.call("ZADD", KEYS[#KEYS] .. ":" .. bucket, timestamp, job_id)
+        redis.call("ZADD", KEYS[#KEYS], bucket * bucket_seconds, bucket)
+        if at - now < tonumber(ARGV[4]) * 1000 then
+            redis.call("PUBLISH", "{scheduler.WAKEUP_CHANNEL}", timestamp)
+        end
+    end
+    return {{string.format("%.3f", (at - now) / 1000), reason}}
+end
+"""
+
+# Takes a slot of every concurrency cap and rate limit of a job and returns a delay
+# of 0, else defers the job with `defer`. Jobs already holding a slot of a cap keep
+# it, and jobs that had a rate limit slot reserved are allowed by the rate limits
+# right away. A reserved slot is kept while the job waits for a concurrency slot.
+# KEYS: the rate limit keys, the concurrency cap keys, the reservation key, and the
+# job, intermediate queue and schedule keys of `defer`.
+# ARGV: the arguments of `defer`, the number of rate limits and of concurrency caps,
+# the delay of the jobs over a cap in milliseconds, then the emission interval and
+# burst tolerance of every rate limit in milliseconds, then the size and the lease of
+# every cap, in milliseconds.
+_ACQUIRE_SCRIPT = f"""
+{_DEFER}
+local job_id = ARGV[1]
+local rates, caps = tonumber(ARGV[5]), tonumber(ARGV[6])
+local reservation = KEYS[rates + caps + 1]
+local time = redis.call("TIME")
+local now = tonumber(time[1]) * 1000 + tonumber(time[2]) / 1000
+
+for i = 1, caps do
+    local key, size = KEYS[rates + i], tonumber(ARGV[6 + 2 * rates + 2 * i])
+    redis.call("ZREMRANGEBYSCORE", key, "-inf", now)
+    if not redis.call("ZSCORE", key, job_id) and redis.call("ZCARD", key) >= size then
+        return defer(now + tonumber(ARGV[7]), now, "concurrency")
+    end
+end
+
+if redis.call("DEL", reservation) == 0 then
+    local at = now
+    local tats = {{}}
+    for i = 1, rates do
+        local interval, tolerance = tonumber(ARGV[6 + 2 * i]), tonumber(ARGV[7 + 2 * i])
+        tats[i] = tonumber(redis.call("GET", KEYS[i]) or 0)
+        at = math.max(at, tats[i] + interval - tolerance)
+    end
+    for i = 1, rates do
+        local tat = math.max(tats[i], at) + tonumber(ARGV[6 + 2 * i])
+        local ttl = math.ceil(tat - now) + 1000
+        redis.call("SET", KEYS[i], string.format("%.3f", tat), "PX", ttl)
+    end
+    if at > now then
+        redis.call("SET", reservation, "1", "PX", math.ceil(at - now) + {RESERVATION_GRACE})
+        return defer(at, now, "rate_limit")
+    end
+end
+
+for i = 1, caps do
+    local lease = tonumber(ARGV[7 + 2 * rates + 2 * i])
+    redis.call("ZADD", KEYS[rates + i], now + lease, job_id)
+end
+return {{"0", ""}}
+"""
+
+
+class RateLimit(NamedTuple):
+    """A rate limit and the Redis key its state is kept in."""
+
+    key: str
+    # Calls allowed per second.
+    rate: float
+    # Calls allowed at once.
+    burst: int
+
+
+class ConcurrencyCap(NamedTuple):
+    """A concurrency cap and the Redis key of its semaphore."""
+
+    key: str
+    # Jobs allowed to run at the same time.
+    size: int
+
+
+class Limits(NamedTuple):
+    """The limits a job has to fit in to run."""
+
+    rate_limits: list[RateLimit]
+    concurrency_caps: list[ConcurrencyCap]
+
+
+# The limits of the tasks, by fully qualified function name.
+_cache: dict[str, Limits] = {}
+
+
+def _task_limits(job: Job) -> Limits:
+    """Get the limits of the task a job runs.
+
+    Args:
+        job (Job): The job.
+
+    Returns:
+        Limits: The limits, none if the task can't be imported, in which case
+        running the job fails.
+    """
+
+    func_name = job.func_name
+    if func_name not in _cache:
+        try:
+            func = job.func
+        except Exception:
+            return Limits([], [])
+        rate_limit = getattr(func, "rate_limit", None)
+        max_concurrency = getattr(func, "max_concurrency", None)
+        _cache[func_name] = Limits(
+            (
+                [
+                    RateLimit(
+                        f"{KEY_PREFIX}task:{func_name}",
+                        utils.parse_rate(rate_limit),
+                        getattr(func, "rate_limit_burst", 1),
+                    )
+                ]
+                if rate_limit
+                else []
+            ),
+            (
+                [
+                    ConcurrencyCap(
+                        f"{CONCURRENCY_KEY_PREFIX}task:{func_name}", max_concurrency
+                    )
+                ]
+                if max_concurrency
+                else []
+            ),
+        )
+    return _cache[func_name]
+
+
+def job_limits(job: Job, queue: rq.Queue) -> Limits:
+    """Get the limits that apply to a job.
+
+    Args:
+        job (Job): The job.
+        queue (rq.Queue): The queue the job was dequeued from.
+
+    Returns:
+        Limits: The limits of its task and of its queue.
+    """
+
+    limits = _task_limits(job)
+    if queue_limit := settings.BACKTICK_QUEUE_RATE_LIMITS.get(queue.name):
+        rate, burst = queue_limit
+        queue_rate_limit = RateLimit(
+            f"{KEY_PREFIX}queue:{queue.name}", utils.parse_rate(rate), burst
+        )
+        limits = limits._replace(rate_limits=[*limits.rate_limits, queue_rate_limit])
+    return limits
+
+
+def _defer_args(job: Job, queue: rq.Queue) -> tuple[list[str], list[Any]]:
+    """Get the keys and arguments of the `_DEFER` Lua function.
+
+    Args:
+        job (Job): The job to defer.
+        queue (rq.Queue): The queue of the job.
+
+    Returns:
+        tuple[list[str], list[Any]]: The keys and arguments.
+    """
+
+    shards = settings.BACKTICK_SCHEDULER_SHARDS
+    schedule_key = (
+        scheduler.shard_key(queue.name, scheduler.shard_for(job.id))
+        if shards
+        else ScheduledJobRegistry.key_template.format(queue.name)
+    )
+    return [job.key, queue.intermediate_queue_key, schedule_key], [
+        job.id,
+        int(bool(shards)),
+        settings.BACKTICK_SCHEDULER_BUCKET_SECONDS,
+        settings.BACKTICK_SCHEDULER_INTERVAL,
+    ]
+
+
+def _lease(job: Job, queue: rq.Queue) -> float:
+    """Get the seconds a job holds its concurrency slots for.
+
+    Args:
+        job (Job): The job.
+        queue (rq.Queue): The queue of the job.
+
+    Returns:
+        float: The lease.
+    """
+
+    timeout = job.timeout or queue.DEFAULT_TIMEOUT
+    if timeout == -1:
+        timeout = UNLIMITED_LEASE
+    return timeout + settings.BACKTICK_CONCURRENCY_LEASE_GRACE
+
+
+def acquire(
+    connection: redis.Redis, job: Job, queue: rq.Queue, limits: Limits
+) -> tuple[float, str | None]:
+    """Take a slot of every limit of a job, or defer the job until it may have them.
+
+    Args:
+        connection (redis.Redis): The redis connection.
+        job (Job): The dequeued job.
+        queue (rq.Queue): The queue the job was dequeued from.
+        limits (Limits): The limits of the job.
+
+    Returns:
+        tuple[float, str | None]: 0 if the job can run now, else the seconds it was
+        deferred by, and why: "rate_limit" or "concurrency".
+    """
+
+    rate_limits, caps = limits
+    defer_keys, args = _defer_args(job, queue)
+    retry_delay = settings.BACKTICK_CONCURRENCY_RETRY_DELAY * random.uniform(1, 2)
+    args += [len(rate_limits), len(caps), retry_delay * 1000]
+    for limit in rate_limits:
+        interval = 1000 / limit.rate
+        args += [interval, interval * limit.burst]
+    lease = _lease(job, queue) * 1000
+    for cap in caps:
+        args += [cap.size, lease]
+
+    delay, reason = connection.register_script(_ACQUIRE_SCRIPT)(
+        keys=[
+            *(limit.key for limit in rate_limits),
+            *(cap.key for cap in caps),
+            RESERVATION_KEY_PREFIX + job.id,
+            *defer_keys,
+        ],
+        args=args,
+    )
+    return float(delay), as_text(reason) or None
+
+
+def release(connection: redis.Redis, job: Job, limits: Limits) -> None:
+    """Give back the concurrency slots of a job once it's run.
+
+    Args:
+        connection (redis.Redis): The redis connection.
+        job (Job): The job.
+        limits (Limits): The limits of the job.
+
+    Returns:
+        None
+    """
+
+    if not limits.concurrency_caps:
+        return
+    with connection.pipeline(transaction=False) as pipeline:
+        for cap in limits.concurrency_caps:
+            pipeline.zrem(cap.key, job.id)
+        pipeline.execute()
+
+
+class LimitsMixin(rq.Worker):
+    """Defer the dequeued jobs that are over their limits and dequeue others.
+
+    The concurrency slots of the jobs are given back once the worker has run them.
+    """
+
+    def dequeue_job_and_maintain_ttl(
+        self, timeout: int | None, max_idle_time: int | None = None
+    ) -> tuple[Job, rq.Queue] | None:
+        while True:
+            result = super().dequeue_job_and_maintain_ttl(timeout, max_idle_time)
+            if result is None:
+                return None
+
+            job, queue = result
+            limits = job_limits(job, queue)
+            if not any(limits):
+                return result
+            delay, reason = acquire(self.connection, job, queue, limits)
+            if not delay:
+                return result
+
+            self.log.info("Job %s deferred by %.3fs, %s", job.id, delay, reason)
+            metrics.DEFERRED_JOBS.labels(
+                metrics.task_name(job.func_name), queue.name, reason
+            ).inc()
+
+    def execute_job(self, job: Job, queue: rq.Queue) -> None:
+        try:
+            super().execute_job(job, queue)
+        finally:
+            release(self.connection, job, job_limits(job, queue))
@@ -0,0 +1,293 @@
+"""Prometheus metrics of the API and the workers.
+
+The API processes and the workers record their metrics in memory, or in the
+`PROMETHEUS_MULTIPROC_DIR` directory when it's set, so that the metrics of every
+gunicorn worker or supervised rq worker are summed up by whichever process is
+scraped. The directory has to be set, and emptied, before the processes start.
+
+The sizes of the queues aren't recorded by any process. They're read from Redis
+when the API's /metrics endpoint is scraped.
+"""
+
+import contextlib
+import datetime
+import functools
+import os
+import time
+from collections.abc import Iterator
+
+import prometheus_client
+import rq
+from prometheus_client import CollectorRegistry, Counter, Histogram, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+from rq.job import Job, JobStatus
+from rq.registry import ScheduledJobRegistry
+from rq.utils import as_text
+
+from backtick import scheduler, settings, tracing, utils
+
+# Handler latency buckets, in seconds.
+_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+# Job duration and wait buckets, in seconds.
+_JOB_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 3600)
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "backtick_http_request_duration_seconds",
+    "Time spent handling the API requests.",
+    ["method", "route", "status"],
+    buckets=_LATENCY_BUCKETS,
+)
+REQUEST_PHASE_SECONDS = Histogram(
+    "backtick_request_phase_duration_seconds",
+    "Time spent in each phase of the schedule and unschedule requests.",
+    ["operation", "phase"],
+    buckets=_LATENCY_BUCKETS,
+)
+ENQUEUED_TASKS = Counter(
+    "backtick_enqueued_tasks",
+    "Tasks enqueued or scheduled through the API.",
+    ["task", "queue"],
+)
+JOB_WAIT_SECONDS = Histogram(
+    "backtick_job_wait_seconds",
+    "Time the jobs spent in their queue before a worker started them.",
+    ["task", "queue"],
+    buckets=_JOB_BUCKETS,
+)
+JOB_SECONDS = Histogram(
+    "backtick_job_duration_seconds",
+    "Time the workers spent running the jobs.",
+    ["task", "queue"],
+    buckets=_JOB_BUCKETS,
+)
+JOBS = Counter(
+    "backtick_jobs",
+    "Jobs run by the workers, by outcome: finished, failed, retried or stopped.",
+    ["task", "queue", "outcome"],
+)
+DEFERRED_JOBS = Counter(
+    "backtick_deferred_jobs",
+    "Jobs the workers dequeued and deferred instead of running, by reason.",
+    ["task", "queue", "reason"],
+)
+SCHEDULER_LATENESS_SECONDS = Histogram(
+    "backtick_scheduler_lateness_seconds",
+    "How late the sharded schedulers moved the due jobs to their queue.",
+    ["queue"],
+    buckets=_JOB_BUCKETS,
+)
+
+# The outcome of a job for the status it's left in by the worker. Jobs that are due
+# to be retried are queued or scheduled again.
+_OUTCOMES = {
+    JobStatus.FINISHED: "finished",
+    JobStatus.FAILED: "failed",
+    JobStatus.QUEUED: "retried",
+    JobStatus.SCHEDULED: "retried",
+    JobStatus.STOPPED: "stopped",
+}
+
+
+@contextlib.contextmanager
+def phase(operation: str, name: str) -> Iterator[None]:
+    """Time a phase of a request, and trace it as a span when tracing is enabled.
+
+    Args:
+        operation (str): The operation, e.g. `schedule`.
+        name (str): The phase, e.g. `validation`, `discovery` or `redis`.
+
+    Yields:
+        None
+    """
+
+    with REQUEST_PHASE_SECONDS.labels(operation, name).time():
+        with tracing.span(f"{operation}.{name}"):
+            yield
+
+
+@functools.cache
+def _task_names() -> dict[str, str]:
+    """Map the fully qualified names of the registered tasks to their names."""
+
+    return {path: name for name, path in settings.BACKTICK_TASKS.items()}
+
+
+def task_name(func_name: str) -> str:
+    """Get the label of a task, its registered name if it has one.
+
+    Args:
+        func_name (str): The fully qualified name of the task function.
+
+    Returns:
+        str: The task label.
+    """
+
+    return _task_names().get(func_name, func_name)
+
+
+def observe_wait(job: Job) -> None:
+    """Record how long a job waited in its queue, as it's started.
+
+    Args:
+        job (Job): The dequeued job.
+
+    Returns:
+        None
+    """
+
+    if job.enqueued_at is None:
+        return
+    enqueued_at = job.enqueued_at.replace(tzinfo=datetime.timezone.utc)
+    wait = datetime.datetime.now(tz=datetime.timezone.utc) - enqueued_at
+    JOB_WAIT_SECONDS.labels(task_name(job.func_name), job.origin).observe(
+        max(wait.total_seconds(), 0)
+    )
+
+
+def observe_job(job: Job, duration: float, refresh: bool = False) -> None:
+    """Record the duration and outcome of a job run by a worker.
+
+    Args:
+        job (Job): The job.
+        duration (float): The seconds the worker spent running the job.
+        refresh (bool): Whether to read the status of the job from Redis, for jobs
+        run by another process.
+
+    Returns:
+        None
+    """
+
+    labels = (task_name(job.func_name), job.origin)
+    JOB_SECONDS.labels(*labels).observe(duration)
+    status = job.get_status(refresh=refresh)
+    if outcome := _OUTCOMES.get(status):
+        JOBS.labels(*labels, outcome).inc()
+
+
+class JobMetricsMixin(rq.Worker):
+    """Record the wait, duration and outcome of the jobs run by an rq worker.
+
+    The metrics are recorded by the worker process, so the work horses of forking
+    workers don't need a metrics directory of their own.
+    """
+
+    def execute_job(self, job: Job, queue: rq.Queue) -> None:
+        observe_wait(job)
+        started_at = time.monotonic()
+        super().execute_job(job, queue)
+        # Work horses update the job in Redis, behind the worker's back.
+        observe_job(
+            job,
+            time.monotonic() - started_at,
+            refresh=not isinstance(self, rq.SimpleWorker),
+        )
+
+
+class QueueCollector:
+    """Read the depth of the queues and the size of their scheduled registries.
+
+    The time buckets of the sharded scheduler, then the sizes, are each read in a
+    single pipeline when the metrics are collected.
+    """
+
+    def collect(self) -> Iterator[GaugeMetricFamily]:
+        connection = utils.get_redis()
+        queue_names = list(settings.BACKTICK_QUEUES.values())
+        shard_keys = {
+            queue_name: [
+                scheduler.shard_key(queue_name, shard)
+                for shard in range(settings.BACKTICK_SCHEDULER_SHARDS)
+            ]
+            for queue_name in queue_names
+        }
+
+        with connection.pipeline(transaction=False) as pipeline:
+            for queue_name in queue_names:
+                for key in shard_keys[queue_name]:
+                    pipeline.zrange(key, 0, -1)
+            shard_buckets = iter(pipeline.execute())
+        buckets = {
+            queue_name: [
+                f"{key}:{as_text(bucket)}"
+                for key in shard_keys[queue_name]
+                for bucket in next(shard_buckets)
+            ]
+            for queue_name in queue_names
+        }
+
+        with connection.pipeline(transaction=False) as pipeline:
+            for queue_name in queue_names:
+                pipeline.llen(rq.Queue.redis_queue_namespace_prefix + queue_name)
+                pipeline.zcard(ScheduledJobRegistry.key_template.format(queue_name))
+                for key in buckets[queue_name]:
+                    pipeline.zcard(key)
+            sizes = iter(pipeline.execute())
+
+        depth = GaugeMetricFamily(
+            "backtick_queue_depth", "Jobs waiting in the queues.", labels=["queue"]
+        )
+        scheduled = GaugeMetricFamily(
+            "backtick_scheduled_tasks",
+            "Jobs scheduled for later, including the sharded scheduler's.",
+            labels=["queue"],
+        )
+        for queue_name in queue_names:
+            depth.add_metric([queue_name], next(sizes))
+            scheduled.add_metric(
+                [queue_name],
+                next(sizes) + sum(next(sizes) for _ in buckets[queue_name]),
+            )
+        yield depth
+        yield scheduled
+
+
+# The queue sizes, only exposed by the API.
+queue_registry = CollectorRegistry()
+queue_registry.register(QueueCollector())
+
+
+@functools.cache
+def get_registry() -> CollectorRegistry:
+    """Get the registry of the metrics recorded by the processes.
+
+    Returns:
+        CollectorRegistry: The registry summing up the metrics of every process
+        sharing `PROMETHEUS_MULTIPROC_DIR`, or the registry of this process.
+    """
+
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return prometheus_client.REGISTRY
+
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render(with_queues: bool = False) -> bytes:
+    """Render the metrics in the Prometheus text format.
+
+    Args:
+        with_queues (bool): Whether to read the queue sizes as well.
+
+    Returns:
+        bytes: The metrics.
+    """
+
+    output = prometheus_client.generate_latest(get_registry())
+    if with_queues:
+        output += prometheus_client.generate_latest(queue_registry)
+    return output
+
+
+def start_server(port: int) -> None:
+    """Serve the metrics of the workers over HTTP from a daemon thread.
+
+    Args:
+        port (int): The port to listen on.
+
+    Returns:
+        None
+    """
+
+    prometheus_client.start_http_server(port, registry=get_registry())
@@ -0,0 +1,338 @@
+"""Task status notifications.
+
+Workers publish the status transitions of the jobs they run, and the cancel paths
+publish the cancellations, to a Redis pub/sub channel per queue. Every API process
+reads them through a single `EventHub` connection and fans them out to its
+subscribers in memory, so subscribers don't cost a Redis connection each.
+"""
+
+import asyncio
+import dataclasses
+import json
+import logging
+import weakref
+from collections.abc import AsyncIterator, Iterable
+from typing import Any
+
+import redis
+import redis.asyncio
+from rq.job import Job, JobStatus
+from rq.utils import as_text
+
+from backtick import payloads, settings, utils
+
+CHANNEL_PREFIX = "backtick:events:"
+
+# The statuses published for a job. Jobs don't change status after the final ones.
+PUBLISHED_STATUSES = {
+    JobStatus.STARTED,
+    JobStatus.FINISHED,
+    JobStatus.FAILED,
+    JobStatus.STOPPED,
+    JobStatus.CANCELED,
+}
+FINAL_STATUSES = PUBLISHED_STATUSES - {JobStatus.STARTED}
+
+# The status of the subscribed task ids without a job.
+NOT_FOUND = "not_found"
+
+# Event hubs are bound to the event loop of their pub/sub connection.
+_hubs: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, "EventHub"] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def encode_event(task_id: str, queue: str | None, status: str) -> str:
+    """Encode a task event.
+
+    Args:
+        task_id (str): The task id.
+        queue (str | None): The name of the queue of the task.
+        status (str): The new status of the task.
+
+    Returns:
+        str: The JSON event.
+    """
+
+    return json.dumps({"task_id": task_id, "queue": queue, "status": status})
+
+
+def publish(
+    connection: redis.Redis | redis.client.Pipeline | redis.asyncio.client.Pipeline,
+    task_id: str,
+    queue: str,
+    status: str,
+) -> None:
+    """Publish, or buffer on a pipeline, a status transition of a task.
+
+    Args:
+        connection (redis.Redis | redis.client.Pipeline |
+        redis.asyncio.client.Pipeline): The connection or pipeline to publish with.
+        task_id (str): The task id.
+        queue (str): The name of the queue of the task.
+        status (str): The new status of the task.
+
+    Returns:
+        None
+    """
+
+    connection.publish(f"{CHANNEL_PREFIX}{queue}", encode_event(task_id, queue, status))
+
+
+class NotifyingJob(payloads.PayloadJob):
+    """An rq job that publishes its status transitions in the worker."""
+
+    def set_status(self, status: JobStatus, pipeline: Any = None) -> None:
+        super().set_status(status, pipeline=pipeline)
+        if status in PUBLISHED_STATUSES:
+            publish(
+                pipeline if pipeline is not None else self.connection,
+                self.id,
+                self.origin,
+                status,
+            )
+
+    def prepare_for_execution(self, worker_name: str, pipeline: Any) -> None:
+        # rq marks the jobs as started without calling `set_status`.
+        super().prepare_for_execution(worker_name, pipeline)
+        publish(pipeline, self.id, self.origin, JobStatus.STARTED)
+
+
+@dataclasses.dataclass(eq=False)
+class Subscriber:
+    """The task ids and queues a client follows, and its pending events.
+
+    A None event closes the subscription.
+    """
+
+    task_ids: frozenset[str]
+    queues: frozenset[str]
+    events: asyncio.Queue[str | None] = dataclasses.field(
+        default_factory=lambda: asyncio.Queue(settings.BACKTICK_EVENTS_BUFFER_SIZE)
+    )
+
+    def send(self, event: str | None) -> None:
+        """Queue an event, closing the subscription if the client fell behind.
+
+        Args:
+            event (str | None): The event, or None to close the subscription.
+
+        Returns:
+            None
+        """
+
+        try:
+            self.events.put_nowait(event)
+        except asyncio.QueueFull:
+            # Make room for the None that closes the subscription.
+            self.events.get_nowait()
+            self.events.put_nowait(None)
+
+
+class EventHub:
+    """Fan out the task events of every queue to the subscribers of a process.
+
+    The hub reads the events with a single pub/sub connection, started with the
+    first subscription. A lost connection closes every subscription, and the next
+    subscription starts a new one.
+    """
+
+    def __init__(self, connection: redis.asyncio.Redis) -> None:
+        self.connection = connection
+        self._by_task: dict[str, set[Subscriber]] = {}
+        self._by_queue: dict[str, set[Subscriber]] = {}
+        self._listener: asyncio.Task | None = None
+        self._ready: asyncio.Event | None = None
+
+    @property
+    def subscribers(self) -> set[Subscriber]:
+        """Every subscriber of the hub."""
+
+        return set[Subscriber]().union(
+            *self._by_task.values(), *self._by_queue.values()
+        )
+
+    async def subscribe(
+        self, task_ids: Iterable[str], queues: Iterable[str]
+    ) -> Subscriber:
+        """Follow the events of task ids and queues.
+
+        Returns once the hub receives the events published from then on.
+
+        Args:
+            task_ids (Iterable[str]): The task ids.
+            queues (Iterable[str]): The names of the queues.
+
+        Returns:
+            Subscriber: The subscription.
+        """
+
+        subscriber = Subscriber(frozenset(task_ids), frozenset(queues))
+        for task_id in subscriber.task_ids:
+            self._by_task.setdefault(task_id, set()).add(subscriber)
+        for queue in subscriber.queues:
+            self._by_queue.setdefault(queue, set()).add(subscriber)
+
+        if self._listener is None or self._listener.done():
+            self._ready = asyncio.Event()
+            self._listener = asyncio.create_task(self._listen(self._ready))
+        await self._ready.wait()  # type: ignore[union-attr]
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        """Stop sending events to a subscriber.
+
+        Args:
+            subscriber (Subscriber): The subscription.
+
+        Returns:
+            None
+        """
+
+        for key, index in (
+            *((task_id, self._by_task) for task_id in subscriber.task_ids),
+            *((queue, self._by_queue) for queue in subscriber.queues),
+        ):
+            if subscribers := index.get(key):
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del index[key]
+
+    def dispatch(self, event: str) -> None:
+        """Send an event to the subscribers of its task id and queue.
+
+        Args:
+            event (str): The JSON event.
+
+        Returns:
+            None
+        """
+
+        try:
+            data = json.loads(event)
+            subscribers = self._by_task.get(data["task_id"], set())
+            subscribers = subscribers | self._by_queue.get(data["queue"], set())
+        except (ValueError, KeyError, TypeError):
+            logging.warning("Skipped a malformed task event: %s", event)
+            return
+
+        for subscriber in subscribers:
+            subscriber.send(event)
+
+    async def _listen(self, ready: asyncio.Event) -> None:
+        """Read the events of every queue until the connection is lost.
+
+        Args:
+            ready (asyncio.Event): Set once the hub is subscribed to the events.
+
+        Returns:
+            None
+        """
+
+        try:
+            async with self.connection.pubsub() as pubsub:
+                await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                ready.set()
+                while True:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True,
+                        timeout=settings.BACKTICK_EVENTS_HEARTBEAT,
+                    )
+                    if message is not None:
+                        self.dispatch(as_text(message["data"]))
+        except redis.RedisError:
+            logging.exception("Lost the task events connection")
+        finally:
+            ready.set()
+            for subscriber in self.subscribers:
+                subscriber.send(None)
+                self.unsubscribe(subscriber)
+
+
+def get_hub() -> EventHub:
+    """Get the event hub of the running event loop.
+
+    Returns:
+        EventHub: The event hub.
+    """
+
+    loop = asyncio.get_running_loop()
+    if loop not in _hubs:
+        _hubs[loop] = EventHub(utils.get_async_redis())
+    return _hubs[loop]
+
+
+async def _current_events(
+    connection: redis.asyncio.Redis, task_ids: list[str]
+) -> list[tuple[str, str, str]]:
+    """Read the current status of tasks as events.
+
+    Args:
+        connection (redis.asyncio.Redis): The redis connection.
+        task_ids (list[str]): The task ids.
+
+    Returns:
+        list[tuple[str, str, str]]: The task id, status and JSON event of every
+        task.
+    """
+
+    async with connection.pipeline(transaction=False) as pipeline:
+        for task_id in task_ids:
+            pipeline.hmget(Job.key_for(task_id), "origin", "status")
+        fields = await pipeline.execute()
+
+    events = []
+    for task_id, (origin, status) in zip(task_ids, fields, strict=True):
+        status = as_text(status) if status else NOT_FOUND
+        queue = as_text(origin) if origin else None
+        events.append((task_id, status, encode_event(task_id, queue, status)))
+    return events
+
+
+async def stream(task_ids: list[str], queues: list[str]) -> AsyncIterator[str | None]:
+    """Stream the status transitions of task ids and queues.
+
+    The current status of every task id comes first, so transitions published before
+    the subscription aren't missed. Without queues, the stream ends once every task
+    has reached a final status. A None is yielded whenever no event came for
+    `settings.BACKTICK_EVENTS_HEARTBEAT` seconds, to keep the connection alive.
+
+    Args:
+        task_ids (list[str]): The task ids.
+        queues (list[str]): The names of the queues.
+
+    Yields:
+        str | None: The JSON events, or None when there was no event.
+    """
+
+    hub = get_hub()
+    subscriber = await hub.subscribe(task_ids, queues)
+    pending = set(task_ids)
+
+    try:
+        for task_id, status, current in await _current_events(
+            hub.connection, list(dict.fromkeys(task_ids))
+        ):
+            if status in FINAL_STATUSES or status == NOT_FOUND:
+                pending.discard(task_id)
+            yield current
+
+        while pending or queues:
+            try:
+                event = await asyncio.wait_for(
+                    subscriber.events.get(), settings.BACKTICK_EVENTS_HEARTBEAT
+                )
+            except asyncio.TimeoutError:
+                yield None
+                continue
+
+            # The hub closed the subscription.
+            if event is None:
+                return
+
+            data = json.loads(event)
+            if data["status"] in FINAL_STATUSES:
+                pending.discard(data["task_id"])
+            yield event
+    finally:
+        hub.unsubscribe(subscriber)
@@ -0,0 +1,243 @@
+"""Claim-check offloading of large task kwargs.
+
+The kwargs of a request larger than `settings.BACKTICK_PAYLOAD_OFFLOAD_THRESHOLD` are
+stored once, addressed by their hash, in Redis or under
+`settings.BACKTICK_PAYLOAD_DIR`. The jobs only carry a reference to them in their
+hash, and `PayloadJob` loads the kwargs right before running the task.
+
+Every job counts as a reference to its payload. References are released when a job
+finishes or is cancelled, and the payload is deleted with the last one. Failed jobs
+keep theirs so that they can be requeued, up to `settings.BACKTICK_PAYLOAD_TTL`.
+"""
+
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import zlib
+from typing import Any, cast
+
+import redis
+import redis.asyncio
+import rq
+from rq.job import Job
+from rq.registry import StartedJobRegistry
+from rq.utils import as_text, decode_redis_hash
+
+from backtick import settings
+
+KEY_PREFIX = "backtick:payload:"
+
+# The job hash field holding the digest of the offloaded kwargs.
+REF_FIELD = "backtick_payload"
+
+# Drops the payload reference of every job in ARGV, decrementing the reference count
+# of its payload and deleting the payloads that aren't referenced anymore. Returns the
+# digests of the deleted payloads.
+_RELEASE_SCRIPT = f"""
+local released = {{}}
+for _, job_id in ipairs(ARGV) do
+    local job_key = "{Job.redis_job_namespace_prefix}" .. job_id
+    local digest = redis.call("HGET", job_key, "{REF_FIELD}")
+    if digest then
+        redis.call("HDEL", job_key, "{REF_FIELD}")
+        local key = "{KEY_PREFIX}" .. digest
+        if redis.call("DECR", key .. ":refs") <= 0 then
+            redis.call("DEL", key, key .. ":refs")
+            released[#released + 1] = digest
+        end
+    end
+end
+return released
+"""
+
+
+@dataclasses.dataclass(frozen=True)
+class Payload:
+    """The encoded kwargs of a request and their digest."""
+
+    digest: str
+    data: bytes
+
+
+def prepare(kwargs: dict[str, Any]) -> Payload | None:
+    """Encode kwargs that are large enough to be offloaded.
+
+    Args:
+        kwargs (dict[str, Any]): The keyword arguments of a task.
+
+    Returns:
+        Payload | None: The payload, or None to keep the kwargs in the jobs.
+    """
+
+    threshold = settings.BACKTICK_PAYLOAD_OFFLOAD_THRESHOLD
+    if threshold is None:
+        return None
+
+    try:
+        encoded = json.dumps(kwargs, sort_keys=True, separators=(",", ":")).encode()
+    except TypeError:
+        # Only JSON kwargs, as sent to the endpoints, are offloaded.
+        return None
+
+    if len(encoded) < threshold:
+        return None
+    return Payload(hashlib.sha256(encoded).hexdigest(), zlib.compress(encoded))
+
+
+def _path(digest: str) -> str:
+    """Get the path of a payload stored on the filesystem.
+
+    Args:
+        digest (str): The digest of the payload.
+
+    Returns:
+        str: The path.
+    """
+
+    return os.path.join(str(settings.BACKTICK_PAYLOAD_DIR), digest[:2], digest)
+
+
+def buffer_store(
+    pipeline: redis.client.Pipeline | redis.asyncio.client.Pipeline,
+    payload: Payload,
+    references: int,
+) -> None:
+    """Buffer the commands that store a payload and add references to it.
+
+    Payloads stored on the filesystem are written right away, only once per digest.
+
+    Args:
+        pipeline (redis.client.Pipeline | redis.asyncio.client.Pipeline): The
+        pipeline to buffer the commands on.
+        payload (Payload): The payload.
+        references (int): The number of jobs that refer to the payload.
+
+    Returns:
+        None
+    """
+
+    key = f"{KEY_PREFIX}{payload.digest}"
+    ttl = settings.BACKTICK_PAYLOAD_TTL
+
+    if settings.BACKTICK_PAYLOAD_DIR is None:
+        pipeline.set(key, payload.data, ex=ttl)
+    elif not os.path.exists(path := _path(payload.digest)):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.{os.getpid()}.tmp", "wb") as f:
+            f.write(payload.data)
+        os.replace(f"{path}.{os.getpid()}.tmp", path)
+
+    pipeline.incrby(f"{key}:refs", references)
+    pipeline.expire(f"{key}:refs", ttl)
+
+
+def load(connection: redis.Redis, digest: str) -> dict[str, Any]:
+    """Load the kwargs of a payload.
+
+    Args:
+        connection (redis.Redis): The redis connection.
+        digest (str): The digest of the payload.
+
+    Raises:
+        LookupError: If the payload doesn't exist anymore.
+
+    Returns:
+        dict[str, Any]: The keyword arguments.
+    """
+
+    data: bytes | None
+    if settings.BACKTICK_PAYLOAD_DIR is None:
+        data = connection.get(f"{KEY_PREFIX}{digest}")
+    else:
+        try:
+            with open(_path(digest), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = None
+
+    if data is None:
+        raise LookupError(f"Payload {digest} doesn't exist anymore")
+    return json.loads(zlib.decompress(data))
+
+
+def release(connection: redis.Redis, job_ids: list[str]) -> None:
+    """Release the payload references of jobs, e.g. after cancelling them.
+
+    Payloads are deleted along with their last reference. Jobs without a payload
+    are skipped, and a job only releases its reference once.
+
+    Args:
+        connection (redis.Redis): The redis connection.
+        job_ids (list[str]): The job ids.
+
+    Returns:
+        None
+    """
+
+    if not job_ids:
+        return
+
+    released = connection.register_script(_RELEASE_SCRIPT)(args=job_ids)
+    for digest in map(as_text, released):
+        logging.info("Payload %s released", digest)
+        if settings.BACKTICK_PAYLOAD_DIR is not None:
+            try:
+                os.remove(_path(digest))
+            except FileNotFoundError:
+                pass
+
+
+class PayloadJob(Job):
+    """An rq job that carries a reference to its kwargs instead of the kwargs.
+
+    The kwargs are loaded right before the task runs. The workers of `PayloadMixin`
+    release the reference once the job has finished.
+    """
+
+    payload_ref: str | None = None
+    _payload_loaded = False
+
+    def to_dict(self, *args: Any, **kwargs: Any) -> dict:
+        obj = super().to_dict(*args, **kwargs)
+        if self.payload_ref:
+            obj[REF_FIELD] = self.payload_ref
+        return obj
+
+    def restore(self, raw_data: Any) -> Any:
+        super().restore(raw_data)
+        ref = decode_redis_hash(raw_data).get(REF_FIELD)
+        self.payload_ref = as_text(ref) if ref else None
+
+    def load_payload(self) -> None:
+        """Replace the kwargs of the job with the offloaded ones.
+
+        The serialized job data is left untouched, so saving the job doesn't write
+        the kwargs back to Redis.
+        """
+
+        if self.payload_ref and not self._payload_loaded:
+            self._deserialize_data()
+            self._kwargs = load(self.connection, self.payload_ref)
+            self._payload_loaded = True
+
+    def _execute(self) -> Any:
+        self.load_payload()
+        return super()._execute()
+
+
+class PayloadMixin(rq.Worker):
+    """Release the payload references of the jobs that finished.
+
+    References are released once rq has committed the success of a job, so a job
+    that is never marked as finished keeps its payload and can be requeued.
+    """
+
+    def handle_job_success(
+        self, job: Job, queue: rq.Queue, started_job_registry: StartedJobRegistry
+    ) -> None:
+        super().handle_job_success(job, queue, started_job_registry)
+        if getattr(job, "payload_ref", None):
+            release(self.connection, [job.id])
+            cast(PayloadJob, job).payload_ref = None
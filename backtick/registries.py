@@ -0,0 +1,412 @@
+"""Page through the job registries of the queues.
+
+Registries are sorted sets of job ids that can hold millions of entries, so they are
+read in windows that start after a cursor, the score and id of the last job of the
+previous page. A page costs a single script call that reads at most `limit` entries
+per sorted set and the fields of the jobs on the page, whatever the registry size.
+
+The scheduled jobs of the sharded scheduler are listed along rq's scheduled job
+registry, merged by time.
+"""
+
+import base64
+import datetime
+import enum
+import math
+import zlib
+from collections.abc import Iterator
+from typing import Any
+
+import redis
+import redis.asyncio
+from rq.job import Job
+from rq.registry import (
+    CanceledJobRegistry,
+    FailedJobRegistry,
+    FinishedJobRegistry,
+    ScheduledJobRegistry,
+    StartedJobRegistry,
+)
+from rq.utils import as_text
+
+from backtick import dto, scheduler, settings, utils
+
+
+class Registry(str, enum.Enum):
+    """The registries that can be listed, and what their scores are."""
+
+    # When the jobs are due.
+    SCHEDULED = "scheduled"
+    # When the jobs time out.
+    STARTED = "started"
+    # When the jobs expire.
+    FAILED = "failed"
+    FINISHED = "finished"
+    # When the jobs were cancelled.
+    CANCELED = "canceled"
+
+
+_KEY_TEMPLATES = {
+    Registry.SCHEDULED: ScheduledJobRegistry.key_template,
+    Registry.STARTED: StartedJobRegistry.key_template,
+    Registry.FAILED: FailedJobRegistry.key_template,
+    Registry.FINISHED: FinishedJobRegistry.key_template,
+    Registry.CANCELED: CanceledJobRegistry.key_template,
+}
+
+# The job hash fields returned along every job of a page.
+_JOB_FIELDS = ("status", "created_at", "enqueued_at", "started_at", "ended_at", "data")
+
+# Returns a flag telling whether there are more jobs, followed by the id, score and
+# `_JOB_FIELDS` of up to ARGV[5] jobs after the cursor, ordered by score and id like
+# the sorted sets. The first ARGV[7] keys are sorted sets of job ids and the others
+# are shards of the sharded scheduler, whose time buckets are walked in order.
+# KEYS: the sorted sets and shard keys.
+# ARGV: the cursor score and id, empty for the first page, the minimum and maximum
+# scores, the page size, the bucket size in seconds and the number of sorted sets.
+_PAGE_SCRIPT = f"""
+local cursor_score, cursor_id = ARGV[1], ARGV[2]
+local min, max = ARGV[3], ARGV[4]
+local limit = tonumber(ARGV[5])
+local bucket_seconds = tonumber(ARGV[6])
+local sorted_sets = tonumber(ARGV[7])
+local max_score = tonumber(max)
+
+-- Compares the ids byte by byte, like the sorted sets do.
+local function before(a_score, a_id, b_score, b_id)
+    if a_score ~= b_score then
+        return a_score < b_score
+    end
+    for i = 1, math.min(#a_id, #b_id) do
+        local a, b = string.byte(a_id, i), string.byte(b_id, i)
+        if a ~= b then
+            return a < b
+        end
+    end
+    return #a_id < #b_id
+end
+
+-- The rank of the first entry after the cursor, found among the entries with the
+-- cursor score, so that cursors of removed jobs and ties across keys work.
+local function first_rank(key)
+    if cursor_id == "" then
+        return redis.call("ZCOUNT", key, "-inf", "(" .. min)
+    end
+    local score = tonumber(cursor_score)
+    local low = redis.call("ZCOUNT", key, "-inf", "(" .. cursor_score)
+    local high = redis.call("ZCOUNT", key, "-inf", cursor_score)
+    while low < high do
+        local middle = math.floor((low + high) / 2)
+        local job_id = redis.call("ZRANGE", key, middle, middle)[1]
+        if before(score, cursor_id, score, job_id) then
+            high = middle
+        else
+            low = middle + 1
+        end
+    end
+    return low
+end
+
+local entries = {{}}
+local function collect(key, wanted)
+    local rank = first_rank(key)
+    local found = redis.call("ZRANGE", key, rank, rank + wanted - 1, "WITHSCORES")
+    local collected = 0
+    for i = 1, #found, 2 do
+        if tonumber(found[i + 1]) > max_score then
+            break
+        end
+        entries[#entries + 1] = {{found[i], found[i + 1]}}
+        collected = collected + 1
+    end
+    return collected
+end
+
+-- One more than the page size tells whether there is a next page.
+for i = 1, sorted_sets do
+    collect(KEYS[i], limit + 1)
+end
+local start = tonumber(cursor_id == "" and min or cursor_score)
+local first_bucket = start == -math.huge and "-inf"
+    or math.floor(start / bucket_seconds) * bucket_seconds
+for i = sorted_sets + 1, #KEYS do
+    local wanted = limit + 1
+    for _, bucket in ipairs(redis.call("ZRANGEBYSCORE", KEYS[i], first_bucket, max)) do
+        wanted = wanted - collect(KEYS[i] .. ":" .. bucket, wanted)
+        if wanted <= 0 then
+            break
+        end
+    end
+end
+
+table.sort(entries, function(a, b)
+    return before(tonumber(a[2]), a[1], tonumber(b[2]), b[1])
+end)
+
+local page = {{#entries > limit and 1 or 0}}
+for i = 1, math.min(#entries, limit) do
+    local job_key = "{Job.redis_job_namespace_prefix}" .. entries[i][1]
+    page[#page + 1] = entries[i][1]
+    page[#page + 1] = entries[i][2]
+    page[#page + 1] = redis.call("HMGET", job_key, {", ".join(f'"{f}"' for f in _JOB_FIELDS)})
+end
+return page
+"""
+
+
+def encode_cursor(score: str, job_id: str) -> str:
+    """Encode the position of a job in a registry as an opaque cursor.
+
+    Args:
+        score (str): The score of the job, as returned by Redis.
+        job_id (str): The job id.
+
+    Returns:
+        str: The cursor.
+    """
+
+    return base64.urlsafe_b64encode(f"{score}:{job_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    """Decode a cursor returned by `list_registry_async`.
+
+    Args:
+        cursor (str): The cursor.
+
+    Raises:
+        ValueError: If the cursor is invalid.
+
+    Returns:
+        tuple[str, str]: The score and the id of the last job of the previous page.
+    """
+
+    try:
+        score, job_id = base64.urlsafe_b64decode(cursor).decode().split(":", 1)
+        if not math.isfinite(float(score)):
+            raise ValueError
+    except ValueError:
+        raise ValueError(f"Invalid cursor {cursor}") from None
+    return score, job_id
+
+
+def _score(dt: datetime.datetime | None, default: str) -> str:
+    """Convert a datetime into a registry score.
+
+    Args:
+        dt (datetime.datetime | None): The datetime, naive ones are taken as UTC.
+        default (str): The score to use when there's no datetime.
+
+    Returns:
+        str: The score.
+    """
+
+    if dt is None:
+        return default
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return repr(dt.timestamp())
+
+
+def _func_name(data: bytes | None) -> str | None:
+    """Get the name of the function a job runs from its serialized data.
+
+    Args:
+        data (bytes | None): The `data` field of the job hash.
+
+    Returns:
+        str | None: The fully qualified name of the function.
+    """
+
+    if not data:
+        return None
+    try:
+        data = zlib.decompress(data)
+    except zlib.error:
+        pass
+    try:
+        func_name, *_ = utils.get_serializer().loads(data)
+    except Exception:
+        return None
+    return func_name
+
+
+def _registry_job(job_id: bytes, score: bytes, fields: list[Any]) -> dto.RegistryJobDTO:
+    """Build a job of a page from its id, score and `_JOB_FIELDS`.
+
+    Args:
+        job_id (bytes): The job id.
+        score (bytes): The registry score of the job.
+        fields (list[Any]): The job fields.
+
+    Returns:
+        dto.RegistryJobDTO: The job.
+    """
+
+    status, created_at, enqueued_at, started_at, ended_at, data = fields
+    task_names = {path: name for name, path in settings.BACKTICK_TASKS.items()}
+    func_name = _func_name(data)
+    at = float(score)
+
+    return dto.RegistryJobDTO(
+        task_id=as_text(job_id),
+        task_name=task_names.get(func_name) if func_name else None,
+        status=as_text(status) if status else None,
+        at=(
+            datetime.datetime.fromtimestamp(at, tz=datetime.timezone.utc)
+            if abs(at) != float("inf")
+            else None
+        ),
+        created_at=utils.parse_date(created_at),
+        enqueued_at=utils.parse_date(enqueued_at),
+        started_at=utils.parse_date(started_at),
+        ended_at=utils.parse_date(ended_at),
+    )
+
+
+def _page_params(
+    queue_name: str,
+    registry: Registry,
+    cursor_score: str,
+    cursor_id: str,
+    after: datetime.datetime | None,
+    before: datetime.datetime | None,
+    limit: int,
+) -> tuple[list[str], list[Any]]:
+    """Get the keys and arguments of `_PAGE_SCRIPT` for a page of a registry.
+
+    Args:
+        queue_name (str): The name of the queue.
+        registry (Registry): The registry.
+        cursor_score (str): The score of the last job of the previous page, empty
+        for the first page.
+        cursor_id (str): The id of the last job of the previous page, empty for the
+        first page.
+        after (datetime.datetime | None): The minimum score.
+        before (datetime.datetime | None): The maximum score.
+        limit (int): The number of jobs read per page.
+
+    Returns:
+        tuple[list[str], list[Any]]: The keys and arguments.
+    """
+
+    keys = [_KEY_TEMPLATES[registry].format(queue_name)]
+    sorted_sets = len(keys)
+    if registry == Registry.SCHEDULED:
+        keys += [
+            scheduler.shard_key(queue_name, shard)
+            for shard in range(settings.BACKTICK_SCHEDULER_SHARDS)
+        ]
+    return keys, [
+        cursor_score,
+        cursor_id,
+        _score(after, "-inf"),
+        _score(before, "+inf"),
+        limit,
+        settings.BACKTICK_SCHEDULER_BUCKET_SECONDS,
+        sorted_sets,
+    ]
+
+
+def iter_registry(
+    connection: redis.Redis,
+    *,
+    queue_name: str,
+    registry: Registry,
+    limit: int = 100,
+    after: datetime.datetime | None = None,
+    before: datetime.datetime | None = None,
+) -> Iterator[list[tuple[str, float, str | None]]]:
+    """Iterate over the pages of the jobs of a registry, ordered by score.
+
+    Every page starts after the last job of the previous one, so the jobs of a page
+    can be removed before reading the next one.
+
+    Args:
+        connection (redis.Redis): The redis connection.
+        queue_name (str): The name of the queue.
+        registry (Registry): The registry.
+        limit (int): The number of jobs read per page.
+        after (datetime.datetime | None): Only return the jobs scored at or after this
+        datetime.
+        before (datetime.datetime | None): Only return the jobs scored at or before
+        this datetime.
+
+    Yields:
+        list[tuple[str, float, str | None]]: The ids and scores of the jobs of a page,
+        along with the fully qualified names of the functions they run.
+    """
+
+    read_page = connection.register_script(_PAGE_SCRIPT)
+    cursor_score, cursor_id = "", ""
+    while True:
+        keys, args = _page_params(
+            queue_name, registry, cursor_score, cursor_id, after, before, limit
+        )
+        more, *page = read_page(keys=keys, args=args)
+        if not page:
+            return
+        yield [
+            (as_text(job_id), float(score), _func_name(fields[-1]))
+            for job_id, score, fields in zip(
+                page[::3], page[1::3], page[2::3], strict=True
+            )
+        ]
+        if not more:
+            return
+        cursor_score, cursor_id = as_text(page[-2]), as_text(page[-3])
+
+
+async def list_registry_async(
+    *,
+    queue_name: str,
+    registry: Registry,
+    cursor: str | None = None,
+    limit: int = 100,
+    task_name: str | None = None,
+    after: datetime.datetime | None = None,
+    before: datetime.datetime | None = None,
+) -> dto.RegistryPageDTO:
+    """Get a page of the jobs of a registry, ordered by score.
+
+    Every page reads a window of `limit` jobs after the cursor. The jobs of other
+    tasks are left out of the page when filtering by task name, so pages can hold
+    fewer jobs, or none, and still have a next cursor.
+
+    Args:
+        queue_name (str): The name of the queue.
+        registry (Registry): The registry.
+        cursor (str | None): The `next_cursor` of the previous page, or None for the
+        first page.
+        limit (int): The number of jobs read per page.
+        task_name (str | None): Only return the jobs of this task.
+        after (datetime.datetime | None): Only return the jobs scored at or after this
+        datetime.
+        before (datetime.datetime | None): Only return the jobs scored at or before
+        this datetime.
+
+    Raises:
+        ValueError: If the cursor is invalid.
+
+    Returns:
+        dto.RegistryPageDTO: The page.
+    """
+
+    cursor_score, cursor_id = decode_cursor(cursor) if cursor else ("", "")
+    connection: redis.asyncio.Redis = utils.get_async_redis()
+    keys, args = _page_params(
+        queue_name, registry, cursor_score, cursor_id, after, before, limit
+    )
+    more, *page = await connection.register_script(_PAGE_SCRIPT)(keys=keys, args=args)
+
+    results = [
+        _registry_job(job_id, score, fields)
+        for job_id, score, fields in zip(page[::3], page[1::3], page[2::3], strict=True)
+    ]
+    next_cursor = (
+        encode_cursor(as_text(page[-2]), results[-1].task_id) if more else None
+    )
+    if task_name:
+        results = [job for job in results if job.task_name == task_name]
+
+    return dto.RegistryPageDTO(results=results, next_cursor=next_cursor)
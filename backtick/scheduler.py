@@ -0,0 +1,517 @@
+"""Sharded scheduler for the jobs scheduled through backtick.
+
+rq keeps every scheduled job of a queue in a single sorted set that a single
+scheduler polls. When `settings.BACKTICK_SCHEDULER_SHARDS` is set, backtick spreads
+its scheduled jobs over `BACKTICK_SCHEDULER_SHARDS` hash slots per queue, and every
+slot over time buckets of `BACKTICK_SCHEDULER_BUCKET_SECONDS`:
+
+    backtick:scheduled:<queue>:<shard>            buckets of the shard by start time
+    backtick:scheduled:<queue>:<shard>:<bucket>   job ids of the bucket by timestamp
+
+Any number of scheduler processes share the shards through leases, and only walk the
+buckets that have started, so moving the due jobs costs O(due jobs). Jobs are scored
+with sub-second timestamps, and a scheduler sleeps until the earliest due job of its
+shards instead of polling on a fixed interval.
+
+Run a scheduler with `python -m backtick.scheduler`, or along a worker with
+`python -m backtick.worker --with-sharded-scheduler`.
+"""
+
+import argparse
+import collections
+import logging
+import math
+import os
+import random
+import signal
+import socket
+import statistics
+import time
+import uuid
+import zlib
+from collections.abc import Iterable, Iterator
+from types import FrameType
+
+import redis
+import redis.asyncio
+import rq
+from rq.job import JobStatus
+from rq.utils import as_text, utcformat, utcnow
+
+from backtick import metrics, settings, utils
+
+KEY_PREFIX = "backtick:scheduled:"
+LEASE_KEY_PREFIX = "backtick:scheduler:lease:"
+
+# Heartbeats of the running schedulers, used to share the shards between them.
+SCHEDULERS_KEY = "backtick:schedulers"
+
+# Wakes the schedulers up when a job is scheduled before their next pass.
+WAKEUP_CHANNEL = "backtick:scheduler:wakeup"
+
+# Number of recent lateness measurements kept by a scheduler.
+LATENESS_WINDOW = 10_000
+
+# The job hash field holding how late a job was moved to its queue, in milliseconds.
+LATENESS_FIELD = "backtick_lateness_ms"
+
+# Moves up to ARGV[2] due jobs of a shard to their queue and returns how late each of
+# them was, in milliseconds. Jobs that aren't scheduled anymore, e.g. cancelled or
+# deleted ones, are dropped. Buckets that have ended and are empty are removed from
+# the shard.
+# KEYS: the shard key and the queue key.
+# ARGV: the current timestamp, the maximum number of jobs to move, the enqueued at
+# datetime and the bucket size in seconds.
+_MOVE_DUE_JOBS_SCRIPT = f"""
+local now = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local moved = 0
+local lateness = {{}}
+local buckets = redis.call("ZRANGEBYSCORE", KEYS[1], "-inf", ARGV[1])
+for _, bucket in ipairs(buckets) do
+    local bucket_key = KEYS[1] .. ":" .. bucket
+    local job_ids = redis.call(
+        "ZRANGEBYSCORE", bucket_key, "-inf", ARGV[1], "WITHSCORES", "LIMIT", 0, limit - moved
+    )
+    for i = 1, #job_ids, 2 do
+        local job_id = job_ids[i]
+        redis.call("ZREM", bucket_key, job_id)
+        local job_key = "{rq.job.Job.redis_job_namespace_prefix}" .. job_id
+        local status, at_front, ttl = unpack(
+            redis.call("HMGET", job_key, "status", "enqueue_at_front", "ttl")
+        )
+        if status == "{JobStatus.SCHEDULED.value}" then
+            local late = math.floor((now - tonumber(job_ids[i + 1])) * 1000)
+            redis.call(
+                "HSET", job_key,
+                "status", "{JobStatus.QUEUED.value}",
+                "enqueued_at", ARGV[3],
+                "{LATENESS_FIELD}", late
+            )
+            if ttl and tonumber(ttl) and tonumber(ttl) > 0 then
+                redis.call("EXPIRE", job_key, ttl)
+            end
+            if at_front == "1" then
+                redis.call("LPUSH", KEYS[2], job_id)
+            else
+                redis.call("RPUSH", KEYS[2], job_id)
+            end
+            moved = moved + 1
+            lateness[moved] = late
+        end
+    end
+    local bucket_end = (tonumber(bucket) + 1) * tonumber(ARGV[4])
+    if bucket_end <= now and redis.call("ZCARD", bucket_key) == 0 then
+        redis.call("ZREM", KEYS[1], bucket)
+    end
+    if moved >= limit then
+        break
+    end
+end
+return lateness
+"""
+
+# Returns the score of the earliest job of a shard.
+# KEYS: the shard key.
+_NEXT_DUE_SCRIPT = """
+local buckets = redis.call("ZRANGE", KEYS[1], 0, -1)
+for _, bucket in ipairs(buckets) do
+    local job = redis.call("ZRANGE", KEYS[1] .. ":" .. bucket, 0, 0, "WITHSCORES")
+    if job[2] then
+        return job[2]
+    end
+end
+return false
+"""
+
+# Extends a lease if it's still held by ARGV[1] for ARGV[2] milliseconds.
+_RENEW_LEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("PEXPIRE", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# Deletes a lease if it's still held by ARGV[1].
+_RELEASE_LEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+def shard_for(job_id: str) -> int:
+    """Get the shard a job is scheduled in.
+
+    Args:
+        job_id (str): The job id.
+
+    Returns:
+        int: The shard, from 0 to `settings.BACKTICK_SCHEDULER_SHARDS - 1`.
+    """
+
+    return zlib.crc32(job_id.encode()) % settings.BACKTICK_SCHEDULER_SHARDS
+
+
+def shard_key(queue_name: str, shard: int) -> str:
+    """Get the key of the sorted set of the buckets of a shard.
+
+    Args:
+        queue_name (str): The name of the queue.
+        shard (int): The shard.
+
+    Returns:
+        str: The shard key.
+    """
+
+    return f"{KEY_PREFIX}{queue_name}:{shard}"
+
+
+def lease_key(queue_name: str, shard: int) -> str:
+    """Get the key of the lease of a shard.
+
+    Args:
+        queue_name (str): The name of the queue.
+        shard (int): The shard.
+
+    Returns:
+        str: The lease key.
+    """
+
+    return f"{LEASE_KEY_PREFIX}{queue_name}:{shard}"
+
+
+def buffer_scheduled_job(
+    pipeline: redis.client.Pipeline | redis.asyncio.client.Pipeline,
+    queue_name: str,
+    job_id: str,
+    timestamp: float,
+) -> None:
+    """Buffer the commands that put a job in its shard and time bucket.
+
+    The schedulers are woken up when the job is due before their next pass.
+
+    Args:
+        pipeline (redis.client.Pipeline | redis.asyncio.client.Pipeline): The
+        pipeline to buffer the commands on.
+        queue_name (str): The name of the queue the job belongs to.
+        job_id (str): The job id.
+        timestamp (float): The UTC timestamp to enqueue the job at.
+
+    Returns:
+        None
+    """
+
+    bucket_seconds = settings.BACKTICK_SCHEDULER_BUCKET_SECONDS
+    bucket = int(timestamp // bucket_seconds)
+    key = shard_key(queue_name, shard_for(job_id))
+
+    # The bucket goes first so that a scheduler never drops a bucket being filled.
+    pipeline.zadd(f"{key}:{bucket}", {job_id: timestamp})
+    pipeline.zadd(key, {str(bucket): bucket * bucket_seconds})
+
+    if timestamp - time.time() < settings.BACKTICK_SCHEDULER_INTERVAL:
+        pipeline.publish(WAKEUP_CHANNEL, str(timestamp))
+
+
+def buffer_unscheduled_job(
+    pipeline: redis.client.Pipeline,
+    queue_name: str,
+    job_id: str,
+    timestamp: float,
+) -> None:
+    """Buffer the command that takes a job out of the time bucket it's due in.
+
+    Args:
+        pipeline (redis.client.Pipeline): The pipeline to buffer the command on.
+        queue_name (str): The name of the queue the job belongs to.
+        job_id (str): The job id.
+        timestamp (float): The UTC timestamp the job is due at.
+
+    Returns:
+        None
+    """
+
+    bucket = int(timestamp // settings.BACKTICK_SCHEDULER_BUCKET_SECONDS)
+    key = shard_key(queue_name, shard_for(job_id))
+    pipeline.zrem(f"{key}:{bucket}", job_id)
+
+
+def get_lateness(connection: redis.Redis, job_id: str) -> float | None:
+    """Get how late a job was moved to its queue by a sharded scheduler.
+
+    Args:
+        connection (redis.Redis): The redis connection.
+        job_id (str): The job id.
+
+    Returns:
+        float | None: The lateness in seconds, or None if the job wasn't moved yet.
+    """
+
+    lateness = connection.hget(rq.job.Job.key_for(job_id), LATENESS_FIELD)
+    return None if lateness is None else int(lateness) / 1000
+
+
+def bucket_keys(connection: redis.Redis, queue_name: str) -> Iterator[str]:
+    """Iterate over the keys of the time buckets of a queue.
+
+    Args:
+        connection (redis.Redis): The redis connection.
+        queue_name (str): The name of the queue.
+
+    Yields:
+        str: The bucket keys.
+    """
+
+    for shard in range(settings.BACKTICK_SCHEDULER_SHARDS):
+        key = shard_key(queue_name, shard)
+        for bucket in connection.zrange(key, 0, -1):
+            yield f"{key}:{as_text(bucket)}"
+
+
+class ShardedScheduler:
+    """Move the due jobs of the shards this scheduler holds a lease on.
+
+    Every scheduler takes an even share of the shards of all the queues. The leases
+    of a scheduler that stops or dies expire and are taken over by the others.
+    """
+
+    def __init__(
+        self,
+        connection: redis.Redis | None = None,
+        queue_names: Iterable[str] | None = None,
+        name: str | None = None,
+    ) -> None:
+        self.connection = connection or utils.get_redis()
+        self.queue_names = list(queue_names or settings.BACKTICK_QUEUES.values())
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+        self.shards = [
+            (queue_name, shard)
+            for queue_name in self.queue_names
+            for shard in range(settings.BACKTICK_SCHEDULER_SHARDS)
+        ]
+        self.leases: set[tuple[str, int]] = set()
+        self.stopping = False
+        self.lateness: collections.deque[float] = collections.deque(
+            maxlen=LATENESS_WINDOW
+        )
+        self._last_balanced_at = 0.0
+        self._move_due_jobs = self.connection.register_script(_MOVE_DUE_JOBS_SCRIPT)
+        self._next_due = self.connection.register_script(_NEXT_DUE_SCRIPT)
+        self._renew_lease = self.connection.register_script(_RENEW_LEASE_SCRIPT)
+        self._release_lease = self.connection.register_script(_RELEASE_LEASE_SCRIPT)
+
+    @property
+    def lease_ttl_ms(self) -> int:
+        return settings.BACKTICK_SCHEDULER_LEASE_TTL * 1000
+
+    def heartbeat(self) -> int:
+        """Record that this scheduler is alive and count the live schedulers.
+
+        Returns:
+            int: The number of live schedulers, this one included.
+        """
+
+        now = time.time()
+        with self.connection.pipeline() as pipeline:
+            pipeline.zadd(SCHEDULERS_KEY, {self.name: now})
+            pipeline.zremrangebyscore(
+                SCHEDULERS_KEY, "-inf", now - settings.BACKTICK_SCHEDULER_LEASE_TTL
+            )
+            pipeline.zcard(SCHEDULERS_KEY)
+            *_, alive = pipeline.execute()
+        return alive
+
+    def balance_leases(self) -> None:
+        """Renew the held leases and take or give away shards to match the fair share.
+
+        Returns:
+            None
+        """
+
+        target = math.ceil(len(self.shards) / self.heartbeat())
+
+        leases = list(self.leases)
+        with self.connection.pipeline() as pipeline:
+            for lease in leases:
+                self._renew_lease(
+                    keys=[lease_key(*lease)],
+                    args=[self.name, self.lease_ttl_ms],
+                    client=pipeline,
+                )
+            renewed = pipeline.execute()
+
+        for lease, ok in zip(leases, renewed, strict=True):
+            if not ok:
+                queue_name, shard = lease
+                logging.warning("Lost the lease of shard %s of %s", shard, queue_name)
+                self.leases.discard(lease)
+
+        while len(self.leases) > target:
+            self.release_lease(self.leases.pop())
+
+        free = [shard for shard in self.shards if shard not in self.leases]
+        random.shuffle(free)
+        for lease in free:
+            if len(self.leases) >= target:
+                break
+            if self.connection.set(
+                lease_key(*lease), self.name, nx=True, px=self.lease_ttl_ms
+            ):
+                self.leases.add(lease)
+
+    def release_lease(self, lease: tuple[str, int]) -> None:
+        """Give away the lease of a shard.
+
+        Args:
+            lease (tuple[str, int]): The queue name and the shard.
+
+        Returns:
+            None
+        """
+
+        self._release_lease(keys=[lease_key(*lease)], args=[self.name])
+        self.leases.discard(lease)
+
+    def move_due_jobs(self) -> int:
+        """Move the due jobs of the held shards to their queues.
+
+        How late every job was moved is recorded on the job, in `lateness` and in
+        `metrics.SCHEDULER_LATENESS_SECONDS`.
+
+        Returns:
+            int: The number of jobs moved.
+        """
+
+        chunk_size = settings.BACKTICK_PIPELINE_CHUNK_SIZE
+        lateness: list[float] = []
+
+        for queue_name, shard in sorted(self.leases):
+            queue_key = rq.Queue(queue_name, connection=self.connection).key
+            while True:
+                moved = self._move_due_jobs(
+                    keys=[shard_key(queue_name, shard), queue_key],
+                    args=[
+                        time.time(),
+                        chunk_size,
+                        utcformat(utcnow()),
+                        settings.BACKTICK_SCHEDULER_BUCKET_SECONDS,
+                    ],
+                )
+                histogram = metrics.SCHEDULER_LATENESS_SECONDS.labels(queue_name)
+                for ms in moved:
+                    lateness.append(ms / 1000)
+                    histogram.observe(ms / 1000)
+                if len(moved) < chunk_size:
+                    break
+
+        if lateness:
+            self.lateness.extend(lateness)
+            logging.info(
+                "Moved %d due jobs, lateness mean %.0f ms, max %.0f ms",
+                len(lateness),
+                statistics.fmean(lateness) * 1000,
+                max(lateness) * 1000,
+            )
+        return len(lateness)
+
+    def next_due_at(self) -> float | None:
+        """Get the timestamp of the earliest job of the held shards.
+
+        Returns:
+            float | None: The timestamp, or None if the shards are empty.
+        """
+
+        leases = sorted(self.leases)
+        with self.connection.pipeline() as pipeline:
+            for queue_name, shard in leases:
+                self._next_due(keys=[shard_key(queue_name, shard)], client=pipeline)
+            scores = [float(score) for score in pipeline.execute() if score]
+        return min(scores, default=None)
+
+    def wait(self, wakeup: redis.client.PubSub) -> None:
+        """Sleep until the earliest job of the held shards is due.
+
+        The sleep is cut short when a job due sooner is scheduled, and never lasts
+        longer than `settings.BACKTICK_SCHEDULER_INTERVAL` so that the leases are
+        renewed in time.
+
+        Args:
+            wakeup (redis.client.PubSub): A pubsub subscribed to `WAKEUP_CHANNEL`.
+
+        Returns:
+            None
+        """
+
+        timeout: float = settings.BACKTICK_SCHEDULER_INTERVAL
+        if (next_due_at := self.next_due_at()) is not None:
+            timeout = min(max(next_due_at - time.time(), 0), timeout)
+
+        if timeout and wakeup.get_message(timeout=timeout):
+            # Drain the other wakeups, the next pass handles all of them.
+            while wakeup.get_message():
+                pass
+
+    def request_stop(self, signum: int, frame: FrameType | None) -> None:
+        logging.info("Received signal %s, stopping the scheduler", signum)
+        self.stopping = True
+
+    def stop(self) -> None:
+        """Give away all the leases and unregister this scheduler.
+
+        Returns:
+            None
+        """
+
+        for lease in list(self.leases):
+            self.release_lease(lease)
+        self.connection.zrem(SCHEDULERS_KEY, self.name)
+
+    def run(self) -> None:
+        """Move the due jobs as they come due until SIGINT or SIGTERM is received."""
+
+        signal.signal(signal.SIGINT, self.request_stop)
+        signal.signal(signal.SIGTERM, self.request_stop)
+
+        wakeup = self.connection.pubsub(ignore_subscribe_messages=True)
+        wakeup.subscribe(WAKEUP_CHANNEL)
+
+        logging.info("Starting scheduler %s", self.name)
+        try:
+            while not self.stopping:
+                now = time.monotonic()
+                if now - self._last_balanced_at >= settings.BACKTICK_SCHEDULER_INTERVAL:
+                    self.balance_leases()
+                    self._last_balanced_at = now
+                self.move_due_jobs()
+                self.wait(wakeup)
+        finally:
+            wakeup.close()
+            self.stop()
+            logging.info("Scheduler %s stopped", self.name)
+
+
+def main() -> None:
+    """Run the scheduler."""
+
+    parser = argparse.ArgumentParser()
+
+    # Accept a list of queues to schedule the jobs of.
+    parser.add_argument(
+        "--queue-names",
+        type=str,
+        nargs="+",
+        help="The name of the queue to schedule the jobs of.",
+    )
+
+    args = parser.parse_args()
+
+    if not settings.BACKTICK_SCHEDULER_SHARDS:
+        parser.error("Set BACKTICK_SCHEDULER_SHARDS to use the sharded scheduler.")
+
+    ShardedScheduler(queue_names=args.queue_names).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""Compact job serializers.
+
+rq pickles the func name, args, kwargs, meta and results of every job. The
+`CompactSerializer` encodes them with JSON or msgpack instead and compresses the
+payloads above a size threshold. Every payload starts with a header naming its format
+and codec, so any `CompactSerializer` reads the payloads of every other one, as well
+as rq's plain pickle payloads. Workers can then run jobs written by any serializer.
+
+Configure the serializers in `settings.BACKTICK_SERIALIZERS` and pick one per task
+with `@utils.task(serializer="compact")`.
+"""
+
+import functools
+import importlib
+import importlib.util
+import json
+import logging
+import pickle
+import zlib
+from collections.abc import Callable
+from types import ModuleType
+from typing import Any
+
+# Marks the payloads written with a header, followed by the format and codec ids.
+MAGIC = b"BT"
+
+# The ids of the formats and codecs in the payload header. Never reuse an id.
+FORMATS = {"pickle": 0, "json": 1, "msgpack": 2}
+CODECS = {"none": 0, "zlib": 1, "zstd": 2, "lz4": 3}
+
+# The optional package backing each format and codec, and what to use without it.
+_OPTIONAL_PACKAGES = {
+    "json": ("orjson", "json"),
+    "msgpack": ("msgpack", "json"),
+    "zstd": ("zstandard", "zlib"),
+    "lz4": ("lz4", "zlib"),
+}
+
+
+def _optional_module(name: str) -> ModuleType | None:
+    """Import an optional package if it's installed.
+
+    Args:
+        name (str): The name of the package.
+
+    Returns:
+        ModuleType | None: The module, or None if the package isn't installed.
+    """
+
+    if importlib.util.find_spec(name) is None:
+        return None
+    return importlib.import_module(name)
+
+
+def _resolve(name: str) -> str:
+    """Fall back to the stdlib for a format or codec whose package is missing.
+
+    Args:
+        name (str): The name of the format or codec.
+
+    Returns:
+        str: The name of the format or codec to use.
+    """
+
+    package, fallback = _OPTIONAL_PACKAGES.get(name, (None, name))
+    if package is None or importlib.util.find_spec(package) is not None:
+        return name
+    # JSON only needs orjson for speed, the stdlib encodes the same payloads.
+    if name != "json":
+        logging.warning("%s isn't installed, using %s instead", package, fallback)
+    return fallback
+
+
+@functools.cache
+def _encoders(format: str) -> tuple[Callable[[Any], bytes], Callable[[bytes], Any]]:
+    """Get the encode and decode functions of a format.
+
+    Args:
+        format (str): The name of the format.
+
+    Returns:
+        tuple[Callable[[Any], bytes], Callable[[bytes], Any]]: The functions.
+    """
+
+    if format == "pickle":
+        return (
+            lambda obj: pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL),
+            pickle.loads,
+        )
+
+    if format == "msgpack" and (msgpack := _optional_module("msgpack")):
+        return (
+            lambda obj: msgpack.packb(obj, use_bin_type=True),
+            lambda data: msgpack.unpackb(data, raw=False, strict_map_key=False),
+        )
+
+    if format == "json" and (orjson := _optional_module("orjson")):
+        return orjson.dumps, orjson.loads
+
+    if format == "json":
+        return (
+            lambda obj: json.dumps(obj, separators=(",", ":")).encode(),
+            json.loads,
+        )
+
+    raise ValueError(f"Serializer format {format} isn't available")
+
+
+@functools.cache
+def _codecs(codec: str) -> tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]:
+    """Get the compress and decompress functions of a codec.
+
+    Args:
+        codec (str): The name of the codec.
+
+    Returns:
+        tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]: The functions.
+    """
+
+    if codec == "none":
+        return (lambda data: data), (lambda data: data)
+
+    if codec == "zlib":
+        return zlib.compress, zlib.decompress
+
+    if codec == "zstd" and (zstandard := _optional_module("zstandard")):
+        return (
+            zstandard.ZstdCompressor().compress,
+            zstandard.ZstdDecompressor().decompress,
+        )
+
+    if codec == "lz4" and _optional_module("lz4"):
+        lz4_frame = importlib.import_module("lz4.frame")
+        return lz4_frame.compress, lz4_frame.decompress
+
+    raise ValueError(f"Compression codec {codec} isn't available")
+
+
+_FORMAT_NAMES = {id_: name for name, id_ in FORMATS.items()}
+_CODEC_NAMES = {id_: name for name, id_ in CODECS.items()}
+
+
+class CompactSerializer:
+    """An rq serializer that writes JSON or msgpack with optional compression.
+
+    msgpack falls back to JSON, and zstd or lz4 fall back to zlib, when their
+    package isn't installed. Plain pickle payloads are written without a header, so
+    the default `CompactSerializer()` writes the same bytes as rq's default
+    serializer while reading every format.
+    """
+
+    def __init__(
+        self,
+        format: str = "pickle",
+        compression: str | None = None,
+        compression_threshold: int = 1024,
+    ) -> None:
+        if format not in FORMATS:
+            raise ValueError(f"Unknown serializer format {format}")
+        if (compression or "none") not in CODECS:
+            raise ValueError(f"Unknown compression codec {compression}")
+
+        self.format = _resolve(format)
+        self.compression = _resolve(compression or "none")
+        self.compression_threshold = compression_threshold
+        self._encode, _ = _encoders(self.format)
+        self._compress, _ = _codecs(self.compression)
+
+    def __repr__(self) -> str:
+        return (
+            f"CompactSerializer(format={self.format!r}, "
+            f"compression={self.compression!r})"
+        )
+
+    def dumps(self, obj: Any) -> bytes:
+        """Serialize an object.
+
+        Args:
+            obj (Any): The object.
+
+        Returns:
+            bytes: The payload.
+        """
+
+        payload = self._encode(obj)
+        codec = "none"
+        if self.compression != "none" and len(payload) > self.compression_threshold:
+            payload = self._compress(payload)
+            codec = self.compression
+
+        if self.format == "pickle" and codec == "none":
+            return payload
+        return MAGIC + bytes((FORMATS[self.format], CODECS[codec])) + payload
+
+    def loads(self, data: bytes) -> Any:
+        """Deserialize a payload written by any `CompactSerializer` or by rq.
+
+        Args:
+            data (bytes): The payload.
+
+        Returns:
+            Any: The object.
+        """
+
+        if not data.startswith(MAGIC):
+            return pickle.loads(data)
+
+        _, decode = _encoders(_FORMAT_NAMES[data[2]])
+        _, decompress = _codecs(_CODEC_NAMES[data[3]])
+        return decode(decompress(data[4:]))
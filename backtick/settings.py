@@ -1,4 +1,5 @@
 import os
+from typing import Any
 
 import dotenv
 
@@ -9,15 +10,160 @@ if not dotenv.load_dotenv(".env"):  # pragma: no cover
 BACKTICK_REDIS_URL = os.environ["BACKTICK_REDIS_URL"]
 BACKTICK_LOG_LEVEL = os.environ["BACKTICK_LOG_LEVEL"]
 
+# Named Redis connections. Tasks refer to them by name, as in
+# `@utils.task(connection="default")`, and every process builds its own pools.
+# Keep `socket_timeout` unset or above rq's dequeue timeout since workers block on
+# BLPOP.
+BACKTICK_REDIS_CONNECTIONS: dict[str, dict[str, Any]] = {
+    "default": {
+        "url": BACKTICK_REDIS_URL,
+        "max_connections": 64,
+        "blocking": True,
+        "blocking_timeout": 5,
+        "socket_timeout": None,
+        "socket_connect_timeout": 5,
+        "socket_keepalive": True,
+        "health_check_interval": 30,
+    },
+}
+
+
+# Named HTTP clients for the tasks, e.g. `utils.get_http_client("default")`. Clients
+# are built lazily and reused by all the jobs a worker process or work horse runs.
+# HTTP/2 is only used when the `h2` package is installed. `max_connections_per_host`
+# caps the concurrent requests to a single host on top of the pool wide limits.
+BACKTICK_HTTP_CLIENTS: dict[str, dict[str, Any]] = {
+    "default": {
+        "http2": True,
+        "timeout": 10,
+        "max_connections": 100,
+        "max_keepalive_connections": 20,
+        "keepalive_expiry": 30,
+        "max_connections_per_host": 10,
+    },
+}
+
+
+# Named job serializers, picked per task with `@utils.task(serializer="compact")`.
+# `format` is "pickle", "json" or "msgpack" and `compression` is None, "zlib", "zstd"
+# or "lz4", applied to the payloads larger than `compression_threshold` bytes.
+# msgpack falls back to JSON, and zstd or lz4 to zlib, when their package isn't
+# installed. Tasks without a serializer keep rq's pickle format.
+BACKTICK_SERIALIZERS: dict[str, dict[str, Any]] = {
+    "compact": {
+        "format": "msgpack",
+        "compression": "zstd",
+        "compression_threshold": 1024,
+    },
+}
 
 BACKTICK_TASKS = {
     "do_something": "backtick.tasks.do_something",
     "raise_exception": "backtick.tasks.raise_exception",
     "raise_exception_again": "backtick.tasks.raise_exception_again",
     "make_request": "backtick.tasks.make_request",
+    "make_request_async": "backtick.tasks.make_request_async",
 }
 
 BACKTICK_QUEUES = {
     "default": "default",
     "another": "another",
 }
+
+# Maximum number of jobs written to Redis in a single pipeline round trip.
+BACKTICK_PIPELINE_CHUNK_SIZE = 500
+
+# Maximum number of schedule requests accepted by a single POST /schedule/batch call.
+BACKTICK_BATCH_MAX_SIZE = 1000
+
+# Maximum number of task ids cancelled by a single server side script call.
+BACKTICK_CANCEL_CHUNK_SIZE = 1000
+
+# Number of failed jobs read and requeued per pipeline by POST /requeue and
+# scripts/requeue_tasks.py.
+BACKTICK_REQUEUE_CHUNK_SIZE = 100
+
+# Maximum number of failed jobs requeued per second, so that a mass requeue after an
+# outage doesn't stampede the services the tasks call.
+BACKTICK_REQUEUE_RATE = 100
+
+# Maximum number of failed jobs requeued by a single POST /requeue call.
+BACKTICK_REQUEUE_MAX_TASKS = 1000
+
+# Maximum number of task ids accepted by a single GET /tasks call.
+BACKTICK_STATUS_MAX_TASKS = 500
+
+# Seconds a task status is cached by the API process, and by clients through the
+# Cache-Control header. Dashboards polling the same tasks then share the Redis reads.
+BACKTICK_STATUS_CACHE_TTL = 1
+
+# Maximum number of task statuses cached per API process.
+BACKTICK_STATUS_CACHE_SIZE = 10_000
+
+# Maximum number of jobs read per page of the registry listings.
+BACKTICK_REGISTRY_MAX_PAGE_SIZE = 1000
+
+# Seconds between two keep-alive comments on an idle GET /tasks/events stream.
+BACKTICK_EVENTS_HEARTBEAT = 15
+
+# Maximum number of events buffered for a GET /tasks/events client. The streams of the
+# clients that fall further behind are closed, and they have to reconnect.
+BACKTICK_EVENTS_BUFFER_SIZE = 1000
+
+# Port `backtick.worker` serves the Prometheus metrics of the workers on, or None to
+# not serve them. Set PROMETHEUS_MULTIPROC_DIR to sum up the metrics of all the
+# workers started with --concurrency.
+BACKTICK_WORKER_METRICS_PORT: int | None = None
+
+# Dotted path of the class the API and the workers export their trace spans with,
+# e.g. "backtick.tracing.LoggingExporter", or None to disable tracing.
+BACKTICK_TRACING_EXPORTER: str | None = None
+
+# Rate limits of the queues, by queue name, enforced by the workers on top of the ones
+# of the tasks: the rate, e.g. "100/s", "6000/m" or "10/h", and the number of jobs
+# allowed at once, e.g. {"default": ("100/s", 20)}. Jobs over the limit are deferred.
+BACKTICK_QUEUE_RATE_LIMITS: dict[str, tuple[str, int]] = {}
+
+# Seconds the jobs of a task at its `max_concurrency` are deferred by, randomly
+# stretched up to twice as long so that they don't all come back at once.
+BACKTICK_CONCURRENCY_RETRY_DELAY = 1
+
+# Seconds a job holds its concurrency slots for past its timeout. The slots of jobs
+# whose worker died are freed once it's over.
+BACKTICK_CONCURRENCY_LEASE_GRACE = 60
+
+# Maximum number of coroutine tasks an asyncio worker runs at the same time.
+BACKTICK_ASYNC_WORKER_MAX_JOBS = 100
+
+# Number of hash slots the jobs scheduled through backtick are sharded over, per queue.
+# 0 keeps them in rq's scheduled job registry, moved by `backtick.worker
+# --with-scheduler`. Otherwise run `python -m backtick.scheduler` to move them.
+BACKTICK_SCHEDULER_SHARDS = 0
+
+# Width of the time buckets the jobs of a shard are split into.
+BACKTICK_SCHEDULER_BUCKET_SECONDS = 300
+
+# Seconds a sharded scheduler holds a shard without renewing its lease.
+BACKTICK_SCHEDULER_LEASE_TTL = 30
+
+# Maximum seconds between two passes of a sharded scheduler. Schedulers sleep until
+# the earliest due job and are woken up by the jobs scheduled sooner, so this only
+# bounds how often the leases are renewed.
+BACKTICK_SCHEDULER_INTERVAL = 1
+
+# Seconds a schedule request's idempotency key keeps returning the task ids of the
+# first request. Bounds the memory held by the keys.
+BACKTICK_IDEMPOTENCY_TTL = 24 * 60 * 60
+
+# Task kwargs larger than this many bytes, JSON encoded, are stored once per request
+# instead of in every job, and loaded by the worker right before the task runs. None
+# keeps the kwargs in the jobs.
+BACKTICK_PAYLOAD_OFFLOAD_THRESHOLD: int | None = 256 * 1024
+
+# Directory, local or shared with the workers, to store the offloaded kwargs in. None
+# stores them in Redis.
+BACKTICK_PAYLOAD_DIR: str | None = None
+
+# Seconds the offloaded kwargs of failed jobs are kept for them to be requeued. The
+# kwargs of finished and cancelled jobs are deleted right away.
+BACKTICK_PAYLOAD_TTL = 45 * 24 * 60 * 60
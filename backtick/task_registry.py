@@ -0,0 +1,167 @@
+"""Registry of the tasks declared in `settings.BACKTICK_TASKS`.
+
+The registry resolves every task once and keeps what request validation and dispatch
+need, so handling a request doesn't import modules or inspect signatures.
+"""
+
+import dataclasses
+import inspect
+from collections.abc import Callable, Iterator
+from typing import Any
+
+import redis
+from rq.queue import Queue
+
+from backtick import notifications, settings, utils
+
+_cache: dict[str, "TaskRegistry"] = {}
+
+# The `utils.task` attributes that are passed straight to rq when enqueueing.
+ENQUEUE_OPTIONS = (
+    "timeout",
+    "result_ttl",
+    "ttl",
+    "depends_on",
+    "at_front",
+    "meta",
+    "description",
+    "failure_ttl",
+    "retry",
+    "on_failure",
+    "on_success",
+)
+
+
+@dataclasses.dataclass(frozen=True)
+class TaskSpec:
+    """A resolved task along with its precomputed signature and enqueue options."""
+
+    name: str
+    func: Callable[..., Any]
+    queue: str
+    queue_class: type[Queue]
+    connection: redis.Redis | str | None
+    serializer: str | None
+    required: frozenset[str]
+    optional: frozenset[str]
+    keyword_only: bool
+    enqueue_options: dict[str, Any]
+
+    @classmethod
+    def from_func(cls, name: str, func: Callable[..., Any]) -> "TaskSpec":
+        """Build a spec from a function decorated with `utils.task`.
+
+        Args:
+            name (str): The name the task is registered with.
+            func (Callable[..., Any]): The task function.
+
+        Returns:
+            TaskSpec: The task spec.
+        """
+        params = inspect.signature(func).parameters.values()
+
+        return cls(
+            name=name,
+            func=func,
+            queue=func.queue,  # type: ignore
+            queue_class=func.queue_class,  # type: ignore
+            connection=func.connection,  # type: ignore
+            serializer=func.serializer,  # type: ignore
+            required=frozenset(
+                p.name for p in params if p.default is inspect.Parameter.empty
+            ),
+            optional=frozenset(
+                p.name for p in params if p.default is not inspect.Parameter.empty
+            ),
+            keyword_only=all(p.kind == inspect.Parameter.KEYWORD_ONLY for p in params),
+            enqueue_options={opt: getattr(func, opt) for opt in ENQUEUE_OPTIONS},
+        )
+
+    def check_kwargs(self, kwargs: dict[str, Any]) -> bool:
+        """Check that the kwargs match the task kwargs.
+
+        Args:
+            kwargs (dict[str, Any]): The kwargs to check
+
+        Returns:
+            bool: True if the kwargs match the task kwargs, False otherwise
+        """
+        keys = kwargs.keys()
+        return self.required <= keys and keys <= self.required | self.optional
+
+    def get_queue(self) -> Queue:
+        """Get the queue the task is enqueued on.
+
+        Returns:
+            Queue: The queue
+        """
+        return self.queue_class(
+            name=self.queue,
+            connection=utils.resolve_connection(self.connection),
+            serializer=utils.get_serializer(self.serializer),
+            job_class=notifications.NotifyingJob,
+        )
+
+
+class TaskRegistry:
+    """Tasks resolved from a mapping of task names to fully qualified names."""
+
+    def __init__(self, tasks: dict[str, str]) -> None:
+        self._specs: dict[str, TaskSpec] = {}
+        self._errors: dict[str, Exception] = {}
+
+        for name, qualname in tasks.items():
+            try:
+                func = utils.discover_task(qualname)
+                self._specs[name] = TaskSpec.from_func(name, func)
+            except (ImportError, AttributeError, ValueError, TypeError) as e:
+                self._errors[name] = e
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._specs or name in self._errors
+
+    def __iter__(self) -> Iterator[TaskSpec]:
+        return iter(self._specs.values())
+
+    def get(self, name: str) -> TaskSpec:
+        """Get the spec of a registered task.
+
+        Args:
+            name (str): The name the task is registered with.
+
+        Raises:
+            KeyError: If the task is not registered.
+            Exception: The error raised while resolving the task if the task is not
+            discoverable.
+
+        Returns:
+            TaskSpec: The task spec.
+        """
+        if name in self._errors:
+            raise self._errors[name]
+        return self._specs[name]
+
+
+def get_registry() -> TaskRegistry:
+    """Get the task registry, building it on first use.
+
+    Returns:
+        TaskRegistry: The task registry
+    """
+
+    if "r" not in _cache:
+        _cache["r"] = TaskRegistry(settings.BACKTICK_TASKS)
+    return _cache["r"]
+
+
+def reload_registry() -> TaskRegistry:
+    """Rebuild the task registry from `settings.BACKTICK_TASKS`.
+
+    Call this whenever the registered tasks change.
+
+    Returns:
+        TaskRegistry: The new task registry
+    """
+
+    _cache.pop("r", None)
+    return get_registry()
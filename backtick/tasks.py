@@ -4,7 +4,6 @@ import logging
 import time
 from typing import Any
 
-import httpx
 from rq import Retry
 
 from backtick import settings, utils
@@ -12,7 +11,7 @@ from backtick import settings, utils
 
 @utils.task(
     queue=settings.BACKTICK_QUEUES["default"],
-    connection=utils.get_redis(),
+    connection="default",
     timeout=60,
     result_ttl=60,
 )
@@ -32,7 +31,7 @@ def do_something(*, how_long: int) -> None:
 
 @utils.task(
     queue=settings.BACKTICK_QUEUES["default"],
-    connection=utils.get_redis(),
+    connection="default",
     retry=Retry(max=3, interval=2),
     timeout=60,
     result_ttl=60,
@@ -80,7 +79,7 @@ def on_failure_callback(*args: Any, **kwargs: Any) -> None:
 
 @utils.task(
     queue=settings.BACKTICK_QUEUES["default"],
-    connection=utils.get_redis(),
+    connection="default",
     retry=Retry(max=len(interval_with_backoff), interval=interval_with_backoff),
     timeout=60,
     result_ttl=60,
@@ -101,7 +100,7 @@ def raise_exception_again() -> None:
 
 @utils.task(
     queue=settings.BACKTICK_QUEUES["default"],
-    connection=utils.get_redis(),
+    connection="default",
     retry=Retry(max=3, interval=2),
     timeout=60,
     result_ttl=60,
@@ -117,9 +116,37 @@ def make_request(*, url: str, data: dict[str, Any] | None = None) -> None:
     Returns:
         None
     """
-    with httpx.Client() as client:
-        response = client.post(url, json=data)
-        response.raise_for_status()
-        logging.info("Making request to %s", url)
-        logging.info("Response status code: %s", response.status_code)
-        logging.info("Response text: %s", response.text)
+    # The pooled client keeps its connections alive across the jobs of a process.
+    response = utils.get_http_client().post(url, json=data)
+    response.raise_for_status()
+    logging.info("Making request to %s", url)
+    logging.info("Response status code: %s", response.status_code)
+    logging.info("Response text: %s", response.text)
+
+
+@utils.task(
+    queue=settings.BACKTICK_QUEUES["default"],
+    connection="default",
+    retry=Retry(max=3, interval=2),
+    timeout=60,
+    result_ttl=60,
+)
+async def make_request_async(*, url: str, data: dict[str, Any] | None = None) -> None:
+    """Make a request without blocking the worker.
+
+    Run an asyncio worker with `python -m backtick.worker --async-jobs` to make many
+    of these requests concurrently.
+
+    Args:
+        url (str): The URL to make a request to.
+        data (dict[str, Any], optional): The data to send with the request.
+        Defaults to None.
+
+    Returns:
+        None
+    """
+    response = await utils.get_async_http_client().post(url, json=data)
+    response.raise_for_status()
+    logging.info("Making request to %s", url)
+    logging.info("Response status code: %s", response.status_code)
+    logging.info("Response text: %s", response.text)
@@ -0,0 +1,337 @@
+"""Trace spans from the schedule requests to the execution of their jobs.
+
+Spans follow the OpenTelemetry model: a trace is a tree of timed spans, each with a
+trace id, a span id and the id of its parent. The context of the span that schedules
+a job is stored in the `traceparent` entry of the job meta, in the W3C trace context
+format, and the worker continues the trace from it with a span for the scheduler
+promotion, the wait in the queue and the execution of the job.
+
+Finished spans are handed to the exporter configured by
+`settings.BACKTICK_TRACING_EXPORTER`. Tracing is disabled without one, and spans
+then cost a single lookup.
+"""
+
+import contextlib
+import contextvars
+import dataclasses
+import datetime
+import json
+import logging
+import random
+import time
+from collections.abc import Iterator, Sequence
+from typing import Any, Protocol
+
+import rq
+from rq.job import Job
+from rq.utils import import_attribute
+
+from backtick import settings
+
+# The job meta entries holding the trace context and the time a job was scheduled at.
+TRACEPARENT = "traceparent"
+SCHEDULED_AT = "backtick_scheduled_at"
+
+
+@dataclasses.dataclass
+class Span:
+    """A timed operation of a trace."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    start_ns: int
+    end_ns: int | None = None
+    attributes: dict[str, Any] = dataclasses.field(default_factory=dict)
+    error: str | None = None
+
+    @property
+    def duration(self) -> float:
+        """The duration of the span in seconds, 0 while it's running."""
+
+        return (self.end_ns - self.start_ns) / 1e9 if self.end_ns else 0
+
+    @property
+    def traceparent(self) -> str:
+        """The W3C trace context of the span."""
+
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+class SpanExporter(Protocol):
+    """Send the finished spans somewhere."""
+
+    def export(self, spans: Sequence[Span]) -> None: ...
+
+
+class InMemoryExporter:
+    """Keep the finished spans in memory, e.g. for tests."""
+
+    def __init__(self) -> None:
+        self.spans: list[Span] = []
+
+    def export(self, spans: Sequence[Span]) -> None:
+        self.spans.extend(spans)
+
+    def clear(self) -> None:
+        self.spans.clear()
+
+
+class LoggingExporter:
+    """Log every finished span as a JSON line."""
+
+    def export(self, spans: Sequence[Span]) -> None:
+        for finished in spans:
+            logging.info(
+                "Span %s", json.dumps(dataclasses.asdict(finished), default=str)
+            )
+
+
+# The exporter resolved from the settings, or set with `set_exporter`.
+_cache: dict[str, SpanExporter | None] = {}
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    "backtick_current_span", default=None
+)
+
+
+def get_exporter() -> SpanExporter | None:
+    """Get the span exporter, None when tracing is disabled.
+
+    Returns:
+        SpanExporter | None: The exporter.
+    """
+
+    if "exporter" not in _cache:
+        path = settings.BACKTICK_TRACING_EXPORTER
+        _cache["exporter"] = import_attribute(path)() if path else None
+    return _cache["exporter"]
+
+
+def set_exporter(exporter: SpanExporter | None) -> None:
+    """Replace the span exporter of the settings.
+
+    Args:
+        exporter (SpanExporter | None): The exporter, or None to disable tracing.
+
+    Returns:
+        None
+    """
+
+    _cache["exporter"] = exporter
+
+
+def current_span() -> Span | None:
+    """Get the span of the running operation, if it's traced.
+
+    Returns:
+        Span | None: The span.
+    """
+
+    return _current_span.get()
+
+
+def _parse_traceparent(traceparent: str) -> tuple[str, str] | None:
+    """Parse a W3C trace context.
+
+    Args:
+        traceparent (str): The trace context.
+
+    Returns:
+        tuple[str, str] | None: The trace id and parent span id, or None if the
+        context is invalid.
+    """
+
+    parts = traceparent.split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+def _new_span(
+    name: str, parent: str | None, start_ns: int | None, attributes: dict[str, Any]
+) -> Span:
+    """Start a span under a trace context, or else the current span.
+
+    Args:
+        name (str): The name of the span.
+        parent (str | None): The W3C trace context of the parent span.
+        start_ns (int | None): The start time in nanoseconds, or None for now.
+        attributes (dict[str, Any]): The attributes of the span.
+
+    Returns:
+        Span: The span.
+    """
+
+    context = _parse_traceparent(parent) if parent else None
+    if context is None and (current := _current_span.get()) is not None:
+        context = current.trace_id, current.span_id
+    trace_id, parent_id = context or (f"{random.getrandbits(128):032x}", None)
+
+    return Span(
+        name=name,
+        trace_id=trace_id,
+        span_id=f"{random.getrandbits(64):016x}",
+        parent_id=parent_id,
+        start_ns=time.time_ns() if start_ns is None else start_ns,
+        attributes=attributes,
+    )
+
+
+def _export(exporter: SpanExporter, span: Span) -> None:
+    """Hand a finished span to the exporter, which must never fail the traced code.
+
+    Args:
+        exporter (SpanExporter): The exporter.
+        span (Span): The span.
+
+    Returns:
+        None
+    """
+
+    try:
+        exporter.export([span])
+    except Exception:
+        logging.exception("Failed to export span %s", span.name)
+
+
+@contextlib.contextmanager
+def span(
+    name: str, parent: str | None = None, **attributes: Any
+) -> Iterator[Span | None]:
+    """Trace the block as a span, the current span while it runs.
+
+    Args:
+        name (str): The name of the span.
+        parent (str | None): The W3C trace context to continue, instead of the
+        current span.
+        **attributes (Any): The attributes of the span.
+
+    Yields:
+        Span | None: The span, or None when tracing is disabled.
+    """
+
+    exporter = get_exporter()
+    if exporter is None:
+        yield None
+        return
+
+    current = _new_span(name, parent, None, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = repr(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end_ns = time.time_ns()
+        _export(exporter, current)
+
+
+def record(
+    name: str,
+    start_ns: int,
+    end_ns: int,
+    parent: str | None = None,
+    **attributes: Any,
+) -> None:
+    """Record an operation that already happened as a span.
+
+    Args:
+        name (str): The name of the span.
+        start_ns (int): The start time in nanoseconds.
+        end_ns (int): The end time in nanoseconds.
+        parent (str | None): The W3C trace context of the parent, instead of the
+        current span.
+        **attributes (Any): The attributes of the span.
+
+    Returns:
+        None
+    """
+
+    exporter = get_exporter()
+    if exporter is None:
+        return
+
+    recorded = _new_span(name, parent, start_ns, attributes)
+    recorded.end_ns = max(end_ns, start_ns)
+    _export(exporter, recorded)
+
+
+def inject(
+    meta: dict[str, Any] | None, scheduled_at: datetime.datetime | None = None
+) -> dict[str, Any] | None:
+    """Add the current trace context to the meta of a job.
+
+    Args:
+        meta (dict[str, Any] | None): The job meta, left untouched.
+        scheduled_at (datetime.datetime | None): The time the job is scheduled at,
+        to trace how late it's promoted to its queue.
+
+    Returns:
+        dict[str, Any] | None: The meta with the trace context, or `meta` when the
+        operation isn't traced.
+    """
+
+    current = _current_span.get()
+    if current is None:
+        return meta
+
+    meta = {**(meta or {}), TRACEPARENT: current.traceparent}
+    if scheduled_at:
+        meta[SCHEDULED_AT] = scheduled_at.timestamp()
+    return meta
+
+
+def _timestamp_ns(dt: datetime.datetime) -> int:
+    """Convert a naive UTC datetime written by rq into nanoseconds."""
+
+    return int(dt.replace(tzinfo=datetime.timezone.utc).timestamp() * 1e9)
+
+
+@contextlib.contextmanager
+def job_span(job: Job, refresh: bool = False) -> Iterator[Span | None]:
+    """Continue the trace of a job around its execution.
+
+    The wait for the scheduler to promote the job, when it was scheduled, and the
+    wait in its queue are recorded first, as siblings of the execution span.
+
+    Args:
+        job (Job): The dequeued job.
+        refresh (bool): Whether to read the status of the job from Redis once it's
+        run, for jobs run by another process.
+
+    Yields:
+        Span | None: The execution span, or None when tracing is disabled.
+    """
+
+    if get_exporter() is None:
+        yield None
+        return
+
+    parent = job.meta.get(TRACEPARENT)
+    labels = {"job.id": job.id, "job.func_name": job.func_name, "job.queue": job.origin}
+    if job.enqueued_at:
+        enqueued_ns = _timestamp_ns(job.enqueued_at)
+        if scheduled_at := job.meta.get(SCHEDULED_AT):
+            record("job.promotion", int(scheduled_at * 1e9), enqueued_ns, parent)
+        record("job.queued", enqueued_ns, time.time_ns(), parent, **labels)
+
+    with span("job.execute", parent, **labels) as execution:
+        yield execution
+        if execution is not None:
+            execution.attributes["job.status"] = job.get_status(refresh=refresh)
+
+
+class JobTracingMixin(rq.Worker):
+    """Trace the jobs run by an rq worker, from the worker process.
+
+    Work horses inherit the execution span, so the spans of the tasks run in them
+    belong to the trace of the job.
+    """
+
+    def execute_job(self, job: Job, queue: rq.Queue) -> None:
+        with job_span(job, refresh=not isinstance(self, rq.SimpleWorker)):
+            super().execute_job(job, queue)
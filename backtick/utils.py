@@ -1,17 +1,44 @@
+import asyncio
+import datetime
 import importlib
+import importlib.util
 import inspect
-from collections.abc import Callable
+import os
+import re
+import threading
+import weakref
+from collections.abc import AsyncIterator, Callable, Iterator
 from typing import Any
 
+import httpx
 import redis
+import redis.asyncio
 from rq.defaults import DEFAULT_RESULT_TTL
 from rq.job import Retry
 from rq.queue import Queue
-from rq.utils import backend_class
+from rq.utils import backend_class, str_to_date
 
-from backtick import settings
+from backtick import serializers, settings
 
-_cache = {}
+_cache: dict[str, redis.Redis] = {}
+
+# Asyncio connections are bound to the event loop that created them.
+_async_cache: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[int, redis.asyncio.Redis]
+] = weakref.WeakKeyDictionary()
+
+_http_cache: dict[str, httpx.Client] = {}
+
+# Asyncio HTTP clients are bound to the event loop that created them.
+_async_http_cache: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, dict[str, httpx.AsyncClient]
+] = weakref.WeakKeyDictionary()
+
+_serializer_cache: dict[str | None, serializers.CompactSerializer] = {}
+
+# Rates like "100/s", "6000/m" or "0.5/h".
+_RATE_PATTERN = re.compile(r"(\d+(?:\.\d+)?)/([smh])")
+_RATE_PERIODS = {"s": 1, "m": 60, "h": 3600}
 
 
 def check_keyword_only_func(func: Callable) -> bool:
@@ -55,16 +82,327 @@ def check_func_kwargs_match_kwargs(func: Callable, kwargs: dict[str, Any]) -> bo
     return True
 
 
-def get_redis() -> redis.Redis:
-    """Get a redis connection.
+def _reset_connections() -> None:
+    """Drop the cached connections so a forked child builds its own pools."""
+
+    _cache.clear()
+    _async_cache.clear()
+    _http_cache.clear()
+    _async_http_cache.clear()
+
+
+# Connection pools must not be shared across fork boundaries, e.g. gunicorn workers
+# or rq work horses. The parent's pools are left untouched.
+os.register_at_fork(after_in_child=_reset_connections)
+
+
+def get_redis(name: str = "default") -> redis.Redis:
+    """Get a named redis connection.
+
+    The connection is configured by the `name` entry of
+    `settings.BACKTICK_REDIS_CONNECTIONS` and cached per process.
+
+    Args:
+        name (str): The name of the connection. Defaults to "default".
 
     Returns:
         redis.Redis: A redis connection
     """
 
-    if "r" not in _cache:
-        _cache["r"] = redis.Redis.from_url(settings.BACKTICK_REDIS_URL)
-    return _cache["r"]
+    if name not in _cache:
+        options: dict[str, Any] = dict(settings.BACKTICK_REDIS_CONNECTIONS[name])
+        url = options.pop("url")
+
+        pool: redis.ConnectionPool
+        if options.pop("blocking", False):
+            options["timeout"] = options.pop("blocking_timeout", None)
+            pool = redis.BlockingConnectionPool.from_url(url, **options)
+        else:
+            options.pop("blocking_timeout", None)
+            pool = redis.ConnectionPool.from_url(url, **options)
+
+        _cache[name] = redis.Redis(connection_pool=pool)
+    return _cache[name]
+
+
+def resolve_connection(connection: redis.Redis | str | None) -> redis.Redis:
+    """Resolve the connection a task was declared with.
+
+    Args:
+        connection (redis.Redis | str | None): A redis connection, the name of one
+        or None for the default connection.
+
+    Returns:
+        redis.Redis: A redis connection
+    """
+
+    if isinstance(connection, redis.Redis):
+        return connection
+    return get_redis(connection or "default")
+
+
+def get_async_redis(
+    connection: redis.Redis | str | None = None,
+) -> redis.asyncio.Redis:
+    """Get an asyncio redis connection to the same server as a sync one.
+
+    The asyncio connection pool mirrors the size, blocking behavior, timeouts and
+    health checks of the sync pool.
+
+    Args:
+        connection (redis.Redis | str | None): The sync redis connection to mirror,
+        the name of one or None for the default connection.
+
+    Returns:
+        redis.asyncio.Redis: An asyncio redis connection bound to the running loop
+    """
+
+    pool = resolve_connection(connection).connection_pool
+    clients = _async_cache.setdefault(asyncio.get_running_loop(), {})
+
+    if id(pool) not in clients:
+        connection_class = getattr(
+            redis.asyncio.connection,
+            pool.connection_class.__name__,
+            redis.asyncio.Connection,
+        )
+        async_pool: redis.asyncio.ConnectionPool
+        if isinstance(pool, redis.BlockingConnectionPool):
+            async_pool = redis.asyncio.BlockingConnectionPool(
+                connection_class=connection_class,
+                max_connections=pool.max_connections,
+                timeout=pool.timeout,  # type: ignore
+                **pool.connection_kwargs,
+            )
+        else:
+            async_pool = redis.asyncio.ConnectionPool(
+                connection_class=connection_class,
+                max_connections=pool.max_connections,
+                **pool.connection_kwargs,
+            )
+        clients[id(pool)] = redis.asyncio.Redis(connection_pool=async_pool)
+    return clients[id(pool)]
+
+
+class _HostLimitedStream(httpx.SyncByteStream):
+    """A response stream that frees its host slot once it's closed."""
+
+    def __init__(self, stream: httpx.SyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release: Callable[[], None] | None = release
+
+    def __iter__(self) -> Iterator[bytes]:
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            if self._release is not None:
+                self._release()
+                self._release = None
+
+
+class _AsyncHostLimitedStream(httpx.AsyncByteStream):
+    """An asyncio response stream that frees its host slot once it's closed."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release: Callable[[], None]):
+        self._stream = stream
+        self._release: Callable[[], None] | None = release
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if self._release is not None:
+                self._release()
+                self._release = None
+
+
+class HostLimitedTransport(httpx.HTTPTransport):
+    """A pooled transport that caps the concurrent requests to every host."""
+
+    def __init__(self, *args: Any, max_connections_per_host: int, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._max_connections_per_host = max_connections_per_host
+        self._slots: dict[tuple[bytes, bytes, int | None], threading.Semaphore] = {}
+        self._lock = threading.Lock()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        url = request.url
+        with self._lock:
+            slot = self._slots.setdefault(
+                (url.raw_scheme, url.raw_host, url.port),
+                threading.BoundedSemaphore(self._max_connections_per_host),
+            )
+
+        slot.acquire()
+        try:
+            response = super().handle_request(request)
+        except BaseException:
+            slot.release()
+            raise
+
+        response.stream = _HostLimitedStream(response.stream, slot.release)
+        return response
+
+
+class AsyncHostLimitedTransport(httpx.AsyncHTTPTransport):
+    """A pooled asyncio transport that caps the concurrent requests to every host."""
+
+    def __init__(self, *args: Any, max_connections_per_host: int, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._max_connections_per_host = max_connections_per_host
+        self._slots: dict[tuple[bytes, bytes, int | None], asyncio.Semaphore] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        url = request.url
+        slot = self._slots.setdefault(
+            (url.raw_scheme, url.raw_host, url.port),
+            asyncio.BoundedSemaphore(self._max_connections_per_host),
+        )
+
+        await slot.acquire()
+        try:
+            response = await super().handle_async_request(request)
+        except BaseException:
+            slot.release()
+            raise
+
+        response.stream = _AsyncHostLimitedStream(response.stream, slot.release)
+        return response
+
+
+def _http_client_options(name: str) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Split the settings of a named HTTP client into client and transport options.
+
+    Args:
+        name (str): The name of the HTTP client.
+
+    Returns:
+        tuple[dict[str, Any], dict[str, Any]]: The client and transport options.
+    """
+
+    options: dict[str, Any] = dict(settings.BACKTICK_HTTP_CLIENTS[name])
+    limits = httpx.Limits(
+        max_connections=options.pop("max_connections", None),
+        max_keepalive_connections=options.pop("max_keepalive_connections", None),
+        keepalive_expiry=options.pop("keepalive_expiry", None),
+    )
+    transport_options = {
+        "limits": limits,
+        # HTTP/2 needs the optional `h2` package, fall back to HTTP/1.1 without it.
+        "http2": options.pop("http2", False)
+        and importlib.util.find_spec("h2") is not None,
+        "max_connections_per_host": options.pop(
+            "max_connections_per_host", limits.max_connections
+        ),
+    }
+    return options, transport_options
+
+
+def get_http_client(name: str = "default") -> httpx.Client:
+    """Get a named HTTP client.
+
+    The client is configured by the `name` entry of `settings.BACKTICK_HTTP_CLIENTS`
+    and cached per process, so the jobs a process runs reuse its connections.
+
+    Args:
+        name (str): The name of the HTTP client. Defaults to "default".
+
+    Returns:
+        httpx.Client: A pooled HTTP client
+    """
+
+    if name not in _http_cache:
+        options, transport_options = _http_client_options(name)
+        _http_cache[name] = httpx.Client(
+            transport=HostLimitedTransport(**transport_options), **options
+        )
+    return _http_cache[name]
+
+
+def get_async_http_client(name: str = "default") -> httpx.AsyncClient:
+    """Get a named asyncio HTTP client.
+
+    This is the asyncio counterpart of `get_http_client`.
+
+    Args:
+        name (str): The name of the HTTP client. Defaults to "default".
+
+    Returns:
+        httpx.AsyncClient: A pooled HTTP client bound to the running loop
+    """
+
+    clients = _async_http_cache.setdefault(asyncio.get_running_loop(), {})
+
+    if name not in clients:
+        options, transport_options = _http_client_options(name)
+        clients[name] = httpx.AsyncClient(
+            transport=AsyncHostLimitedTransport(**transport_options), **options
+        )
+    return clients[name]
+
+
+def get_serializer(name: str | None = None) -> serializers.CompactSerializer:
+    """Get a named job serializer.
+
+    The serializer is configured by the `name` entry of
+    `settings.BACKTICK_SERIALIZERS`. Every serializer reads the jobs written by the
+    others, so workers and readers can use any of them.
+
+    Args:
+        name (str | None): The name of the serializer, or None for one that writes
+        rq's pickle format.
+
+    Returns:
+        serializers.CompactSerializer: The serializer
+    """
+
+    if name not in _serializer_cache:
+        options = settings.BACKTICK_SERIALIZERS[name] if name else {}
+        _serializer_cache[name] = serializers.CompactSerializer(**options)
+    return _serializer_cache[name]
+
+
+def parse_date(value: bytes | None) -> datetime.datetime | None:
+    """Parse a datetime written by rq to a job hash.
+
+    Args:
+        value (bytes | None): The raw field.
+
+    Returns:
+        datetime.datetime | None: The UTC datetime, or None if the field is unset.
+    """
+
+    date = str_to_date(value)
+    return date.replace(tzinfo=datetime.timezone.utc) if date else None
+
+
+def parse_rate(rate: str) -> float:
+    """Parse a rate limit like "100/s", per second, minute or hour.
+
+    Args:
+        rate (str): The rate limit.
+
+    Raises:
+        ValueError: If the rate limit is invalid.
+
+    Returns:
+        float: The number of calls allowed per second.
+    """
+
+    if not (match := _RATE_PATTERN.fullmatch(rate.strip())) or not float(
+        match.group(1)
+    ):
+        raise ValueError(
+            f"Invalid rate limit {rate}. Must be of the form '<calls>/<s|m|h>'"
+        )
+    return float(match.group(1)) / _RATE_PERIODS[match.group(2)]
 
 
 def discover_task(qualname: str) -> Callable[..., Any]:
@@ -109,7 +447,7 @@ class task:  # noqa
     def __init__(
         self,
         queue: Queue | str,
-        connection: redis.Redis | None = None,
+        connection: redis.Redis | str | None = None,
         timeout: int | None = None,
         result_ttl: int = DEFAULT_RESULT_TTL,
         ttl: int | None = None,
@@ -122,7 +460,18 @@ class task:  # noqa
         retry: Retry | None = None,
         on_failure: Callable[..., Any] | None = None,
         on_success: Callable[..., Any] | None = None,
+        serializer: str | None = None,
+        rate_limit: str | None = None,
+        rate_limit_burst: int = 1,
+        max_concurrency: int | None = None,
     ):
+        if rate_limit is not None:
+            parse_rate(rate_limit)
+        if rate_limit_burst < 1:
+            raise ValueError("The rate limit burst must be at least 1")
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("The max concurrency must be at least 1")
+
         self.queue = queue
         self.queue_class = backend_class(self, "queue_class", override=queue_class)
         self.connection = connection
@@ -137,6 +486,10 @@ class task:  # noqa
         self.retry = retry
         self.on_success = on_success
         self.on_failure = on_failure
+        self.serializer = serializer
+        self.rate_limit = rate_limit
+        self.rate_limit_burst = rate_limit_burst
+        self.max_concurrency = max_concurrency
 
     def __call__(self, f: Callable[..., Any]) -> Callable[..., Any]:
         f.queue = self.queue  # type: ignore
@@ -153,6 +506,10 @@ class task:  # noqa
         f.on_success = self.on_success  # type: ignore
         f.on_failure = self.on_failure  # type: ignore
         f.queue_class = self.queue_class  # type: ignore
+        f.serializer = self.serializer  # type: ignore
+        f.rate_limit = self.rate_limit  # type: ignore
+        f.rate_limit_burst = self.rate_limit_burst  # type: ignore
+        f.max_concurrency = self.max_concurrency  # type: ignore
         f._is_task = True  # type: ignore
 
         return f
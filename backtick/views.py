@@ -1,12 +1,37 @@
+import contextlib
+import datetime
+import hashlib
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable
 from http import HTTPStatus
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Query
+from fastapi.encoders import jsonable_encoder
 from fastapi.requests import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from prometheus_client import CONTENT_TYPE_LATEST
+from pydantic import BaseModel
 
-from backtick import dispatch, dto
+from backtick import (
+    dispatch,
+    dto,
+    metrics,
+    notifications,
+    registries,
+    settings,
+    task_registry,
+    tracing,
+)
 
-app = FastAPI()
+
+@contextlib.asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # Resolve the registered tasks once per process before serving requests.
+    task_registry.reload_registry()
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 @app.exception_handler(Exception)
@@ -21,8 +46,84 @@ def exception_handler(request: Request, exc: Exception) -> JSONResponse:
     )
 
 
+@app.middleware("http")
+async def record_latency(
+    request: Request, call_next: Callable[[Request], Awaitable[Response]]
+) -> Response:
+    """Record the latency of every request, by route, and trace it.
+
+    The trace continues the one of the `traceparent` header when there's one.
+    """
+
+    request.state.received_at = time.perf_counter()
+    with tracing.span(
+        f"HTTP {request.method}",
+        request.headers.get(tracing.TRACEPARENT),
+        **{"http.method": request.method, "http.target": request.url.path},
+    ) as root:
+        response = await call_next(request)
+        path = getattr(request.scope.get("route"), "path", "")
+        metrics.HTTP_REQUEST_SECONDS.labels(
+            request.method, path, response.status_code
+        ).observe(time.perf_counter() - request.state.received_at)
+        if root is not None:
+            root.name = f"HTTP {request.method} {path}"
+            root.attributes.update(
+                {"http.route": path, "http.status_code": response.status_code}
+            )
+    return response
+
+
+def _record_validation(request: Request, operation: str) -> None:
+    """Record the time spent reading and validating a request body.
+
+    FastAPI validates the body before calling the route, from the time the request
+    was received.
+
+    Args:
+        request (Request): The request.
+        operation (str): The operation of the route.
+
+    Returns:
+        None
+    """
+
+    metrics.REQUEST_PHASE_SECONDS.labels(operation, "validation").observe(
+        time.perf_counter() - request.state.received_at
+    )
+    if (root := tracing.current_span()) is not None:
+        tracing.record(f"{operation}.validation", root.start_ns, time.time_ns())
+
+
+def _cached_response(request: Request, content: BaseModel) -> Response:
+    """Build a response that clients can revalidate with its ETag.
+
+    Args:
+        request (Request): The request, possibly with an If-None-Match header.
+        content (BaseModel): The response body.
+
+    Returns:
+        Response: The JSON response, or an empty 304 response if the client already
+        has the same body.
+    """
+
+    body = content.json().encode()
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"max-age={settings.BACKTICK_STATUS_CACHE_TTL}",
+    }
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(",")):
+        return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
 @app.post("/schedule")
-def schedule(item: dto.ScheduleRequestDTO) -> dto.ScheduleResponseDTO:
+async def schedule(
+    request: Request, item: dto.ScheduleRequestDTO
+) -> dto.ScheduleResponseDTO:
     """Schedule a task.
 
     ### Request body
@@ -40,17 +141,50 @@ def schedule(item: dto.ScheduleRequestDTO) -> dto.ScheduleResponseDTO:
     * `kwargs` - This field specifies a dictionary of keyword arguments that will be
     passed to the task when it is executed.
 
+    * `idempotency_key` - This optional field makes retries of the request safe. A
+    request with a key already used for the same task returns the task ids of the
+    first request instead of scheduling the tasks again. Keys expire after
+    `BACKTICK_IDEMPOTENCY_TTL` seconds.
+
     ### Response body
     * `task_ids` - This field contains a list of task ids that were scheduled.
     * `message` - This field contains a message that indicates the status of the
     scheduled tasks.
 
     """
-    return dispatch.submit_tasks(schedule_request_dto=item)
+    _record_validation(request, "schedule")
+    return await dispatch.submit_tasks_async(schedule_request_dto=item)
+
+
+@app.post("/schedule/batch")
+async def schedule_batch(
+    item: dto.BatchScheduleRequestDTO,
+) -> dto.BatchScheduleResponseDTO:
+    """Schedule many tasks in a single call.
+
+    ### Request body
+
+    * `requests` - This field accepts a list of schedule requests. Each of them has the
+    same `task_name`, `datetimes` and `kwargs` fields as the body of `POST /schedule`
+    and they can target different tasks and queues. The number of requests is capped
+    by the `BACKTICK_BATCH_MAX_SIZE` variable of the `settings.py` module.
+
+    ### Response body
+
+    * `results` - This field contains one result per request, in the order of the
+    request. A result holds either the `task_ids` that were scheduled or the `error`
+    that prevented the request from being scheduled. An invalid request doesn't fail
+    the rest of the batch.
+    * `message` - This field contains a message that indicates how many of the
+    requests were scheduled.
+    """
+    return await dispatch.submit_tasks_batch_async(batch_schedule_request_dto=item)
 
 
 @app.post("/unschedule")
-def unschedule(item: dto.UnscheduleRequestDTO) -> dto.UnscheduleResponseDTO:
+async def unschedule(
+    request: Request, item: dto.UnscheduleRequestDTO
+) -> dto.UnscheduleResponseDTO:
     """Unschedule a task.
 
     ### Request body
@@ -61,8 +195,253 @@ def unschedule(item: dto.UnscheduleRequestDTO) -> dto.UnscheduleResponseDTO:
 
     ### Response body
 
-    * `task_ids` - This field contains a list of task ids that were unscheduled.
+    * `task_ids` - This field contains a list of task ids that were unscheduled. Task
+    ids that don't exist or were already unscheduled are left out.
     * `message` - This field contains a message that indicates the status of the
     unscheduled tasks.
     """
-    return dispatch.cancel_tasks(unschedule_request_dto=item)
+    _record_validation(request, "unschedule")
+    return await dispatch.cancel_tasks_async(unschedule_request_dto=item)
+
+
+@app.post("/unschedule/bulk")
+async def unschedule_bulk(
+    item: dto.UnscheduleRequestDTO,
+) -> dto.BulkUnscheduleResponseDTO:
+    """Unschedule many tasks at once.
+
+    The tasks are cancelled on the Redis server in chunks, without loading the jobs.
+
+    ### Request body
+
+    * `task_ids` - This field accepts a list of task ids that you want to unschedule.
+    * `enqueue_dependents` - This field specifies whether or not to enqueue the
+    dependent tasks of the tasks that are being unscheduled.
+
+    ### Response body
+
+    * `results` - This field contains one result per task id, in the order of the
+    request. Each result contains the `task_id` and its `status`, one of `canceled`,
+    `not_found` or `already_canceled`.
+    * `message` - This field contains a message that indicates how many tasks were
+    unscheduled.
+    """
+    return await dispatch.cancel_tasks_bulk_async(unschedule_request_dto=item)
+
+
+@app.post("/requeue")
+async def requeue(item: dto.RequeueRequestDTO) -> dto.RequeueResponseDTO:
+    """Requeue failed tasks.
+
+    The failed tasks are moved back to their queues in chunks, at no more than
+    `BACKTICK_REQUEUE_RATE` tasks per second, so the response takes longer the more
+    tasks are requeued.
+
+    ### Request body
+
+    * `queues` - This field accepts the names of the queues to requeue the failed tasks
+    of. Every queue of `BACKTICK_QUEUES` is used when it's empty.
+    * `task_names` - This field accepts the names of the tasks to requeue. Every task is
+    requeued when it's empty.
+    * `exception_types` - This field accepts the exception types, e.g. `ValueError` or
+    `httpx.ConnectError`, the tasks to requeue failed with. Every failed task is
+    requeued when it's empty.
+    * `limit` - This field accepts the maximum number of tasks to requeue, up to and
+    defaulting to `BACKTICK_REQUEUE_MAX_TASKS`.
+    * `dry_run` - This field specifies whether to only find the tasks that would be
+    requeued.
+
+    ### Response body
+
+    * `task_ids` - This field contains the ids of the requeued tasks.
+    * `message` - This field contains a message that indicates how many tasks were
+    requeued.
+    """
+    return await dispatch.requeue_failed_tasks_async(requeue_request_dto=item)
+
+
+@app.get("/tasks", response_model=dto.TaskStatusResponseDTO)
+async def tasks(
+    request: Request,
+    task_ids: list[str] = Query(
+        min_items=1, max_items=settings.BACKTICK_STATUS_MAX_TASKS
+    ),
+) -> Response:
+    """Get the status of many tasks.
+
+    Statuses are cached for `BACKTICK_STATUS_CACHE_TTL` seconds. Send the `ETag` of a
+    previous response in an `If-None-Match` header to get an empty `304` response
+    when nothing has changed.
+
+    ### Query parameters
+
+    * `task_ids` - This parameter is repeated once per task id, e.g.
+    `?task_ids=a&task_ids=b`. The number of ids is capped by the
+    `BACKTICK_STATUS_MAX_TASKS` variable of the `settings.py` module.
+
+    ### Response body
+
+    * `results` - This field contains one result per task id, in the order of the
+    request. Each result contains the `task_id`, its `status`, `not_found` for the tasks
+    that expired or never existed, the `enqueued_at`, `started_at` and `ended_at`
+    datetimes, the `result` returned by the task and the `exc_info` of its failure.
+    """
+    results = await dispatch.get_task_statuses_async(task_ids)
+    return _cached_response(request, dto.TaskStatusResponseDTO(results=results))
+
+
+async def _server_sent_events(events: AsyncIterator[str | None]) -> AsyncIterator[str]:
+    """Format task events as server-sent events, with comments as keep-alives.
+
+    Args:
+        events (AsyncIterator[str | None]): The JSON events, None when idle.
+
+    Yields:
+        str: The server-sent events.
+    """
+    async for event in events:
+        yield f"data: {event}\n\n" if event else ": keep-alive\n\n"
+
+
+@app.get("/tasks/events", response_class=StreamingResponse)
+async def task_events(
+    request: Request,
+    task_ids: list[str] = Query(
+        default=[], max_items=settings.BACKTICK_STATUS_MAX_TASKS
+    ),
+    queues: list[str] = Query(default=[]),
+) -> Response:
+    """Stream the status transitions of tasks as server-sent events.
+
+    ### Query parameters
+
+    * `task_ids` - This parameter is repeated once per task id to follow, e.g.
+    `?task_ids=a&task_ids=b`. The current status of every task is sent first, and the
+    stream ends once all of them are `finished`, `failed`, `stopped`, `canceled` or
+    `not_found`.
+    * `queues` - This parameter is repeated once per queue name to follow every task
+    of. The stream doesn't end on its own then.
+
+    ### Events
+
+    Every event holds the `task_id`, `queue` and new `status` of a task, as JSON in its
+    `data` field. Workers send `started`, `finished`, `failed` and `stopped`, and the
+    unschedule endpoints send `canceled`. A comment is sent every
+    `BACKTICK_EVENTS_HEARTBEAT` seconds without events to keep the connection alive.
+    """
+    if not task_ids and not queues:
+        return JSONResponse(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            content={
+                "type": request.url.path,
+                "title": "Unprocessable Entity",
+                "detail": "Follow at least one task id or queue",
+            },
+        )
+
+    return StreamingResponse(
+        _server_sent_events(notifications.stream(task_ids, queues)),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/tasks/{task_id}", response_model=dto.TaskStatusDTO)
+async def task(request: Request, task_id: str) -> Response:
+    """Get the status of a task.
+
+    This returns a single result of `GET /tasks`, or `404` if the task expired or never
+    existed.
+    """
+    [result] = await dispatch.get_task_statuses_async([task_id])
+    if result.status == dispatch.TASK_NOT_FOUND:
+        return JSONResponse(
+            status_code=HTTPStatus.NOT_FOUND,
+            content={
+                "type": request.url.path,
+                "title": "Not Found",
+                "detail": f"Task {task_id} not found",
+            },
+        )
+    return _cached_response(request, result)
+
+
+@app.get(
+    "/queues/{queue_name}/registries/{registry}", response_model=dto.RegistryPageDTO
+)
+async def registry(
+    request: Request,
+    queue_name: str,
+    registry: registries.Registry,
+    cursor: str | None = None,
+    limit: int = Query(default=100, ge=1, le=settings.BACKTICK_REGISTRY_MAX_PAGE_SIZE),
+    task_name: str | None = None,
+    after: datetime.datetime | None = None,
+    before: datetime.datetime | None = None,
+) -> Response:
+    """Page through the jobs of a registry of a queue.
+
+    The response time doesn't depend on the size of the registry.
+
+    ### Path parameters
+
+    * `queue_name` - The name of a queue of the `BACKTICK_QUEUES` variable of the
+    `settings.py` module.
+    * `registry` - One of `scheduled`, `started`, `failed`, `finished` or `canceled`.
+
+    ### Query parameters
+
+    * `cursor` - The `next_cursor` of the previous page. Leave it out for the first
+    page.
+    * `limit` - The number of jobs read per page, up to
+    `BACKTICK_REGISTRY_MAX_PAGE_SIZE`.
+    * `task_name` - Only return the jobs of this task. Pages can then hold fewer jobs
+    than `limit`, or none, and still have a `next_cursor`.
+    * `after` and `before` - Only return the jobs whose `at` datetime is in this window.
+
+    ### Response body
+
+    * `results` - The jobs, ordered by `at`, with their `task_id`, `task_name`, `status`
+    and `created_at`, `enqueued_at`, `started_at` and `ended_at` datetimes. `at` is when
+    the job is due in the `scheduled` registry, when it times out in the `started`
+    registry, when it expires in the `failed` and `finished` registries and when it was
+    cancelled in the `canceled` registry.
+    * `next_cursor` - The cursor of the next page, or null on the last page.
+    """
+    if queue_name not in settings.BACKTICK_QUEUES.values():
+        return JSONResponse(
+            status_code=HTTPStatus.NOT_FOUND,
+            content={
+                "type": request.url.path,
+                "title": "Not Found",
+                "detail": f"Queue {queue_name} not found",
+            },
+        )
+
+    try:
+        page = await registries.list_registry_async(
+            queue_name=queue_name,
+            registry=registry,
+            cursor=cursor,
+            limit=limit,
+            task_name=task_name,
+            after=after,
+            before=before,
+        )
+    except ValueError as exc:
+        return JSONResponse(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            content={
+                "type": request.url.path,
+                "title": "Unprocessable Entity",
+                "detail": str(exc),
+            },
+        )
+    return JSONResponse(jsonable_encoder(page))
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics() -> Response:
+    """Expose the Prometheus metrics of the API processes and the queue sizes."""
+
+    return Response(metrics.render(with_queues=True), media_type=CONTENT_TYPE_LATEST)
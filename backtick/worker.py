@@ -4,10 +4,307 @@
 # Preload libraries
 import argparse
 import logging
+import multiprocessing
+import os
+import signal
+import time
+from collections.abc import Iterable
+from multiprocessing.process import BaseProcess
+from types import FrameType
 
-from rq import Worker
+import rq
 
-from backtick import settings, utils
+from backtick import (
+    limits,
+    metrics,
+    notifications,
+    payloads,
+    scheduler,
+    settings,
+    task_registry,
+    tracing,
+    utils,
+)
+from backtick.async_worker import AsyncWorker
+
+# Seconds between two checks of the worker processes by the supervisor.
+SUPERVISOR_INTERVAL = 1
+
+# Seconds the supervisor waits for the workers to finish their jobs on shutdown.
+SUPERVISOR_SHUTDOWN_TIMEOUT = 30
+
+# Signals that make the supervisor shut down the workers.
+SHUTDOWN_SIGNALS = {signal.SIGINT, signal.SIGTERM}
+
+
+class Worker(
+    limits.LimitsMixin,
+    tracing.JobTracingMixin,
+    metrics.JobMetricsMixin,
+    payloads.PayloadMixin,
+    rq.Worker,
+):
+    """Run every job in a forked work horse, recording the job metrics and spans.
+
+    Jobs over their rate limits or concurrency caps are deferred as they're
+    dequeued.
+    """
+
+
+class SimpleWorker(
+    limits.LimitsMixin,
+    tracing.JobTracingMixin,
+    metrics.JobMetricsMixin,
+    payloads.PayloadMixin,
+    rq.SimpleWorker,
+):
+    """Run the jobs in the worker process, recording the job metrics and spans.
+
+    Jobs over their rate limits or concurrency caps are deferred as they're
+    dequeued.
+    """
+
+
+def preload_tasks() -> None:
+    """Import every task in `settings.BACKTICK_TASKS`.
+
+    Jobs then find their task function already imported instead of importing it in
+    the work horse.
+    """
+
+    registry = task_registry.reload_registry()
+    logging.info("Preloaded tasks: %s", ", ".join(spec.name for spec in registry))
+
+
+def run_worker(
+    queue_names: Iterable[str],
+    with_scheduler: bool,
+    no_fork: bool = False,
+    async_jobs: int | None = None,
+    serializer: str | None = None,
+) -> None:
+    """Run a worker until it's asked to shut down.
+
+    Args:
+        queue_names (Iterable[str]): The names of the queues to listen to.
+        with_scheduler (bool): Whether to run the scheduler as well.
+        no_fork (bool): Whether to run the jobs in the worker process instead of
+        forking a work horse per job. Task timeouts are still enforced.
+        async_jobs (int | None): Run the jobs of `async def` tasks concurrently in an
+        event loop, at most this many at a time. Implies `no_fork`.
+        serializer (str | None): The name of the serializer the results are written
+        with. The jobs of every serializer are read either way.
+    """
+
+    options = {
+        "queues": queue_names,
+        "connection": utils.get_redis(),
+        "serializer": utils.get_serializer(serializer),
+        "job_class": notifications.NotifyingJob,
+    }
+    w: rq.Worker
+    if async_jobs:
+        w = AsyncWorker(**options, max_jobs=async_jobs)
+    elif no_fork:
+        w = SimpleWorker(**options)
+    else:
+        w = Worker(**options)
+    logging.info(
+        "Starting worker, scheduler: %s, fork: %s", with_scheduler, not no_fork
+    )
+    w.work(with_scheduler=with_scheduler)
+
+
+def _run_supervised_worker(
+    queue_names: Iterable[str],
+    with_scheduler: bool,
+    no_fork: bool,
+    async_jobs: int | None,
+    serializer: str | None,
+) -> None:
+    """Run a worker in its own process group.
+
+    This keeps a Ctrl-C in the terminal from reaching the workers directly, so they
+    only get the single shutdown signal forwarded by the supervisor.
+
+    Args:
+        queue_names (Iterable[str]): The names of the queues to listen to.
+        with_scheduler (bool): Whether to run the scheduler as well.
+        no_fork (bool): Whether to run the jobs in the worker process.
+        async_jobs (int | None): The number of coroutine jobs run at the same time.
+        serializer (str | None): The name of the serializer of the results.
+    """
+
+    os.setpgrp()
+    for signum in SHUTDOWN_SIGNALS:
+        signal.signal(signum, signal.SIG_DFL)
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, SHUTDOWN_SIGNALS)
+    run_worker(queue_names, with_scheduler, no_fork, async_jobs, serializer)
+
+
+def start_sharded_scheduler(queue_names: Iterable[str]) -> BaseProcess:
+    """Start a sharded scheduler in a process of its own.
+
+    The process is a daemon, so it's stopped when the worker exits.
+
+    Args:
+        queue_names (Iterable[str]): The names of the queues to move the due jobs of.
+
+    Returns:
+        BaseProcess: The scheduler process.
+    """
+
+    process = multiprocessing.get_context("fork").Process(
+        target=_run_sharded_scheduler,
+        args=(list(queue_names),),
+        name="backtick-scheduler",
+        daemon=True,
+    )
+    mask = signal.pthread_sigmask(signal.SIG_BLOCK, SHUTDOWN_SIGNALS)
+    try:
+        process.start()
+    finally:
+        signal.pthread_sigmask(signal.SIG_SETMASK, mask)
+    logging.info("Started sharded scheduler with pid %s", process.pid)
+    return process
+
+
+def _run_sharded_scheduler(queue_names: list[str]) -> None:
+    """Run a sharded scheduler in its own process group.
+
+    Args:
+        queue_names (list[str]): The names of the queues to move the due jobs of.
+    """
+
+    os.setpgrp()
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, SHUTDOWN_SIGNALS)
+    scheduler.ShardedScheduler(
+        connection=utils.get_redis(), queue_names=queue_names
+    ).run()
+
+
+class WorkerSupervisor:
+    """Run a fixed number of worker processes and restart the ones that die.
+
+    The worker processes are forked from the supervisor, so they share the libraries
+    it has already imported. Only the first worker runs the scheduler, which keeps
+    a single scheduler per supervisor even when the workers are restarted.
+    """
+
+    def __init__(
+        self,
+        concurrency: int,
+        queue_names: Iterable[str],
+        with_scheduler: bool,
+        no_fork: bool = False,
+        async_jobs: int | None = None,
+        serializer: str | None = None,
+    ) -> None:
+        self.concurrency = concurrency
+        self.queue_names = list(queue_names)
+        self.with_scheduler = with_scheduler
+        self.no_fork = no_fork
+        self.async_jobs = async_jobs
+        self.serializer = serializer
+        self.stopping = False
+        self._context = multiprocessing.get_context("fork")
+        self._processes: dict[int, BaseProcess] = {}
+
+    def start_worker(self, slot: int) -> None:
+        """Start the worker process of a slot.
+
+        Args:
+            slot (int): The slot of the worker, from 0 to `concurrency - 1`.
+        """
+
+        process = self._context.Process(
+            target=_run_supervised_worker,
+            args=(
+                self.queue_names,
+                self.with_scheduler and slot == 0,
+                self.no_fork,
+                self.async_jobs,
+                self.serializer,
+            ),
+            name=f"backtick-worker-{slot}",
+        )
+        # Hold back the shutdown signals until the worker has reset its handlers.
+        mask = signal.pthread_sigmask(signal.SIG_BLOCK, SHUTDOWN_SIGNALS)
+        try:
+            process.start()
+        finally:
+            signal.pthread_sigmask(signal.SIG_SETMASK, mask)
+        self._processes[slot] = process
+        logging.info("Started worker %d with pid %s", slot, process.pid)
+
+    def check_workers(self) -> None:
+        """Restart the worker processes that have exited."""
+
+        for slot in range(self.concurrency):
+            process = self._processes.get(slot)
+            if process is not None and process.is_alive():
+                continue
+
+            if process is not None:
+                process.join()
+                logging.warning(
+                    "Worker %d with pid %s exited with code %s",
+                    slot,
+                    process.pid,
+                    process.exitcode,
+                )
+
+            if not self.stopping:
+                self.start_worker(slot)
+
+    def request_stop(self, signum: int, frame: FrameType | None) -> None:
+        """Stop restarting the workers and ask them to shut down.
+
+        The workers finish their current job before exiting.
+
+        Args:
+            signum (int): The received signal.
+            frame (FrameType | None): The current stack frame.
+        """
+
+        logging.info("Received signal %s, shutting down the workers", signum)
+        self.stopping = True
+        for process in self._processes.values():
+            if process.is_alive():
+                # rq workers shut down warmly on the first SIGTERM.
+                process.terminate()
+
+    def stop(self, timeout: float = SUPERVISOR_SHUTDOWN_TIMEOUT) -> None:
+        """Wait for the workers to shut down, killing the ones that don't in time.
+
+        Args:
+            timeout (float): Seconds to wait for the workers.
+        """
+
+        deadline = time.monotonic() + timeout
+        for slot, process in self._processes.items():
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                logging.warning("Killing worker %d with pid %s", slot, process.pid)
+                process.kill()
+                process.join()
+        self._processes.clear()
+
+    def run(self) -> None:
+        """Supervise the workers until SIGINT or SIGTERM is received."""
+
+        for signum in SHUTDOWN_SIGNALS:
+            signal.signal(signum, self.request_stop)
+
+        logging.info(
+            "Starting %d workers, scheduler: %s", self.concurrency, self.with_scheduler
+        )
+        while not self.stopping:
+            self.check_workers()
+            time.sleep(SUPERVISOR_INTERVAL)
+
+        self.stop()
+        logging.info("All workers stopped")
 
 
 def main() -> None:
@@ -22,17 +319,88 @@ def main() -> None:
     parser.add_argument(
         "--queue-names", type=str, nargs="+", help="The name of the queue to listen to."
     )
+    # Accept the number of worker processes to run.
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=1,
+        help="The number of worker processes to run.",
+    )
+
+    # Accept a flag to run the jobs without forking a work horse per job.
+    parser.add_argument(
+        "--no-fork",
+        action="store_true",
+        help="Run the jobs in the worker processes instead of forking one per job.",
+    )
+    # Accept the number of coroutine tasks to run at the same time.
+    parser.add_argument(
+        "--async-jobs",
+        type=int,
+        nargs="?",
+        const=settings.BACKTICK_ASYNC_WORKER_MAX_JOBS,
+        help=(
+            "Run async tasks concurrently in an event loop, at most this many at a "
+            f"time. Defaults to {settings.BACKTICK_ASYNC_WORKER_MAX_JOBS}."
+        ),
+    )
+
+    # Accept the name of the serializer to write the results with.
+    parser.add_argument(
+        "--serializer",
+        choices=settings.BACKTICK_SERIALIZERS,
+        help="Write the job results with this serializer from BACKTICK_SERIALIZERS.",
+    )
+    # Accept the port to serve the worker metrics on.
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=settings.BACKTICK_WORKER_METRICS_PORT,
+        help="Serve the Prometheus metrics of the workers on this port.",
+    )
+    # Accept a flag to run a sharded scheduler along the workers.
+    parser.add_argument(
+        "--with-sharded-scheduler",
+        action="store_true",
+        help="Run a sharded scheduler along the workers.",
+    )
 
     args = parser.parse_args()
     with_scheduler = args.with_scheduler
-    queue_names = args.queue_names
+    queue_names = args.queue_names or settings.BACKTICK_QUEUES.values()
+    concurrency = args.concurrency
+    no_fork = args.no_fork
+    async_jobs = args.async_jobs
+    serializer = args.serializer
 
-    w = Worker(
-        queues=queue_names if queue_names else settings.BACKTICK_QUEUES.values(),
-        connection=utils.get_redis(),
-    )
-    logging.info("Starting worker, scheduler: %s", with_scheduler)
-    w.work(with_scheduler=with_scheduler)
+    if concurrency < 1:
+        parser.error("--concurrency must be at least 1.")
+
+    if async_jobs is not None and async_jobs < 1:
+        parser.error("--async-jobs must be at least 1.")
+
+    if args.with_sharded_scheduler and not settings.BACKTICK_SCHEDULER_SHARDS:
+        parser.error("--with-sharded-scheduler needs BACKTICK_SCHEDULER_SHARDS.")
+
+    # Import the tasks once, before any worker or work horse is forked.
+    preload_tasks()
+
+    if args.metrics_port:
+        if concurrency > 1 and "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+            logging.warning(
+                "Set PROMETHEUS_MULTIPROC_DIR to serve the metrics of every worker"
+            )
+        metrics.start_server(args.metrics_port)
+
+    if args.with_sharded_scheduler:
+        start_sharded_scheduler(queue_names)
+
+    if concurrency == 1:
+        run_worker(queue_names, with_scheduler, no_fork, async_jobs, serializer)
+    else:
+        WorkerSupervisor(
+            concurrency, queue_names, with_scheduler, no_fork, async_jobs, serializer
+        ).run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1 @@
+"""All the benchmarks."""
@@ -0,0 +1,142 @@
+"""Measure the throughput and latency of the schedule endpoints of the API."""
+
+import argparse
+import asyncio
+import datetime
+import logging
+import statistics
+import time
+from typing import Any
+
+import httpx
+
+from backtick import utils, views
+from benchmarks.tasks import clean_up, registered
+
+
+def summarize(latencies: list[float]) -> dict[str, float]:
+    """Summarize the latencies of sequential requests.
+
+    Args:
+        latencies (list[float]): The latency of every request, in seconds.
+
+    Returns:
+        dict[str, float]: Wall time, throughput and median and 99th percentile
+        latencies in milliseconds.
+    """
+
+    percentiles = statistics.quantiles(latencies, n=100, method="inclusive")
+    seconds = sum(latencies)
+    return {
+        "seconds": seconds,
+        "requests_per_second": len(latencies) / seconds,
+        "p50_ms": percentiles[49] * 1e3,
+        "p99_ms": percentiles[98] * 1e3,
+    }
+
+
+async def send(
+    client: httpx.AsyncClient, url: str, bodies: list[dict[str, Any]]
+) -> tuple[list[float], list[dict[str, Any]]]:
+    """POST every body in turn.
+
+    Args:
+        client (httpx.AsyncClient): The client of the app.
+        url (str): The URL to post to.
+        bodies (list[dict[str, Any]]): The request bodies.
+
+    Returns:
+        tuple[list[float], list[dict[str, Any]]]: The latency and response body of
+        every request.
+    """
+
+    latencies, responses = [], []
+    for body in bodies:
+        start = time.perf_counter()
+        response = await client.post(url, json=body)
+        latencies.append(time.perf_counter() - start)
+        response.raise_for_status()
+        responses.append(response.json())
+    return latencies, responses
+
+
+async def run_async(count: int) -> dict[str, dict[str, float]]:
+    """Schedule `count` tasks, then unschedule them, one request per task.
+
+    The requests go through the ASGI app in this process, middlewares included,
+    without a server or the network in between.
+
+    Args:
+        count (int): The number of requests per endpoint.
+
+    Returns:
+        dict[str, dict[str, float]]: Throughput and latencies per endpoint.
+    """
+
+    now = datetime.datetime.now(tz=datetime.timezone.utc)
+    schedule_bodies = [
+        {
+            "task_name": "noop",
+            "datetimes": [(now + datetime.timedelta(days=1, seconds=i)).isoformat()],
+        }
+        for i in range(count)
+    ]
+
+    job_ids: list[str] = []
+    transport = httpx.ASGITransport(app=views.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+        try:
+            latencies, responses = await send(client, "/schedule", schedule_bodies)
+            job_ids = [job_id for body in responses for job_id in body["task_ids"]]
+            results = {"schedule": summarize(latencies)}
+
+            unschedule_bodies = [
+                {"task_ids": [job_id], "enqueue_dependents": False}
+                for job_id in job_ids
+            ]
+            latencies, _ = await send(client, "/unschedule", unschedule_bodies)
+            results["unschedule"] = summarize(latencies)
+        finally:
+            clean_up(utils.get_redis(), job_ids)
+
+    return results
+
+
+def run(count: int) -> dict[str, dict[str, float]]:
+    """Run `run_async` with the benchmark task registered.
+
+    Args:
+        count (int): The number of requests per endpoint.
+
+    Returns:
+        dict[str, dict[str, float]]: Throughput and latencies per endpoint.
+    """
+
+    with registered():
+        return asyncio.run(run_async(count))
+
+
+def main() -> None:
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--count",
+        type=int,
+        default=200,
+        help="The number of requests per endpoint.",
+    )
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    results = run(args.count)
+
+    for name, result in results.items():
+        print(
+            f"{name:>10}: {result['requests_per_second']:.0f} requests/s, "
+            f"p50 {result['p50_ms']:.2f}ms, p99 {result['p99_ms']:.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
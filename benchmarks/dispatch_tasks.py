@@ -0,0 +1,104 @@
+"""Measure the throughput of scheduling and unscheduling tasks through dispatch."""
+
+import argparse
+import datetime
+import logging
+import time
+
+from backtick import dispatch, dto, utils
+from benchmarks.tasks import clean_up, registered
+
+
+def run(count: int) -> dict[str, dict[str, float]]:
+    """Schedule and unschedule `count` tasks, one per call and all in one call.
+
+    Args:
+        count (int): The number of tasks to schedule and unschedule.
+
+    Returns:
+        dict[str, dict[str, float]]: Wall time and throughput per operation.
+    """
+
+    now = datetime.datetime.now(tz=datetime.timezone.utc)
+    datetimes = [now + datetime.timedelta(days=1, seconds=i) for i in range(count)]
+
+    results = {}
+    job_ids: list[str] = []
+    with registered():
+        # The dtos are validated before the clock starts, like FastAPI does.
+        schedule_requests = {
+            "submit/1": [
+                dto.ScheduleRequestDTO(task_name="noop", datetimes=[dt])
+                for dt in datetimes
+            ],
+            "submit/n": [dto.ScheduleRequestDTO(task_name="noop", datetimes=datetimes)],
+        }
+        try:
+            for name, requests in schedule_requests.items():
+                ids: list[str] = []
+                start = time.perf_counter()
+                for schedule_request_dto in requests:
+                    ids += dispatch.submit_tasks(
+                        schedule_request_dto=schedule_request_dto
+                    ).task_ids
+                elapsed = time.perf_counter() - start
+                job_ids += ids
+
+                results[name] = {
+                    "seconds": elapsed,
+                    "tasks_per_second": count / elapsed,
+                }
+
+            unschedule_requests = {
+                "cancel/1": [
+                    dto.UnscheduleRequestDTO(
+                        task_ids=[job_id], enqueue_dependents=False
+                    )
+                    for job_id in job_ids[:count]
+                ],
+                "cancel/n": [
+                    dto.UnscheduleRequestDTO(
+                        task_ids=job_ids[count:], enqueue_dependents=False
+                    )
+                ],
+            }
+            for name, requests in unschedule_requests.items():
+                start = time.perf_counter()
+                for unschedule_request_dto in requests:
+                    dispatch.cancel_tasks(unschedule_request_dto=unschedule_request_dto)
+                elapsed = time.perf_counter() - start
+
+                results[name] = {
+                    "seconds": elapsed,
+                    "tasks_per_second": count / elapsed,
+                }
+        finally:
+            clean_up(utils.get_redis(), job_ids)
+
+    return results
+
+
+def main() -> None:
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--count",
+        type=int,
+        default=200,
+        help="The number of tasks to schedule and unschedule.",
+    )
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    results = run(args.count)
+
+    for name, result in results.items():
+        print(
+            f"{name:>8}: {result['seconds']:.3f}s, "
+            f"{result['tasks_per_second']:.0f} tasks/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
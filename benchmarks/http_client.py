@@ -0,0 +1,116 @@
+"""Compare a new HTTP client per request against the shared, pooled one."""
+
+import argparse
+import http.server
+import logging
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+import httpx
+
+from backtick import utils
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    """Answer every POST right away, keeping the connection alive."""
+
+    protocol_version = "HTTP/1.1"
+    # The headers and the body are written separately, don't delay the body.
+    disable_nagle_algorithm = True
+
+    def do_POST(self) -> None:
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+@contextmanager
+def stand_in_server() -> Iterator[str]:
+    """Run a local HTTP server in a thread.
+
+    Yields:
+        str: The URL of the server.
+    """
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def request_new_client(url: str) -> None:
+    """Make a request the way `make_request` used to, with a new client."""
+
+    with httpx.Client() as client:
+        client.post(url, json={}).raise_for_status()
+
+
+def request_shared_client(url: str) -> None:
+    """Make a request with the shared, pooled client."""
+
+    utils.get_http_client().post(url, json={}).raise_for_status()
+
+
+def run(count: int) -> dict[str, dict[str, float]]:
+    """Make `count` requests to a local server with each client strategy.
+
+    Args:
+        count (int): The number of requests to make.
+
+    Returns:
+        dict[str, dict[str, float]]: Wall time and throughput per strategy.
+    """
+
+    strategies: tuple[tuple[str, Callable[[str], None]], ...] = (
+        ("new", request_new_client),
+        ("shared", request_shared_client),
+    )
+
+    results = {}
+    with stand_in_server() as url:
+        for name, strategy in strategies:
+            start = time.perf_counter()
+            for _ in range(count):
+                strategy(url)
+            elapsed = time.perf_counter() - start
+
+            results[name] = {
+                "seconds": elapsed,
+                "requests_per_second": count / elapsed,
+            }
+
+    return results
+
+
+def main() -> None:
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--count", type=int, default=500, help="The number of requests to make."
+    )
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    results = run(args.count)
+
+    for name, result in results.items():
+        print(
+            f"{name:>6}: {result['seconds']:.3f}s, "
+            f"{result['requests_per_second']:.0f} requests/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Compare the worker classes on no-op and I/O-bound tasks."""
+
+import argparse
+import logging
+import time
+from collections.abc import Callable
+from typing import Any
+
+import rq
+from rq import SimpleWorker, Worker
+
+from backtick import utils
+from backtick.async_worker import AsyncWorker
+from benchmarks.tasks import noop, wait_io, wait_io_async
+
+# The I/O-bound jobs take a while, so a tenth of them are run.
+IO_FRACTION = 10
+
+
+def run(count: int) -> dict[str, dict[str, float]]:
+    """Process `count` no-op jobs, and a tenth as many I/O-bound ones, per worker.
+
+    The asyncio worker only runs the coroutine version of the I/O-bound task,
+    since it runs sync tasks like the non-forking worker does.
+
+    Args:
+        count (int): The number of no-op jobs to process.
+
+    Returns:
+        dict[str, dict[str, float]]: Wall time and throughput per worker class and
+        task.
+    """
+
+    connection = utils.get_redis()
+    queue = rq.Queue(noop.queue, connection=connection)  # type: ignore
+    io_count = max(count // IO_FRACTION, 1)
+    cases: tuple[tuple[str, type[rq.Worker], Callable[..., Any], int], ...] = (
+        ("fork", Worker, noop, count),
+        ("no-fork", SimpleWorker, noop, count),
+        ("fork/io", Worker, wait_io, io_count),
+        ("no-fork/io", SimpleWorker, wait_io, io_count),
+        ("async/io", AsyncWorker, wait_io_async, io_count),
+    )
+
+    results = {}
+    for name, worker_class, task, jobs in cases:
+        queue.empty()
+        queue.enqueue_many(
+            [
+                rq.Queue.prepare_data(
+                    task,
+                    timeout=task.timeout,  # type: ignore
+                    result_ttl=0,
+                )
+                for _ in range(jobs)
+            ]
+        )
+
+        worker = worker_class([queue], connection=connection)
+        start = time.perf_counter()
+        worker.work(burst=True)
+        elapsed = time.perf_counter() - start
+
+        results[name] = {
+            "seconds": elapsed,
+            "jobs_per_second": jobs / elapsed,
+        }
+
+    return results
+
+
+def main() -> None:
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--count", type=int, default=500, help="The number of no-op jobs to process."
+    )
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    results = run(args.count)
+
+    for name, result in results.items():
+        print(
+            f"{name:>10}: {result['seconds']:.3f}s, "
+            f"{result['jobs_per_second']:.0f} jobs/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Compare rq's pickle serializer against the compact ones on job payloads.
+
+The sizes are those of the fields rq writes to Redis and the times include rq's own
+encoding of them: rq zlib compresses the job data on top of the serializer and base64
+encodes the results.
+"""
+
+import argparse
+import base64
+import logging
+import random
+import time
+import zlib
+from collections.abc import Callable
+from typing import Any
+
+from rq.serializers import DefaultSerializer
+
+from backtick import serializers
+
+# Seeded, so every run serializes the same payloads.
+_random = random.Random(0)
+
+TAGS = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta"]
+
+# The func name, instance, args and kwargs rq serializes for a job.
+PAYLOADS: dict[str, tuple[Any, ...]] = {
+    "small": (
+        "backtick.tasks.make_request",
+        None,
+        (),
+        {"url": "https://httpbin.org/post", "data": {"id": 42, "name": "backtick"}},
+    ),
+    "large": (
+        "backtick.tasks.make_request",
+        None,
+        (),
+        {
+            "url": "https://httpbin.org/post",
+            "data": {
+                "records": [
+                    {
+                        "id": _random.randrange(10**9),
+                        "email": f"{_random.getrandbits(40):x}@example.com",
+                        "score": _random.random(),
+                        "tags": _random.sample(TAGS, 3),
+                        "active": _random.random() < 0.5,
+                    }
+                    for _ in range(1000)
+                ]
+            },
+        },
+    ),
+}
+
+# A task result, e.g. the body of an API response returned by a task.
+RESULT: dict[str, Any] = PAYLOADS["large"][3]["data"]
+
+# How rq encodes and decodes the serialized payloads of each field.
+FIELDS: dict[str, tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    "data": (zlib.compress, zlib.decompress),
+    "result": (base64.b64encode, base64.b64decode),
+}
+
+# The format and compression of the compact serializers to compare.
+SERIALIZERS: dict[str, tuple[str, str | None]] = {
+    "json": ("json", None),
+    "json+zlib": ("json", "zlib"),
+    "msgpack+zstd": ("msgpack", "zstd"),
+    "msgpack+lz4": ("msgpack", "lz4"),
+}
+
+
+def run(count: int) -> dict[str, dict[str, float]]:
+    """Encode and decode every payload `count` times with each serializer.
+
+    Args:
+        count (int): The number of times each payload is encoded and decoded.
+
+    Returns:
+        dict[str, dict[str, float]]: Bytes in Redis and encode and decode times in
+        microseconds, per field, payload and serializer.
+    """
+
+    compared: dict[str, Any] = {"pickle": DefaultSerializer}
+    for name, (format, compression) in SERIALIZERS.items():
+        compared[name] = serializers.CompactSerializer(format, compression)
+
+    payloads: list[tuple[str, str, Any]] = [
+        ("data", name, payload) for name, payload in PAYLOADS.items()
+    ]
+    payloads.append(("result", "large", RESULT))
+
+    results = {}
+    for field, payload_name, payload in payloads:
+        encode_field, decode_field = FIELDS[field]
+        for serializer_name, serializer in compared.items():
+            start = time.perf_counter()
+            for _ in range(count):
+                data = encode_field(serializer.dumps(payload))
+            encode = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for _ in range(count):
+                serializer.loads(decode_field(data))
+            decode = time.perf_counter() - start
+
+            results[f"{field}/{payload_name}/{serializer_name}"] = {
+                "bytes": len(data),
+                "encode_us": encode / count * 1e6,
+                "decode_us": decode / count * 1e6,
+            }
+
+    return results
+
+
+def main() -> None:
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--count",
+        type=int,
+        default=1000,
+        help="The number of times each payload is encoded and decoded.",
+    )
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)
+    results = run(args.count)
+
+    for name, result in results.items():
+        print(
+            f"{name:>26}: {result['bytes']:>7.0f} bytes, "
+            f"encode {result['encode_us']:.1f}us, decode {result['decode_us']:.1f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Compare the per-datetime enqueue loop against the pipelined bulk path."""
+
+import argparse
+import datetime
+import logging
+import time
+from typing import Any
+
+import redis
+import rq
+from rq.registry import ScheduledJobRegistry
+
+from backtick import dispatch, settings, task_registry
+from benchmarks.tasks import noop
+
+
+class CountingConnection(redis.Connection):
+    """A redis connection that counts the round trips made through it."""
+
+    round_trips = 0
+
+    def send_packed_command(self, *args: Any, **kwargs: Any) -> None:
+        CountingConnection.round_trips += 1
+        super().send_packed_command(*args, **kwargs)
+
+
+def enqueue_loop(queue: rq.Queue, datetimes: list[datetime.datetime]) -> list[str]:
+    """Schedule the jobs one `enqueue_at` call at a time."""
+
+    return [
+        queue.enqueue_at(
+            dt,
+            noop,
+            timeout=noop.timeout,  # type: ignore
+            result_ttl=noop.result_ttl,  # type: ignore
+        ).id
+        for dt in datetimes
+    ]
+
+
+def enqueue_bulk(queue: rq.Queue, datetimes: list[datetime.datetime]) -> list[str]:
+    """Schedule the jobs through the pipelined bulk path."""
+
+    return dispatch.schedule_jobs_bulk(
+        queue=queue,
+        spec=task_registry.TaskSpec.from_func("noop", noop),
+        datetimes=datetimes,
+        kwargs={},
+    )
+
+
+def run(count: int) -> dict[str, dict[str, float]]:
+    """Run both enqueue strategies for `count` datetimes.
+
+    Args:
+        count (int): The number of datetimes to schedule.
+
+    Returns:
+        dict[str, dict[str, float]]: Wall time and round trips per strategy.
+    """
+
+    connection = redis.Redis(
+        connection_pool=redis.ConnectionPool.from_url(
+            settings.BACKTICK_REDIS_URL, connection_class=CountingConnection
+        )
+    )
+    queue = rq.Queue(noop.queue, connection=connection)  # type: ignore
+    registry = ScheduledJobRegistry(queue=queue)
+
+    now = datetime.datetime.now(tz=datetime.timezone.utc)
+    datetimes = [now + datetime.timedelta(minutes=1, seconds=i) for i in range(count)]
+
+    results = {}
+    for name, strategy in (("loop", enqueue_loop), ("bulk", enqueue_bulk)):
+        CountingConnection.round_trips = 0
+        start = time.perf_counter()
+        job_ids = strategy(queue, datetimes)
+        elapsed = time.perf_counter() - start
+
+        results[name] = {
+            "seconds": elapsed,
+            "round_trips": CountingConnection.round_trips,
+            "jobs_per_second": count / elapsed,
+        }
+
+        # Clean up so that the worker never picks up the benchmark jobs.
+        for job_id in job_ids:
+            registry.remove(job_id, delete_job=True)
+
+    return results
+
+
+def main() -> None:
+    """Run the benchmark."""
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--count", type=int, default=500, help="The number of datetimes to schedule."
+    )
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    results = run(args.count)
+
+    for name, result in results.items():
+        print(
+            f"{name:>5}: {result['seconds']:.3f}s, "
+            f"{result['round_trips']} round trips, "
+            f"{result['jobs_per_second']:.0f} jobs/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
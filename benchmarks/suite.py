@@ -0,0 +1,174 @@
+"""Run the benchmarks, save the results as JSON and compare them to a baseline.
+
+Save the results of a known good revision with `--output baseline.json`, then run
+the suite with `--baseline baseline.json` on a change to see every metric that got
+worse by more than `--threshold`. The suite exits with status 1 when one did.
+"""
+
+import argparse
+import datetime
+import json
+import logging
+import platform
+import sys
+from collections.abc import Callable
+from typing import Any, NamedTuple
+
+import rq
+
+from backtick import utils
+from benchmarks import (
+    api,
+    dispatch_tasks,
+    http_client,
+    run_worker,
+    serializers,
+    submit_tasks,
+)
+
+# The benchmarks of the suite and the count each one runs with.
+BENCHMARKS: dict[str, tuple[Callable[[int], dict[str, dict[str, float]]], int]] = {
+    "api": (api.run, 200),
+    "dispatch": (dispatch_tasks.run, 200),
+    "submit": (submit_tasks.run, 500),
+    "worker": (run_worker.run, 500),
+    "http": (http_client.run, 500),
+    "serializers": (serializers.run, 1000),
+}
+
+# Metrics with these suffixes are better when higher, all others when lower.
+HIGHER_IS_BETTER = ("per_second",)
+
+
+class Change(NamedTuple):
+    """The change of a metric from the baseline."""
+
+    metric: str
+    baseline: float
+    current: float
+    # Relative change, positive when the metric got worse.
+    regression: float
+
+
+def run(names: list[str], scale: float) -> dict[str, Any]:
+    """Run benchmarks of the suite.
+
+    Args:
+        names (list[str]): The benchmarks to run.
+        scale (float): The factor applied to the count of every benchmark.
+
+    Returns:
+        dict[str, Any]: The environment, counts and results of the benchmarks.
+    """
+
+    counts = {name: max(int(BENCHMARKS[name][1] * scale), 2) for name in names}
+    results = {}
+    for name in names:
+        logging.warning("Running the %s benchmark", name)
+        results[name] = BENCHMARKS[name][0](counts[name])
+
+    return {
+        "created_at": datetime.datetime.now(tz=datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "rq": rq.__version__,
+        "redis": utils.get_redis().info("server")["redis_version"],
+        "counts": counts,
+        "results": results,
+    }
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any]) -> list[Change]:
+    """Compare the metrics of a run to the ones of a baseline.
+
+    Metrics missing from either run are skipped, and so are the benchmarks that
+    ran with another count, whose wall times aren't comparable.
+
+    Args:
+        current (dict[str, Any]): The output of `run`.
+        baseline (dict[str, Any]): The output of an earlier `run`.
+
+    Returns:
+        list[Change]: The change of every metric found in both runs.
+    """
+
+    changes = []
+    for name, cases in current["results"].items():
+        if baseline.get("counts", {}).get(name) != current["counts"][name]:
+            logging.warning("Skipping %s, the baseline ran another count", name)
+            continue
+
+        for case, metrics in cases.items():
+            baseline_metrics = baseline["results"].get(name, {}).get(case, {})
+            for metric, value in metrics.items():
+                before = baseline_metrics.get(metric)
+                if not before:
+                    continue
+                regression = (value - before) / before
+                if metric.endswith(HIGHER_IS_BETTER):
+                    regression = -regression
+                changes.append(
+                    Change(f"{name}/{case}/{metric}", before, value, regression)
+                )
+
+    return changes
+
+
+def main() -> None:
+    """Run the suite."""
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--benchmark",
+        action="append",
+        choices=list(BENCHMARKS),
+        help="Only run this benchmark, can be repeated.",
+    )
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1,
+        help="The factor applied to the count of every benchmark.",
+    )
+    parser.add_argument(
+        "--output", help="The file to write the results to instead of stdout."
+    )
+    parser.add_argument("--baseline", help="The results to compare against.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="The relative change from the baseline reported as a regression.",
+    )
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    current = run(args.benchmark or list(BENCHMARKS), args.scale)
+
+    output = json.dumps(current, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if not args.baseline:
+        return
+
+    with open(args.baseline) as f:
+        changes = compare(current, json.load(f))
+
+    regressions = [change for change in changes if change.regression > args.threshold]
+    for change in changes:
+        flag = "REGRESSION" if change in regressions else ""
+        print(
+            f"{change.metric:>45}: {change.baseline:>12.3f} -> "
+            f"{change.current:>12.3f} {-change.regression:>+8.1%} {flag}",
+            file=sys.stderr,
+        )
+    if regressions:
+        print(f"{len(regressions)} metrics regressed", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
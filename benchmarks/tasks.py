@@ -0,0 +1,113 @@
+"""Tasks used by the benchmarks."""
+
+import asyncio
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+
+import redis
+from rq.job import Job
+from rq.queue import Queue
+from rq.registry import (
+    CanceledJobRegistry,
+    FailedJobRegistry,
+    FinishedJobRegistry,
+    ScheduledJobRegistry,
+    StartedJobRegistry,
+)
+
+from backtick import settings, task_registry, utils
+
+# The queue of the benchmark tasks, which the workers of the app don't listen to.
+QUEUE = "backtick-benchmark"
+
+# Seconds the I/O-bound tasks wait for, like a call to a fast service.
+IO_SECONDS = 0.01
+
+
+@utils.task(queue=QUEUE, timeout=60, result_ttl=60)
+def noop() -> None:
+    """Do nothing.
+
+    Args:
+        None
+
+    Returns:
+        None
+    """
+
+
+@utils.task(queue=QUEUE, timeout=60, result_ttl=60)
+def wait_io() -> None:
+    """Block on I/O for `IO_SECONDS`.
+
+    Args:
+        None
+
+    Returns:
+        None
+    """
+
+    time.sleep(IO_SECONDS)
+
+
+@utils.task(queue=QUEUE, timeout=60, result_ttl=60)
+async def wait_io_async() -> None:
+    """Wait on I/O for `IO_SECONDS` without blocking the event loop.
+
+    Args:
+        None
+
+    Returns:
+        None
+    """
+
+    await asyncio.sleep(IO_SECONDS)
+
+
+@contextmanager
+def registered() -> Iterator[None]:
+    """Register `noop` as a task of the app for the duration of the block.
+
+    Yields:
+        None
+    """
+
+    tasks = settings.BACKTICK_TASKS
+    settings.BACKTICK_TASKS = {**tasks, "noop": f"{__name__}.noop"}
+    task_registry.reload_registry()
+    try:
+        yield
+    finally:
+        settings.BACKTICK_TASKS = tasks
+        task_registry.reload_registry()
+
+
+def clean_up(connection: redis.Redis, job_ids: Iterable[str] = ()) -> None:
+    """Delete the benchmark jobs and the queue and registries they were in.
+
+    Args:
+        connection (redis.Redis): The Redis connection.
+        job_ids (Iterable[str]): The ids of the jobs to delete.
+
+    Returns:
+        None
+    """
+
+    with connection.pipeline(transaction=False) as pipeline:
+        for job_id in job_ids:
+            pipeline.delete(Job.key_for(job_id))
+        pipeline.delete(
+            Queue.redis_queue_namespace_prefix + QUEUE,
+            *(
+                registry_class.key_template.format(QUEUE)
+                for registry_class in (
+                    ScheduledJobRegistry,
+                    StartedJobRegistry,
+                    FinishedJobRegistry,
+                    FailedJobRegistry,
+                    CanceledJobRegistry,
+                )
+            ),
+        )
+        pipeline.execute()
@@ -1,14 +1,17 @@
 """Cancel all the tasks."""
 
 import argparse
+import datetime
 import logging
+import time
+from collections.abc import Iterable
 
 import rq
 from rq.command import send_kill_horse_command
 from rq.registry import ScheduledJobRegistry
 from rq.worker import Worker, WorkerStatus
 
-from backtick import utils
+from backtick import payloads, registries, scheduler, settings, utils
 
 
 def cancel_running_tasks() -> None:
@@ -22,18 +25,94 @@ def cancel_running_tasks() -> None:
             send_kill_horse_command(connection, worker.name)
 
 
-def cancel_scheduled_tasks() -> None:
-    """Cancel scheduled jobs."""
+def cancel_scheduled_tasks(
+    *,
+    task_names: Iterable[str] = (),
+    after: datetime.datetime | None = None,
+    before: datetime.datetime | None = None,
+    chunk_size: int | None = None,
+    dry_run: bool = False,
+) -> int:
+    """Cancel scheduled jobs.
+
+    The scheduled job registries and the sharded scheduler buckets of all the queues
+    in `settings.BACKTICK_QUEUES` are read in chunks with `registries.iter_registry`,
+    and every chunk is deleted in a single pipeline, so memory use doesn't grow with
+    the number of scheduled jobs. Every chunk starts after the last job of the
+    previous one, so reading it doesn't get slower with the number of jobs kept by
+    the filters.
+
+    Args:
+        task_names (Iterable[str]): Only cancel the jobs of these registered tasks.
+        All the jobs are cancelled when it's empty.
+        after (datetime.datetime | None): Only cancel the jobs scheduled at or after
+        this datetime.
+        before (datetime.datetime | None): Only cancel the jobs scheduled at or
+        before this datetime.
+        chunk_size (int | None): The number of jobs read and deleted at a time.
+        Defaults to `settings.BACKTICK_CANCEL_CHUNK_SIZE`.
+        dry_run (bool): Only count the jobs that would be cancelled.
+
+    Returns:
+        int: The number of cancelled jobs, or of jobs that would be cancelled on a
+        dry run.
+    """
 
     connection = utils.get_redis()
-    queue = rq.Queue(connection=connection)
-
-    registry = ScheduledJobRegistry(queue=queue)
-
-    # This is how to remove a job from a registry
-    for job_id in registry.get_job_ids():
-        logging.info("Removing scheduled job %s", job_id)
-        registry.remove(job_id, delete_job=True)
+    chunk_size = chunk_size or settings.BACKTICK_CANCEL_CHUNK_SIZE
+    func_names = {settings.BACKTICK_TASKS[name] for name in task_names}
+
+    total = 0
+    started_at = time.monotonic()
+
+    for queue_name in settings.BACKTICK_QUEUES.values():
+        queue = rq.Queue(name=queue_name, connection=connection)
+        registry_key = ScheduledJobRegistry(queue=queue).key
+        pages = registries.iter_registry(
+            connection,
+            queue_name=queue_name,
+            registry=registries.Registry.SCHEDULED,
+            limit=chunk_size,
+            after=after,
+            before=before,
+        )
+
+        for page in pages:
+            matched = {
+                job_id: score
+                for job_id, score, func_name in page
+                if not func_names or func_name in func_names
+            }
+
+            if not dry_run and matched:
+                payloads.release(connection, list(matched))
+                with connection.pipeline() as pipeline:
+                    pipeline.zrem(registry_key, *matched)
+                    for job_id, score in matched.items():
+                        if settings.BACKTICK_SCHEDULER_SHARDS:
+                            scheduler.buffer_unscheduled_job(
+                                pipeline, queue_name, job_id, score
+                            )
+                        job_key = rq.job.Job.key_for(job_id)
+                        pipeline.delete(
+                            job_key,
+                            job_key + b":dependents",
+                            job_key + b":dependencies",
+                        )
+                    pipeline.execute()
+
+            total += len(matched)
+
+            elapsed = time.monotonic() - started_at
+            logging.info(
+                "%s %d scheduled jobs so far (queue %s, %.0f jobs/s)",
+                "Found" if dry_run else "Removed",
+                total,
+                queue_name,
+                total / elapsed if elapsed else 0,
+            )
+
+    return total
 
 
 def cancel_all_tasks() -> None:
@@ -52,6 +131,34 @@ def main() -> None:
     parser.add_argument(
         "--scheduled", action="store_true", help="Cancel scheduled tasks."
     )
+    parser.add_argument(
+        "--task",
+        action="append",
+        default=[],
+        choices=settings.BACKTICK_TASKS,
+        help="Only cancel the scheduled tasks with this name. Can be repeated.",
+    )
+    parser.add_argument(
+        "--after",
+        type=datetime.datetime.fromisoformat,
+        help="Only cancel the tasks scheduled at or after this ISO datetime.",
+    )
+    parser.add_argument(
+        "--before",
+        type=datetime.datetime.fromisoformat,
+        help="Only cancel the tasks scheduled at or before this ISO datetime.",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=settings.BACKTICK_CANCEL_CHUNK_SIZE,
+        help="Number of scheduled tasks read and deleted at a time.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only count the scheduled tasks that would be cancelled.",
+    )
 
     args = parser.parse_args()
     is_all = args.all
@@ -65,7 +172,13 @@ def main() -> None:
         cancel_running_tasks()
 
     elif is_scheduled:
-        cancel_scheduled_tasks()
+        cancel_scheduled_tasks(
+            task_names=args.task,
+            after=args.after,
+            before=args.before,
+            chunk_size=args.chunk_size,
+            dry_run=args.dry_run,
+        )
 
     else:
         parser.error("Invalid flag.")
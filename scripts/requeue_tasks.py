@@ -0,0 +1,102 @@
+"""Requeue the failed tasks."""
+
+import argparse
+
+from backtick import dispatch, settings
+
+
+def requeue_failed_tasks(
+    *,
+    queue_names: list[str],
+    task_names: list[str],
+    exception_types: list[str],
+    rate: float | None = None,
+    chunk_size: int | None = None,
+    dry_run: bool = False,
+) -> int:
+    """Requeue the failed jobs of the queues, at a bounded rate.
+
+    Args:
+        queue_names (list[str]): The names of the queues. All the queues of
+        `settings.BACKTICK_QUEUES` when it's empty.
+        task_names (list[str]): Only requeue the jobs of these registered tasks.
+        exception_types (list[str]): Only requeue the jobs that failed with one of
+        these exception types.
+        rate (float | None): The maximum number of jobs requeued per second.
+        chunk_size (int | None): The number of jobs read and requeued at a time.
+        dry_run (bool): Only count the jobs that would be requeued.
+
+    Returns:
+        int: The number of requeued jobs, or of jobs that would be requeued on a dry
+        run.
+    """
+
+    return sum(
+        len(chunk)
+        for chunk in dispatch.requeue_failed_chunks(
+            queue_names=queue_names,
+            task_names=task_names,
+            exception_types=exception_types,
+            rate=rate,
+            chunk_size=chunk_size,
+            dry_run=dry_run,
+        )
+    )
+
+
+def main() -> None:
+    """Run the script."""
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--queue",
+        action="append",
+        default=[],
+        choices=settings.BACKTICK_QUEUES.values(),
+        help="Only requeue the failed tasks of this queue. Can be repeated.",
+    )
+    parser.add_argument(
+        "--task",
+        action="append",
+        default=[],
+        choices=settings.BACKTICK_TASKS,
+        help="Only requeue the failed tasks with this name. Can be repeated.",
+    )
+    parser.add_argument(
+        "--exception",
+        action="append",
+        default=[],
+        help="Only requeue the tasks that failed with this exception type, e.g. "
+        "ValueError or httpx.ConnectError. Can be repeated.",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=settings.BACKTICK_REQUEUE_RATE,
+        help="Maximum number of failed tasks requeued per second.",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=settings.BACKTICK_REQUEUE_CHUNK_SIZE,
+        help="Number of failed tasks read and requeued at a time.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only count the failed tasks that would be requeued.",
+    )
+
+    args = parser.parse_args()
+    requeue_failed_tasks(
+        queue_names=args.queue,
+        task_names=args.task,
+        exception_types=args.exception,
+        rate=args.rate,
+        chunk_size=args.chunk_size,
+        dry_run=args.dry_run,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 """Canned objects for testing."""
 
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
 import pytest
 import redis
@@ -16,6 +16,14 @@ def mock_settings():
             "task2": "backtick.tasks.task2",
         }
         BACKTICK_QUEUES = {"default": "queue1", "other": "queue2"}
+        BACKTICK_PIPELINE_CHUNK_SIZE = 2
+        BACKTICK_BATCH_MAX_SIZE = 3
+        BACKTICK_CANCEL_CHUNK_SIZE = 2
+        BACKTICK_SCHEDULER_SHARDS = 0
+        BACKTICK_IDEMPOTENCY_TTL = 60
+        BACKTICK_STATUS_CACHE_TTL = 60
+        BACKTICK_STATUS_CACHE_SIZE = 3
+        BACKTICK_REQUEUE_MAX_TASKS = 10
 
     return Settings()
 
@@ -23,3 +31,14 @@ def mock_settings():
 @pytest.fixture()
 def mock_redis():
     return MagicMock(spec=redis.Redis)
+
+
+@pytest.fixture()
+def _mock_task_registry(mock_settings):
+    """Build the task registry from the canned settings on first use."""
+
+    with (
+        patch("backtick.task_registry.settings", mock_settings),
+        patch.dict("backtick.task_registry._cache", clear=True),
+    ):
+        yield
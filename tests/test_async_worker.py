@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+import rq
+
+from backtick import payloads, utils
+from backtick.async_worker import AsyncWorker
+
+
+async def async_task_ok(*, value):
+    await asyncio.sleep(0.5)
+    return value
+
+
+async def async_task_slow():
+    await asyncio.sleep(5)
+
+
+async def async_task_sleep(*, seconds):
+    await asyncio.sleep(seconds)
+
+
+def sync_task_ok():
+    return "sync"
+
+
+@pytest.fixture()
+def queue():
+    queue = rq.Queue("backtick-test-async", connection=utils.get_redis())
+    yield queue
+    queue.delete(delete_jobs=True)
+
+
+@pytest.mark.integration()
+def test_async_worker_runs_jobs_concurrently(queue):
+    jobs = [queue.enqueue(async_task_ok, kwargs={"value": i}) for i in range(20)]
+    sync_job = queue.enqueue(sync_task_ok)
+
+    worker = AsyncWorker([queue], connection=queue.connection, max_jobs=20)
+    start = time.perf_counter()
+    worker.work(burst=True)
+
+    # The 20 jobs of half a second each ran at the same time
+    assert time.perf_counter() - start < 2
+    assert [job.latest_result().return_value for job in jobs] == list(range(20))
+    assert all(job.get_status() == rq.job.JobStatus.FINISHED for job in jobs)
+    assert sync_job.latest_result().return_value == "sync"
+
+
+@pytest.mark.integration()
+def test_async_worker_limits_concurrency(queue):
+    jobs = [queue.enqueue(async_task_ok, kwargs={"value": i}) for i in range(4)]
+
+    worker = AsyncWorker([queue], connection=queue.connection, max_jobs=2)
+    start = time.perf_counter()
+    worker.work(burst=True)
+
+    # Two batches of two jobs
+    assert time.perf_counter() - start >= 1
+    assert all(job.get_status() == rq.job.JobStatus.FINISHED for job in jobs)
+
+
+@pytest.mark.integration()
+def test_async_worker_timeout(queue):
+    job = queue.enqueue(async_task_slow, job_timeout=1)
+
+    worker = AsyncWorker([queue], connection=queue.connection)
+    start = time.perf_counter()
+    worker.work(burst=True)
+
+    assert time.perf_counter() - start < 3
+    assert job.get_status() == rq.job.JobStatus.FAILED
+    assert job in queue.failed_job_registry
+    assert "JobTimeoutException" in job.latest_result().exc_string
+
+
+@pytest.mark.integration()
+def test_async_worker_heartbeats_jobs(queue):
+    jobs = [queue.enqueue(async_task_sleep, kwargs={"seconds": 3}) for _ in range(2)]
+    worker = AsyncWorker(
+        [queue], connection=queue.connection, job_monitoring_interval=1
+    )
+    registry_key = queue.started_job_registry.key
+    samples = []
+
+    def sample():
+        for delay in (0.5, 1.5):
+            time.sleep(delay)
+            samples.append(
+                (
+                    [queue.connection.zscore(registry_key, job.id) for job in jobs],
+                    worker.get_current_job_id(),
+                )
+            )
+
+    sampler = threading.Thread(target=sample)
+    sampler.start()
+    worker.work(burst=True)
+    sampler.join()
+
+    # The jobs in flight are started, without being the current job of the worker
+    (scores, current_job_id), (later_scores, _) = samples
+    assert all(scores)
+    assert current_job_id is None
+
+    # Their heartbeats are extended while they run
+    assert all(later > score for score, later in zip(scores, later_scores, strict=True))
+    assert all(job.get_status() == rq.job.JobStatus.FINISHED for job in jobs)
+    assert not queue.connection.zcard(registry_key)
+
+
+@pytest.mark.integration()
+@patch("backtick.payloads.settings.BACKTICK_PAYLOAD_OFFLOAD_THRESHOLD", 0)
+def test_async_worker_loads_payloads(queue):
+    payload = payloads.prepare({"value": "offloaded"})
+    queue = rq.Queue(
+        queue.name, connection=queue.connection, job_class=payloads.PayloadJob
+    )
+    job = queue.create_job(async_task_ok)
+    job.payload_ref = payload.digest
+    with queue.connection.pipeline() as pipeline:
+        payloads.buffer_store(pipeline, payload, 1)
+        pipeline.execute()
+    queue.enqueue_job(job)
+
+    AsyncWorker([queue], connection=queue.connection).work(burst=True)
+
+    assert job.latest_result().return_value == "offloaded"
+    with pytest.raises(LookupError):
+        payloads.load(queue.connection, payload.digest)
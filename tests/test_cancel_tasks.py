@@ -0,0 +1,144 @@
+import datetime
+import logging
+from unittest.mock import patch
+
+import pytest
+import rq
+
+from backtick import notifications, scheduler, utils
+from scripts import cancel_tasks
+
+QUEUE_NAME = "backtick-test-cancel-tasks"
+NOW = datetime.datetime(2030, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def task_ok():
+    return "result"
+
+
+def task_other():
+    return "result"
+
+
+@pytest.fixture()
+def queue():
+    tasks = {"task_ok": f"{__name__}.task_ok", "task_other": f"{__name__}.task_other"}
+    with (
+        patch("backtick.settings.BACKTICK_QUEUES", {"test": QUEUE_NAME}),
+        patch("backtick.settings.BACKTICK_TASKS", tasks),
+        patch("backtick.settings.BACKTICK_SCHEDULER_SHARDS", 3),
+        patch("backtick.settings.BACKTICK_SCHEDULER_BUCKET_SECONDS", 10),
+    ):
+        queue = rq.Queue(
+            QUEUE_NAME,
+            connection=utils.get_redis(),
+            job_class=notifications.NotifyingJob,
+        )
+        yield queue
+        queue.delete(delete_jobs=True)
+        queue.connection.delete(
+            rq.registry.ScheduledJobRegistry(queue=queue).key,
+            *queue.connection.scan_iter(f"{scheduler.KEY_PREFIX}{QUEUE_NAME}:*"),
+        )
+
+
+def schedule(queue):
+    """Schedule jobs of both tasks in rq's registry and the shards, with ties."""
+
+    scheduled = {}
+    for i in range(4):
+        func = task_other if i % 4 == 3 else task_ok
+        job = queue.enqueue_at(NOW + datetime.timedelta(seconds=i % 2 * 5), func)
+        scheduled[job.id] = NOW.timestamp() + i % 2 * 5, func
+    with queue.connection.pipeline() as pipeline:
+        for i in range(12):
+            func = task_other if i % 4 == 3 else task_ok
+            job = queue.create_job(func)
+            timestamp = NOW.timestamp() + i % 4 * 5
+            pipeline.hset(job.key, mapping=job.to_dict())
+            scheduler.buffer_scheduled_job(pipeline, QUEUE_NAME, job.id, timestamp)
+            scheduled[job.id] = timestamp, func
+        pipeline.execute()
+    return scheduled
+
+
+def remaining(queue):
+    """Get the ids of the jobs still scheduled, in rq's registry or in a bucket."""
+
+    connection = queue.connection
+    job_ids = connection.zrange(
+        rq.registry.ScheduledJobRegistry(queue=queue).key, 0, -1
+    )
+    for key in scheduler.bucket_keys(connection, QUEUE_NAME):
+        job_ids += connection.zrange(key, 0, -1)
+    return {job_id.decode() for job_id in job_ids}
+
+
+@pytest.mark.integration()
+@pytest.mark.parametrize("chunk_size", [1, 4, 100])
+def test_cancel_scheduled_tasks(queue, chunk_size, caplog):
+    scheduled = schedule(queue)
+    with caplog.at_level(logging.INFO):
+        total = cancel_tasks.cancel_scheduled_tasks(chunk_size=chunk_size)
+
+    # Every job is cancelled once, across the ties of the registry and the buckets
+    assert total == len(scheduled)
+    assert not remaining(queue)
+    assert not any(
+        queue.connection.exists(rq.job.Job.key_for(job_id)) for job_id in scheduled
+    )
+    assert caplog.messages[-1].startswith(
+        f"Removed {len(scheduled)} scheduled jobs so far (queue {QUEUE_NAME}"
+    )
+
+
+@pytest.mark.integration()
+def test_cancel_scheduled_tasks_filters(queue):
+    scheduled = schedule(queue)
+
+    # Only the jobs of a task
+    total = cancel_tasks.cancel_scheduled_tasks(task_names=["task_other"], chunk_size=2)
+    other = {job_id for job_id, (_, func) in scheduled.items() if func is task_other}
+    assert total == len(other)
+    assert remaining(queue) == scheduled.keys() - other
+    assert not any(queue.connection.exists(rq.job.Job.key_for(i)) for i in other)
+
+    # Only the jobs of a time window, of the task left
+    window = NOW + datetime.timedelta(seconds=5), NOW + datetime.timedelta(seconds=10)
+    total = cancel_tasks.cancel_scheduled_tasks(
+        after=window[0], before=window[1].replace(tzinfo=None), chunk_size=2
+    )
+    in_window = {
+        job_id
+        for job_id, (timestamp, func) in scheduled.items()
+        if func is task_ok
+        and window[0].timestamp() <= timestamp <= window[1].timestamp()
+    }
+    assert total == len(in_window)
+    assert remaining(queue) == scheduled.keys() - other - in_window
+    assert all(
+        queue.connection.exists(rq.job.Job.key_for(job_id))
+        for job_id in remaining(queue)
+    )
+
+
+@pytest.mark.integration()
+def test_cancel_scheduled_tasks_dry_run(queue, caplog):
+    scheduled = schedule(queue)
+    connection = queue.connection
+    keys = [
+        rq.registry.ScheduledJobRegistry(queue=queue).key,
+        *connection.scan_iter(f"{scheduler.KEY_PREFIX}{QUEUE_NAME}:*"),
+        *(rq.job.Job.key_for(job_id) for job_id in scheduled),
+    ]
+    before = [connection.dump(key) for key in keys]
+
+    with caplog.at_level(logging.INFO):
+        total = cancel_tasks.cancel_scheduled_tasks(
+            task_names=["task_ok"], chunk_size=3, dry_run=True
+        )
+
+    # The jobs are counted and Redis is left as it was
+    assert total == sum(func is task_ok for _, func in scheduled.values())
+    assert [connection.dump(key) for key in keys] == before
+    assert caplog.messages[-1].startswith(f"Found {total} scheduled jobs so far")
@@ -1,8 +1,12 @@
+import asyncio
 import datetime
 import time
+import uuid
+from contextlib import ExitStack
 from unittest.mock import patch
 
 import pytest
+import redis
 import rq
 
 from backtick import dispatch, utils
@@ -11,10 +15,11 @@ from backtick import dispatch, utils
 class FakeScheduleRequestDTO:
     """ScheduleRequestDTO without validaiton."""
 
-    def __init__(self, task_name, datetimes=None, kwargs=None):
+    def __init__(self, task_name, datetimes=None, kwargs=None, idempotency_key=None):
         self.task_name = task_name
         self.datetimes = datetimes
         self.kwargs = kwargs
+        self.idempotency_key = idempotency_key
 
 
 class FakeUnscheduleRequestDTO:
@@ -40,6 +45,7 @@ def task_retry():
     raise ValueError("fail")
 
 
+@pytest.mark.usefixtures("_mock_task_registry")
 @pytest.mark.integration()
 @patch("backtick.dispatch.utils.discover_task", new=lambda _: task_ok)
 def test_submit_tasks_ok(mock_settings):
@@ -63,6 +69,7 @@ def test_submit_tasks_ok(mock_settings):
         assert result.return_value == "result"
 
 
+@pytest.mark.usefixtures("_mock_task_registry")
 @pytest.mark.integration()
 @patch("backtick.dispatch.utils.discover_task", new=lambda _: task_error)
 def test_submit_tasks_error(mock_settings):
@@ -86,6 +93,7 @@ def test_submit_tasks_error(mock_settings):
         assert "ValueError: fail" in result.exc_string
 
 
+@pytest.mark.usefixtures("_mock_task_registry")
 @pytest.mark.integration()
 @patch("backtick.dispatch.utils.discover_task", new=lambda _: task_retry)
 def test_submit_tasks_retry(mock_settings):
@@ -108,6 +116,7 @@ def test_submit_tasks_retry(mock_settings):
         assert task.retry_intervals == [1, 2, 3]
 
 
+@pytest.mark.usefixtures("_mock_task_registry")
 @pytest.mark.integration()
 @patch("backtick.dispatch.utils.discover_task", new=lambda _: task_ok)
 def test_submit_scheduled_tasks_ok(mock_settings):
@@ -135,6 +144,7 @@ def test_submit_scheduled_tasks_ok(mock_settings):
         assert result.return_value == "result"
 
 
+@pytest.mark.usefixtures("_mock_task_registry")
 @pytest.mark.integration()
 @patch("backtick.dispatch.utils.discover_task", new=lambda _: task_error)
 def test_submit_scheduled_tasks_error(mock_settings):
@@ -163,6 +173,7 @@ def test_submit_scheduled_tasks_error(mock_settings):
         assert "ValueError: fail" in result.exc_string
 
 
+@pytest.mark.usefixtures("_mock_task_registry")
 @pytest.mark.integration()
 @patch("backtick.dispatch.utils.discover_task", new=lambda _: task_retry)
 def test_submit_scheduled_tasks_retry(mock_settings):
@@ -189,6 +200,7 @@ def test_submit_scheduled_tasks_retry(mock_settings):
         assert task.retry_intervals == [1, 2, 3]
 
 
+@pytest.mark.usefixtures("_mock_task_registry")
 @pytest.mark.integration()
 @patch("backtick.dispatch.utils.discover_task", new=lambda _: task_retry)
 def test_cancel_tasks(mock_settings):
@@ -219,3 +231,589 @@ def test_cancel_tasks(mock_settings):
         queue = rq.Queue(connection=connection)
         registry = rq.registry.CanceledJobRegistry(queue=queue)
         assert task_id in registry.get_job_ids()
+
+
+@pytest.mark.usefixtures("_mock_task_registry")
+@pytest.mark.integration()
+@patch("backtick.dispatch.utils.discover_task", new=lambda _: task_ok)
+def test_submit_scheduled_tasks_bulk(mock_settings):
+    with patch("backtick.dispatch.settings", mock_settings):
+        now = datetime.datetime.now(tz=datetime.timezone.utc)
+        dts = [now + datetime.timedelta(minutes=i + 1) for i in range(5)]
+        response = dispatch.submit_tasks(
+            schedule_request_dto=FakeScheduleRequestDTO(
+                task_name="task1",
+                datetimes=dts,
+                kwargs={},
+            )
+        )
+
+        # Five jobs flushed over three pipelines of at most two jobs each
+        assert len(response.task_ids) == 5
+
+        connection = utils.get_redis()
+        queue = rq.Queue(connection=connection)
+        registry = rq.registry.ScheduledJobRegistry(queue=queue)
+        for task_id, dt in zip(response.task_ids, dts, strict=True):
+            task = rq.job.Job.fetch(task_id, connection)
+            assert task.get_status() == rq.job.JobStatus.SCHEDULED
+            assert task.origin == "default"
+            assert registry.get_scheduled_time(task_id) == dt.replace(microsecond=0)
+
+        dispatch.cancel_tasks(
+            unschedule_request_dto=FakeUnscheduleRequestDTO(
+                task_ids=response.task_ids, enqueue_dependents=False
+            ),
+        )
+
+
+@utils.task("another", utils.get_redis())
+def task_another_queue():
+    return "result"
+
+
+class FakeBatchScheduleRequestDTO:
+    """BatchScheduleRequestDTO without validaiton."""
+
+    def __init__(self, requests):
+        self.requests = requests
+
+
+@pytest.mark.usefixtures("_mock_task_registry")
+@pytest.mark.integration()
+@patch(
+    "backtick.dispatch.utils.discover_task",
+    new=lambda name: task_ok if name.endswith("task1") else task_another_queue,
+)
+def test_submit_tasks_batch(mock_settings):
+    stack = ExitStack()
+    stack.enter_context(patch("backtick.dispatch.settings", mock_settings))
+    stack.enter_context(patch("backtick.dto.settings", mock_settings))
+
+    with stack:
+        dt = datetime.datetime.now(tz=datetime.timezone.utc) + datetime.timedelta(
+            minutes=1
+        )
+        response = dispatch.submit_tasks_batch(
+            batch_schedule_request_dto=FakeBatchScheduleRequestDTO(
+                requests=[
+                    {"task_name": "task1", "datetimes": [dt.isoformat()] * 3},
+                    {"task_name": "task3"},
+                    {"task_name": "task2", "datetimes": [dt.isoformat()]},
+                    {"task_name": "task1", "kwargs": {"foo": "bar"}},
+                ]
+            )
+        )
+
+        assert response.message == "2 of 4 tasks scheduled"
+        scheduled, unregistered, another_queue, bad_kwargs = response.results
+
+        # Invalid items are reported without failing the batch
+        assert unregistered.task_ids == []
+        assert unregistered.error == "Task task3 is not registered"
+        assert bad_kwargs.task_ids == []
+        assert bad_kwargs.error == "Kwargs do not match task kwargs"
+
+        # Valid items are grouped per queue
+        assert len(scheduled.task_ids) == 3
+        assert scheduled.error is None
+        for task_id in scheduled.task_ids:
+            task = rq.job.Job.fetch(task_id, utils.get_redis())
+            assert task.origin == "default"
+            assert task.get_status() == rq.job.JobStatus.SCHEDULED
+
+        assert len(another_queue.task_ids) == 1
+        task = rq.job.Job.fetch(another_queue.task_ids[0], utils.get_redis())
+        assert task.origin == "another"
+
+        dispatch.cancel_tasks(
+            unschedule_request_dto=FakeUnscheduleRequestDTO(
+                task_ids=scheduled.task_ids + another_queue.task_ids,
+                enqueue_dependents=False,
+            ),
+        )
+
+
+@pytest.mark.usefixtures("_mock_task_registry")
+@pytest.mark.integration()
+@patch("backtick.dispatch.utils.discover_task", new=lambda _: task_ok)
+def test_submit_tasks_batch_immediate(mock_settings):
+    stack = ExitStack()
+    stack.enter_context(patch("backtick.dispatch.settings", mock_settings))
+    stack.enter_context(patch("backtick.dto.settings", mock_settings))
+
+    with stack:
+        response = dispatch.submit_tasks_batch(
+            batch_schedule_request_dto=FakeBatchScheduleRequestDTO(
+                requests=[{"task_name": "task1"}, {"task_name": "task1"}]
+            )
+        )
+
+        assert response.message == "2 of 2 tasks scheduled"
+
+        time.sleep(1)
+        for result in response.results:
+            task = rq.job.Job.fetch(result.task_ids[0], utils.get_redis())
+            assert task.latest_result().return_value == "result"
+
+
+@pytest.mark.usefixtures("_mock_task_registry")
+@pytest.mark.integration()
+@patch("backtick.dispatch.utils.discover_task", new=lambda _: task_ok)
+def test_submit_tasks_batch_fallback_error(mock_settings):
+    stack = ExitStack()
+    stack.enter_context(patch("backtick.dispatch.settings", mock_settings))
+    stack.enter_context(patch("backtick.dto.settings", mock_settings))
+    stack.enter_context(
+        patch(
+            "backtick.dispatch._claim_idempotency_key",
+            side_effect=redis.ConnectionError("Connection refused"),
+        )
+    )
+
+    with stack:
+        dt = datetime.datetime.now(tz=datetime.timezone.utc) + datetime.timedelta(
+            minutes=1
+        )
+        response = dispatch.submit_tasks_batch(
+            batch_schedule_request_dto=FakeBatchScheduleRequestDTO(
+                requests=[
+                    {"task_name": "task1", "idempotency_key": "key"},
+                    {"task_name": "task1", "datetimes": [dt.isoformat()]},
+                ]
+            )
+        )
+
+        # The item submitted on its own fails without failing the batch
+        assert response.message == "1 of 2 tasks scheduled"
+        failed, scheduled = response.results
+        assert failed.task_ids == []
+        assert failed.error == "Connection refused"
+        assert len(scheduled.task_ids) == 1
+
+        # No pipeline is built for a group without chunked entries
+        assert dispatch._chunk_batch_group([]) == ([], [])
+
+        dispatch.cancel_tasks(
+            unschedule_request_dto=FakeUnscheduleRequestDTO(
+                task_ids=scheduled.task_ids, enqueue_dependents=False
+            ),
+        )
+
+
+@pytest.mark.usefixtures("_mock_task_registry")
+@pytest.mark.integration()
+@patch("backtick.dispatch.utils.discover_task", new=lambda _: task_ok)
+def test_submit_scheduled_tasks_idempotent(mock_settings):
+    with patch("backtick.dispatch.settings", mock_settings):
+        now = datetime.datetime.now(tz=datetime.timezone.utc)
+        dts = [now + datetime.timedelta(minutes=i + 1) for i in range(3)]
+        key = f"test-{uuid.uuid4()}"
+
+        responses = [
+            dispatch.submit_tasks(
+                schedule_request_dto=FakeScheduleRequestDTO(
+                    task_name="task1", datetimes=dts, kwargs={}, idempotency_key=key
+                )
+            )
+            for _ in range(2)
+        ]
+
+        # The retry returns the tasks of the first request without scheduling more
+        assert responses[0].task_ids == responses[1].task_ids
+        assert responses[1].message == "Tasks already scheduled"
+        connection = utils.get_redis()
+        registry = rq.registry.ScheduledJobRegistry(
+            queue=rq.Queue(connection=connection)
+        )
+        assert set(responses[0].task_ids) <= set(registry.get_job_ids())
+
+        # The key expires
+        ttl = connection.ttl(f"{dispatch.IDEMPOTENCY_KEY_PREFIX}task1:{key}")
+        assert 0 < ttl <= mock_settings.BACKTICK_IDEMPOTENCY_TTL
+
+        dispatch.cancel_tasks(
+            unschedule_request_dto=FakeUnscheduleRequestDTO(
+                task_ids=responses[0].task_ids, enqueue_dependents=False
+            ),
+        )
+
+
+@pytest.mark.usefixtures("_mock_task_registry")
+@pytest.mark.integration()
+@patch("backtick.dispatch.utils.discover_task", new=lambda _: task_ok)
+def test_submit_tasks_async_idempotent(mock_settings):
+    async def submit_twice(key):
+        return await asyncio.gather(
+            *(
+                dispatch.submit_tasks_async(
+                    schedule_request_dto=FakeScheduleRequestDTO(
+                        task_name="task1", kwargs={}, idempotency_key=key
+                    )
+                )
+                for _ in range(2)
+            )
+        )
+
+    with patch("backtick.dispatch.settings", mock_settings):
+        responses = asyncio.run(submit_twice(f"test-{uuid.uuid4()}"))
+
+        # Concurrent requests with the same key enqueue a single task
+        assert responses[0].task_ids == responses[1].task_ids
+        assert sorted(response.message for response in responses) == [
+            "Tasks already scheduled",
+            "Tasks scheduled successfully",
+        ]
+
+        task = rq.job.Job.fetch(responses[0].task_ids[0], utils.get_redis())
+        time.sleep(1)
+        assert task.latest_result().return_value == "result"
+
+
+@pytest.mark.usefixtures("_mock_task_registry")
+@pytest.mark.integration()
+@patch("backtick.dispatch.utils.discover_task", new=lambda _: task_ok)
+def test_submit_tasks_async_ok(mock_settings):
+    with patch("backtick.dispatch.settings", mock_settings):
+        response = asyncio.run(
+            dispatch.submit_tasks_async(
+                schedule_request_dto=FakeScheduleRequestDTO(
+                    task_name="task1",
+                    kwargs={},
+                )
+            )
+        )
+
+        task_id = response.task_ids[0]
+        task = rq.job.Job.fetch(task_id, utils.get_redis())
+
+        assert task.id == task_id
+        assert task.origin == "default"
+
+        time.sleep(1)
+        result = task.latest_result()
+        assert result.Type.SUCCESSFUL
+        assert result.return_value == "result"
+
+
+@pytest.mark.usefixtures("_mock_task_registry")
+@pytest.mark.integration()
+@patch("backtick.dispatch.utils.discover_task", new=lambda _: task_retry)
+def test_submit_scheduled_tasks_async(mock_settings):
+    with patch("backtick.dispatch.settings", mock_settings):
+        now = datetime.datetime.now(tz=datetime.timezone.utc)
+        dts = [now + datetime.timedelta(minutes=i + 1) for i in range(3)]
+        response = asyncio.run(
+            dispatch.submit_tasks_async(
+                schedule_request_dto=FakeScheduleRequestDTO(
+                    task_name="task1",
+                    datetimes=dts,
+                    kwargs={},
+                )
+            )
+        )
+
+        connection = utils.get_redis()
+        registry = rq.registry.ScheduledJobRegistry(
+            queue=rq.Queue(connection=connection)
+        )
+        for task_id, dt in zip(response.task_ids, dts, strict=True):
+            task = rq.job.Job.fetch(task_id, connection)
+            assert task.get_status() == rq.job.JobStatus.SCHEDULED
+            assert task.retries_left == 3
+            assert task.retry_intervals == [1, 2, 3]
+            assert registry.get_scheduled_time(task_id) == dt.replace(microsecond=0)
+
+        dispatch.cancel_tasks(
+            unschedule_request_dto=FakeUnscheduleRequestDTO(
+                task_ids=response.task_ids, enqueue_dependents=False
+            ),
+        )
+
+
+@pytest.mark.usefixtures("_mock_task_registry")
+@pytest.mark.integration()
+@patch("backtick.dispatch.utils.discover_task", new=lambda _: task_ok)
+def test_submit_tasks_batch_async(mock_settings):
+    stack = ExitStack()
+    stack.enter_context(patch("backtick.dispatch.settings", mock_settings))
+    stack.enter_context(patch("backtick.dto.settings", mock_settings))
+
+    with stack:
+        response = asyncio.run(
+            dispatch.submit_tasks_batch_async(
+                batch_schedule_request_dto=FakeBatchScheduleRequestDTO(
+                    requests=[{"task_name": "task1"}, {"task_name": "task3"}]
+                )
+            )
+        )
+
+        assert response.message == "1 of 2 tasks scheduled"
+        scheduled, unregistered = response.results
+        assert unregistered.error == "Task task3 is not registered"
+
+        time.sleep(1)
+        task = rq.job.Job.fetch(scheduled.task_ids[0], utils.get_redis())
+        assert task.latest_result().return_value == "result"
+
+
+@pytest.mark.usefixtures("_mock_task_registry")
+@pytest.mark.integration()
+@patch("backtick.dispatch.utils.discover_task", new=lambda _: task_retry)
+def test_cancel_tasks_async(mock_settings):
+    with patch("backtick.dispatch.settings", mock_settings):
+        dt = datetime.datetime.now(tz=datetime.timezone.utc) + datetime.timedelta(
+            seconds=5
+        )
+        response = dispatch.submit_tasks(
+            schedule_request_dto=FakeScheduleRequestDTO(
+                task_name="task1",
+                datetimes=[dt],
+                kwargs={},
+            )
+        )
+
+        task_id = response.task_ids[0]
+
+        # Cancel the task along with one that doesn't exist
+        response = asyncio.run(
+            dispatch.cancel_tasks_async(
+                unschedule_request_dto=FakeUnscheduleRequestDTO(
+                    task_ids=[task_id, "missing"], enqueue_dependents=True
+                ),
+            )
+        )
+        assert response.task_ids == [task_id]
+
+        # Check that the task moved from the scheduled to the cancelled job registry
+        connection = utils.get_redis()
+        queue = rq.Queue(connection=connection)
+        assert task_id in rq.registry.CanceledJobRegistry(queue=queue)
+        assert task_id not in rq.registry.ScheduledJobRegistry(queue=queue)
+        task = rq.job.Job.fetch(task_id, connection)
+        assert task.get_status() == rq.job.JobStatus.CANCELED
+
+        # Cancelled tasks are skipped like missing ones, the others are cancelled
+        other_id = dispatch.submit_tasks(
+            schedule_request_dto=FakeScheduleRequestDTO(
+                task_name="task1", datetimes=[dt], kwargs={}
+            )
+        ).task_ids[0]
+        response = asyncio.run(
+            dispatch.cancel_tasks_async(
+                unschedule_request_dto=FakeUnscheduleRequestDTO(
+                    task_ids=[task_id, other_id], enqueue_dependents=False
+                ),
+            )
+        )
+        assert response.task_ids == [other_id]
+        task = rq.job.Job.fetch(other_id, connection)
+        assert task.get_status() == rq.job.JobStatus.CANCELED
+
+        # The sync counterpart skips them as well
+        response = dispatch.cancel_tasks(
+            unschedule_request_dto=FakeUnscheduleRequestDTO(
+                task_ids=[task_id, other_id], enqueue_dependents=False
+            ),
+        )
+        assert response.task_ids == []
+
+
+@pytest.mark.usefixtures("_mock_task_registry")
+@pytest.mark.integration()
+@patch("backtick.dispatch.utils.discover_task", new=lambda _: task_retry)
+def test_cancel_tasks_bulk(mock_settings):
+    with patch("backtick.dispatch.settings", mock_settings):
+        dt = datetime.datetime.now(tz=datetime.timezone.utc) + datetime.timedelta(
+            seconds=5
+        )
+        response = dispatch.submit_tasks(
+            schedule_request_dto=FakeScheduleRequestDTO(
+                task_name="task1",
+                datetimes=[dt, dt],
+                kwargs={},
+            )
+        )
+
+        task_ids = response.task_ids
+
+        # Cancel the tasks along with one that doesn't exist, across two chunks
+        response = dispatch.cancel_tasks_bulk(
+            unschedule_request_dto=FakeUnscheduleRequestDTO(
+                task_ids=[*task_ids, "missing"], enqueue_dependents=True
+            ),
+        )
+        assert [(r.task_id, r.status) for r in response.results] == [
+            (task_ids[0], "canceled"),
+            (task_ids[1], "canceled"),
+            ("missing", "not_found"),
+        ]
+        assert response.message == "2 of 3 tasks unscheduled"
+
+        # Check that the tasks moved from the scheduled to the cancelled job registry
+        connection = utils.get_redis()
+        queue = rq.Queue(connection=connection)
+        for task_id in task_ids:
+            assert task_id in rq.registry.CanceledJobRegistry(queue=queue)
+            assert task_id not in rq.registry.ScheduledJobRegistry(queue=queue)
+            task = rq.job.Job.fetch(task_id, connection)
+            assert task.get_status() == rq.job.JobStatus.CANCELED
+
+        # Cancelling them again reports them as already cancelled
+        response = asyncio.run(
+            dispatch.cancel_tasks_bulk_async(
+                unschedule_request_dto=FakeUnscheduleRequestDTO(
+                    task_ids=task_ids, enqueue_dependents=False
+                ),
+            )
+        )
+        assert [r.status for r in response.results] == [
+            "already_canceled",
+            "already_canceled",
+        ]
+        assert response.message == "0 of 2 tasks unscheduled"
+
+
+@pytest.mark.usefixtures("_mock_task_registry")
+@pytest.mark.integration()
+@patch("backtick.dispatch.utils.discover_task", new=lambda _: task_retry)
+def test_cancel_tasks_bulk_async_enqueued(mock_settings):
+    with patch("backtick.dispatch.settings", mock_settings):
+        connection = utils.get_redis()
+        queue = rq.Queue(name="backtick-cancel-bulk", connection=connection)
+        job = queue.enqueue(task_retry)
+
+        response = asyncio.run(
+            dispatch.cancel_tasks_bulk_async(
+                unschedule_request_dto=FakeUnscheduleRequestDTO(
+                    task_ids=[job.id], enqueue_dependents=False
+                ),
+            )
+        )
+        assert response.results[0].status == "canceled"
+
+        # Check that the task was removed from its queue
+        assert job.id not in queue.get_job_ids()
+        assert job.id in rq.registry.CanceledJobRegistry(queue=queue)
+        queue.delete(delete_jobs=True)
+
+
+@pytest.mark.integration()
+def test_get_task_statuses_async(mock_settings):
+    connection = utils.get_redis()
+    queue = rq.Queue("backtick-test-status", connection=connection)
+    ok = queue.enqueue(task_ok)
+    error = queue.enqueue(task_error)
+    rq.SimpleWorker([queue], connection=connection).work(burst=True)
+
+    with (
+        patch("backtick.dispatch.settings", mock_settings),
+        patch.dict("backtick.dispatch._status_cache", clear=True),
+    ):
+        statuses = asyncio.run(
+            dispatch.get_task_statuses_async([ok.id, "missing", error.id, ok.id])
+        )
+
+        assert [status.task_id for status in statuses] == [
+            ok.id,
+            "missing",
+            error.id,
+            ok.id,
+        ]
+        assert statuses[0].status == rq.job.JobStatus.FINISHED
+        assert statuses[0].result == "result"
+        assert statuses[0].enqueued_at <= statuses[0].started_at <= statuses[0].ended_at
+        assert statuses[0].ended_at.tzinfo == datetime.timezone.utc
+        assert statuses[1].status == dispatch.TASK_NOT_FOUND
+        assert statuses[2].status == rq.job.JobStatus.FAILED
+        assert "ValueError: fail" in statuses[2].exc_info
+
+        # Cached statuses are served without Redis, and the cache is bounded
+        ok.delete()
+        with patch("backtick.dispatch.utils.get_async_redis") as get_async_redis:
+            statuses = asyncio.run(dispatch.get_task_statuses_async([ok.id]))
+        get_async_redis.assert_not_called()
+        assert statuses[0].status == rq.job.JobStatus.FINISHED
+
+        asyncio.run(dispatch.get_task_statuses_async(["missing-2"]))
+        assert len(dispatch._status_cache) == mock_settings.BACKTICK_STATUS_CACHE_SIZE
+        assert ok.id not in dispatch._status_cache
+
+    queue.delete(delete_jobs=True)
+    error.delete()
+
+
+@utils.task("default", utils.get_redis())
+def task_zero_division():
+    return 1 / 0
+
+
+@pytest.mark.integration()
+@patch(
+    "backtick.dispatch.settings.BACKTICK_TASKS",
+    {"task_error": f"{__name__}.task_error"},
+)
+def test_requeue_failed_chunks():
+    connection = utils.get_redis()
+    queue = rq.Queue("backtick-test-requeue", connection=connection)
+    errors = [queue.enqueue(task_error) for _ in range(3)]
+    zero_division = queue.enqueue(task_zero_division)
+    rq.SimpleWorker([queue], connection=connection).work(burst=True)
+    registry = rq.registry.FailedJobRegistry(queue=queue)
+
+    # Dry runs only find the jobs
+    chunks = list(
+        dispatch.requeue_failed_chunks(
+            queue_names=[queue.name], exception_types=["ValueError"], dry_run=True
+        )
+    )
+    assert sorted(sum(chunks, [])) == sorted(job.id for job in errors)
+    assert registry.count == 4
+
+    # Chunks are spaced out to stay under the rate
+    started_at = time.monotonic()
+    chunks = list(
+        dispatch.requeue_failed_chunks(
+            queue_names=[queue.name],
+            task_names=["task_error"],
+            exception_types=["ValueError", "ZeroDivisionError"],
+            rate=20,
+            chunk_size=1,
+        )
+    )
+    assert time.monotonic() - started_at >= 2 / 20
+    assert len(chunks) == 3
+    assert sorted(sum(chunks, [])) == sorted(job.id for job in errors)
+
+    assert registry.get_job_ids() == [zero_division.id]
+    assert sorted(queue.get_job_ids()) == sorted(job.id for job in errors)
+    for job in errors:
+        job.refresh()
+        assert job.get_status() == rq.job.JobStatus.QUEUED
+        assert job.ended_at is None
+
+    # Requeued jobs run again
+    rq.SimpleWorker([queue], connection=connection).work(burst=True)
+    assert registry.count == 4
+
+    queue.delete(delete_jobs=True)
+    for job in [*errors, zero_division]:
+        job.delete()
+
+
+@pytest.mark.parametrize(
+    ("exception_types", "expected"),
+    [
+        ({"HTTPError"}, True),
+        ({"requests.exceptions.HTTPError"}, True),
+        ({"ValueError"}, False),
+    ],
+)
+def test_raised(exception_types, expected):
+    exc_info = (
+        "Traceback (most recent call last):\n"
+        '  File "tasks.py", line 1, in make_request\n'
+        "requests.exceptions.HTTPError: 500 Server Error: x\n"
+    )
+    assert dispatch._raised(exc_info, exception_types) is expected
+    assert dispatch._raised(None, exception_types) is False
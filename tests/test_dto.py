@@ -5,18 +5,22 @@ from unittest.mock import patch
 
 import pytest
 
-from backtick import dto
+from backtick import dto, utils
 
 
 class TestScheduleRequestDTO:
     """Test ScheduleRequestDTO."""
 
+    @pytest.mark.usefixtures("_mock_task_registry")
     def test_task_name_ok(self, mock_settings):
         """Test task_name."""
 
         stack = ExitStack()
         stack.enter_context(
-            patch("backtick.dto.utils.discover_task", return_value=lambda: None)
+            patch(
+                "backtick.task_registry.utils.discover_task",
+                return_value=utils.task("default")(lambda: None),
+            )
         )
         stack.enter_context(patch("backtick.dto.settings", mock_settings))
 
@@ -26,6 +30,7 @@ class TestScheduleRequestDTO:
             )
             assert schedule_request_dto.task_name == "task1"
 
+    @pytest.mark.usefixtures("_mock_task_registry")
     def test_task_name_not_ok(self, mock_settings):
         """Test task_name."""
 
@@ -47,12 +52,16 @@ class TestScheduleRequestDTO:
                     task_name="task2",
                 )
 
+    @pytest.mark.usefixtures("_mock_task_registry")
     def test_datetimes_ok(self, mock_settings):
         """Test datetimes."""
 
         stack = ExitStack()
         stack.enter_context(
-            patch("backtick.dto.utils.discover_task", return_value=lambda: None)
+            patch(
+                "backtick.task_registry.utils.discover_task",
+                return_value=utils.task("default")(lambda: None),
+            )
         )
         stack.enter_context(patch("backtick.dto.settings", mock_settings))
 
@@ -69,12 +78,16 @@ class TestScheduleRequestDTO:
             )
             assert schedule_request_dto.datetimes == [dt1, dt2]
 
+    @pytest.mark.usefixtures("_mock_task_registry")
     def test_datetimes_not_ok(self, mock_settings):
         """Test datetimes."""
 
         stack = ExitStack()
         stack.enter_context(
-            patch("backtick.dto.utils.discover_task", return_value=lambda: None)
+            patch(
+                "backtick.task_registry.utils.discover_task",
+                return_value=utils.task("default")(lambda: None),
+            )
         )
         stack.enter_context(patch("backtick.dto.settings", mock_settings))
 
@@ -111,12 +124,16 @@ class TestScheduleRequestDTO:
                     datetimes=[dt3],
                 )
 
+    @pytest.mark.usefixtures("_mock_task_registry")
     def test_task_is_keyword_only(self, mock_settings):
         """Test kwargs."""
 
         stack = ExitStack()
         stack.enter_context(
-            patch("backtick.dto.utils.discover_task", return_value=lambda a, b: None)
+            patch(
+                "backtick.task_registry.utils.discover_task",
+                return_value=utils.task("default")(lambda a, b: None),
+            )
         )
         stack.enter_context(patch("backtick.dto.settings", mock_settings))
 
@@ -128,12 +145,16 @@ class TestScheduleRequestDTO:
                     kwargs={"a": "foo", "b": "bar"},
                 )
 
+    @pytest.mark.usefixtures("_mock_task_registry")
     def test_task_kwargs_match_incoming_kwargs(self, mock_settings):
         """Test kwargs."""
 
         stack = ExitStack()
         stack.enter_context(
-            patch("backtick.dto.utils.discover_task", return_value=lambda a, b: None)
+            patch(
+                "backtick.task_registry.utils.discover_task",
+                return_value=utils.task("default")(lambda a, b: None),
+            )
         )
         stack.enter_context(patch("backtick.dto.settings", mock_settings))
 
@@ -191,6 +212,43 @@ class TestScheduleResponseDTO:
             assert schedule_response_dto.message == "message"
 
 
+class TestBatchScheduleRequestDTO:
+    def test_requests_ok(self, mock_settings):
+        """Test requests."""
+
+        stack = ExitStack()
+        stack.enter_context(patch("backtick.dto.settings", mock_settings))
+
+        with stack:
+            # Items are not validated as schedule requests by the batch dto
+            batch_schedule_request_dto = dto.BatchScheduleRequestDTO(
+                requests=[{"task_name": "task1"}, {"task_name": "task3"}],
+            )
+            assert batch_schedule_request_dto.requests == [
+                {"task_name": "task1"},
+                {"task_name": "task3"},
+            ]
+
+    def test_requests_not_ok(self, mock_settings):
+        """Test requests."""
+
+        stack = ExitStack()
+        stack.enter_context(patch("backtick.dto.settings", mock_settings))
+
+        with stack:
+            # Raise ValueError for an empty batch
+            with pytest.raises(
+                ValueError, match="Batch must contain at least one request"
+            ):
+                _ = dto.BatchScheduleRequestDTO(requests=[])
+
+            # Raise ValueError for a batch larger than BACKTICK_BATCH_MAX_SIZE
+            with pytest.raises(
+                ValueError, match="Batch must not contain more than 3 requests"
+            ):
+                _ = dto.BatchScheduleRequestDTO(requests=[{"task_name": "task1"}] * 4)
+
+
 class TestUnscheduleRequestDTO:
     def test_required_fields(self, mock_settings):
         """Test required fields."""
@@ -237,3 +295,36 @@ class TestUnscheduleRequestDTO:
 
 
 TestUnscheduleResponseDTO = TestScheduleResponseDTO
+
+
+class TestRequeueRequestDTO:
+    """Test RequeueRequestDTO."""
+
+    def test_ok(self, mock_settings):
+        """Test filters."""
+
+        with patch("backtick.dto.settings", mock_settings):
+            requeue_request_dto = dto.RequeueRequestDTO(
+                queues=["queue1"], task_names=["task1"], limit=1
+            )
+            assert requeue_request_dto.queues == ["queue1"]
+            assert requeue_request_dto.exception_types == []
+            assert requeue_request_dto.dry_run is False
+
+    @pytest.mark.parametrize(
+        ("field", "value", "error"),
+        [
+            ("queues", ["missing"], "Queue missing not found"),
+            ("task_names", ["missing"], "Task missing is not registered"),
+            ("limit", 0, "Limit must be between"),
+            ("limit", 11, "Limit must be between"),
+        ],
+    )
+    def test_not_ok(self, mock_settings, field, value, error):
+        """Test filters."""
+
+        with (
+            patch("backtick.dto.settings", mock_settings),
+            pytest.raises(ValueError, match=error),
+        ):
+            dto.RequeueRequestDTO(**{field: value})
@@ -0,0 +1,174 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+import rq
+from rq.job import JobStatus
+from rq.maintenance import clean_intermediate_queue
+from rq.registry import ScheduledJobRegistry
+
+from backtick import limits, notifications, scheduler, utils, worker
+from backtick.async_worker import AsyncWorker
+
+QUEUE_NAME = "backtick-test-limits"
+
+
+@utils.task(queue=QUEUE_NAME, rate_limit="5/s", rate_limit_burst=2)
+def limited_task():
+    return "result"
+
+
+@utils.task(queue=QUEUE_NAME)
+def unlimited_task():
+    return "result"
+
+
+@utils.task(queue=QUEUE_NAME, max_concurrency=2)
+def capped_task():
+    return "result"
+
+
+@utils.task(queue=QUEUE_NAME, max_concurrency=2)
+async def capped_async_task():
+    await asyncio.sleep(0.2)
+    return "result"
+
+
+@pytest.fixture()
+def queue():
+    queue = rq.Queue(
+        QUEUE_NAME,
+        connection=utils.get_redis(),
+        job_class=notifications.NotifyingJob,
+    )
+    yield queue
+    queue.delete(delete_jobs=True)
+    connection = queue.connection
+    connection.delete(
+        ScheduledJobRegistry(queue=queue).key,
+        queue.intermediate_queue_key,
+        *connection.scan_iter(f"{limits.KEY_PREFIX}*"),
+        *connection.scan_iter(f"{limits.CONCURRENCY_KEY_PREFIX}*"),
+        *connection.scan_iter(f"{scheduler.KEY_PREFIX}{QUEUE_NAME}:*"),
+    )
+
+
+def work(queue):
+    worker.SimpleWorker(
+        [queue], connection=queue.connection, job_class=notifications.NotifyingJob
+    ).work(burst=True)
+
+
+@pytest.mark.integration()
+def test_rate_limit(queue):
+    jobs = [queue.enqueue(limited_task) for _ in range(5)]
+    other = queue.enqueue(unlimited_task)
+    start = time.time()
+    work(queue)
+
+    # The burst runs, the other jobs of the task are deferred and the others run
+    statuses = [job.get_status() for job in jobs]
+    assert statuses == [JobStatus.FINISHED] * 2 + [JobStatus.SCHEDULED] * 3
+    assert other.get_status() == JobStatus.FINISHED
+
+    # Deferred jobs are scheduled one emission interval apart
+    registry = ScheduledJobRegistry(queue=queue)
+    scheduled = queue.connection.zrange(registry.key, 0, -1, withscores=True)
+    assert [job_id.decode() for job_id, _ in scheduled] == [job.id for job in jobs[2:]]
+    scores = [score - start for _, score in scheduled]
+    assert scores == pytest.approx([0.2, 0.4, 0.6], abs=0.1)
+
+    # Their slots are reserved, so they run as soon as they're back
+    for job in jobs[2:]:
+        registry.remove(job)
+        queue.enqueue_job(job)
+    work(queue)
+    assert all(job.get_status() == JobStatus.FINISHED for job in jobs)
+
+
+@pytest.mark.integration()
+def test_rate_limit_single_queue(queue):
+    jobs = [queue.enqueue(limited_task) for _ in range(3)]
+    # Workers of a single queue dequeue into its intermediate list
+    single_worker = worker.SimpleWorker(
+        [queue], connection=queue.connection, job_class=notifications.NotifyingJob
+    )
+    single_worker.work(burst=True)
+
+    # The deferred job is taken off the list, so rq doesn't fail it as stuck there
+    assert not queue.connection.lrange(queue.intermediate_queue_key, 0, -1)
+    clean_intermediate_queue(single_worker, queue)
+    assert jobs[2].get_status() == JobStatus.SCHEDULED
+    assert jobs[2].id in ScheduledJobRegistry(queue=queue)
+    assert jobs[2].id not in queue.failed_job_registry
+
+
+@pytest.mark.integration()
+@patch("backtick.limits.settings.BACKTICK_SCHEDULER_SHARDS", 2)
+@patch("backtick.limits.settings.BACKTICK_QUEUE_RATE_LIMITS", {QUEUE_NAME: ("1/m", 1)})
+def test_queue_rate_limit_sharded(queue):
+    first, second = (queue.enqueue(unlimited_task) for _ in range(2))
+    work(queue)
+
+    assert first.get_status() == JobStatus.FINISHED
+    assert second.get_status() == JobStatus.SCHEDULED
+
+    # The deferred job is in its shard, due a minute later
+    key = scheduler.shard_key(QUEUE_NAME, scheduler.shard_for(second.id))
+    (bucket,) = queue.connection.zrange(key, 0, -1)
+    score = queue.connection.zscore(f"{key}:{bucket.decode()}", second.id)
+    assert score == pytest.approx(time.time() + 60, abs=1)
+
+
+@pytest.mark.integration()
+@patch("backtick.limits.settings.BACKTICK_CONCURRENCY_RETRY_DELAY", 10)
+def test_max_concurrency(queue):
+    connection = queue.connection
+    key = f"{limits.CONCURRENCY_KEY_PREFIX}task:{__name__}.capped_task"
+    lease = time.time() * 1000 + 60_000
+    # A job running on another worker, and one whose worker died and lease is over
+    connection.zadd(key, {"running": lease, "dead": 0})
+
+    jobs = [queue.enqueue(capped_task) for _ in range(3)]
+    work(queue)
+
+    # The freed slot is taken, and given back after every job
+    assert all(job.get_status() == JobStatus.FINISHED for job in jobs)
+    assert connection.zrange(key, 0, -1) == [b"running"]
+
+    # Without a free slot, the jobs are skipped and deferred with jitter
+    connection.zadd(key, {"other": lease})
+    jobs = [queue.enqueue(capped_task) for _ in range(2)]
+    other = queue.enqueue(unlimited_task)
+    start = time.time()
+    work(queue)
+
+    assert [job.get_status() for job in jobs] == [JobStatus.SCHEDULED] * 2
+    assert other.get_status() == JobStatus.FINISHED
+    registry = ScheduledJobRegistry(queue=queue)
+    for job in jobs:
+        assert 10 <= registry.get_scheduled_time(job).timestamp() - start <= 21
+
+    # They're off the intermediate list, so rq doesn't fail them as stuck there
+    assert not connection.lrange(queue.intermediate_queue_key, 0, -1)
+    clean_intermediate_queue(worker.SimpleWorker([queue], connection=connection), queue)
+    assert [job.get_status() for job in jobs] == [JobStatus.SCHEDULED] * 2
+    assert not any(job.id in queue.failed_job_registry for job in jobs)
+
+
+@pytest.mark.integration()
+def test_max_concurrency_async(queue):
+    key = f"{limits.CONCURRENCY_KEY_PREFIX}task:{__name__}.capped_async_task"
+    jobs = [queue.enqueue(capped_async_task) for _ in range(4)]
+    async_worker = AsyncWorker([queue], connection=queue.connection)
+    async_worker.work(burst=True)
+
+    # Two jobs run at the same time, the worker doesn't wait for them to run others
+    statuses = [job.get_status() for job in jobs]
+    assert statuses == [JobStatus.FINISHED] * 2 + [JobStatus.SCHEDULED] * 2
+    assert not queue.connection.exists(key)
+
+    # The deferred jobs aren't failed as stuck in the intermediate list
+    clean_intermediate_queue(async_worker, queue)
+    assert [job.get_status() for job in jobs[2:]] == [JobStatus.SCHEDULED] * 2
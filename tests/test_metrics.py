@@ -0,0 +1,122 @@
+import datetime
+from unittest.mock import patch
+
+import prometheus_client
+import pytest
+import rq
+
+from backtick import metrics, notifications, scheduler, utils, worker
+
+
+def task_ok():
+    return "result"
+
+
+def task_error():
+    raise ValueError("fail")
+
+
+def sample(name, **labels):
+    return prometheus_client.REGISTRY.get_sample_value(name, labels) or 0
+
+
+@pytest.fixture()
+def queue():
+    queue = rq.Queue(
+        "backtick-test-metrics",
+        connection=utils.get_redis(),
+        job_class=notifications.NotifyingJob,
+    )
+    yield queue
+    queue.delete(delete_jobs=True)
+    queue.connection.delete(
+        rq.registry.ScheduledJobRegistry(queue=queue).key,
+        rq.registry.FailedJobRegistry(queue=queue).key,
+        *queue.connection.scan_iter(f"{scheduler.KEY_PREFIX}{queue.name}:*"),
+    )
+
+
+@pytest.mark.integration()
+@pytest.mark.parametrize("worker_class", [worker.Worker, worker.SimpleWorker])
+def test_job_metrics(queue, worker_class):
+    labels = {"queue": queue.name}
+    ok = {"task": f"{__name__}.task_ok", **labels}
+    error = {"task": f"{__name__}.task_error", **labels}
+    before = {
+        "finished": sample("backtick_jobs_total", outcome="finished", **ok),
+        "failed": sample("backtick_jobs_total", outcome="failed", **error),
+        "retried": sample("backtick_jobs_total", outcome="retried", **error),
+        "waits": sample("backtick_job_wait_seconds_count", **ok),
+        "runs": sample("backtick_job_duration_seconds_count", **error),
+    }
+
+    queue.enqueue(task_ok)
+    queue.enqueue(task_error, retry=rq.Retry(max=1))
+    # Jobs are recorded by the worker process, even when they run in a work horse
+    worker_class(
+        [queue], connection=queue.connection, job_class=notifications.NotifyingJob
+    ).work(burst=True)
+
+    assert sample("backtick_jobs_total", outcome="finished", **ok) == (
+        before["finished"] + 1
+    )
+    assert sample("backtick_jobs_total", outcome="retried", **error) == (
+        before["retried"] + 1
+    )
+    assert sample("backtick_jobs_total", outcome="failed", **error) == (
+        before["failed"] + 1
+    )
+    assert sample("backtick_job_wait_seconds_count", **ok) == before["waits"] + 1
+    assert sample("backtick_job_duration_seconds_count", **error) == (
+        before["runs"] + 2
+    )
+
+
+@pytest.mark.integration()
+def test_queue_collector(queue):
+    queue.enqueue(task_ok)
+    queue.enqueue(task_ok)
+    queue.enqueue_at(
+        datetime.datetime.now(tz=datetime.timezone.utc) + datetime.timedelta(hours=1),
+        task_ok,
+    )
+
+    with patch("backtick.metrics.settings.BACKTICK_QUEUES", {"default": queue.name}):
+        output = metrics.render(with_queues=True).decode()
+
+    assert f'backtick_queue_depth{{queue="{queue.name}"}} 2.0' in output
+    assert f'backtick_scheduled_tasks{{queue="{queue.name}"}} 1.0' in output
+
+
+@pytest.mark.integration()
+@patch("backtick.metrics.settings.BACKTICK_SCHEDULER_SHARDS", 3)
+@patch("backtick.metrics.settings.BACKTICK_SCHEDULER_BUCKET_SECONDS", 10)
+def test_queue_collector_sharded(queue):
+    queue.enqueue_at(
+        datetime.datetime(2030, 1, 1, tzinfo=datetime.timezone.utc), task_ok
+    )
+    # Jobs of every shard, across buckets
+    with queue.connection.pipeline() as pipeline:
+        for i in range(12):
+            scheduler.buffer_scheduled_job(
+                pipeline,
+                queue.name,
+                f"backtick-test-metrics-{i}",
+                1_893_456_000 + i * 5,
+            )
+        pipeline.execute()
+
+    with patch("backtick.metrics.settings.BACKTICK_QUEUES", {"default": queue.name}):
+        output = metrics.render(with_queues=True).decode()
+
+    assert f'backtick_scheduled_tasks{{queue="{queue.name}"}} 13.0' in output
+
+
+@patch("backtick.metrics.settings.BACKTICK_TASKS", {"task_ok": f"{__name__}.task_ok"})
+def test_task_name():
+    metrics._task_names.cache_clear()
+    try:
+        assert metrics.task_name(f"{__name__}.task_ok") == "task_ok"
+        assert metrics.task_name("unregistered.task") == "unregistered.task"
+    finally:
+        metrics._task_names.cache_clear()
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import threading
+from unittest.mock import patch
+
+import pytest
+import rq
+
+from backtick import dispatch, notifications, utils
+
+
+def task_ok():
+    return "result"
+
+
+class FakeUnscheduleRequestDTO:
+    """UnscheduleRequestDTO without validaiton."""
+
+    def __init__(self, task_ids, enqueue_dependents):
+        self.task_ids = task_ids
+        self.enqueue_dependents = enqueue_dependents
+
+
+@pytest.fixture()
+def queue():
+    queue = rq.Queue(
+        "backtick-test-notifications",
+        connection=utils.get_redis(),
+        job_class=notifications.NotifyingJob,
+    )
+    yield queue
+    queue.delete(delete_jobs=True)
+
+
+def test_dispatch():
+    hub = notifications.EventHub(connection=None)
+    by_task = notifications.Subscriber(frozenset({"a"}), frozenset())
+    by_queue = notifications.Subscriber(frozenset({"a"}), frozenset({"q"}))
+    for subscriber in (by_task, by_queue):
+        hub._by_task.setdefault("a", set()).add(subscriber)
+    hub._by_queue["q"] = {by_queue}
+
+    hub.dispatch(notifications.encode_event("a", "q", "started"))
+    hub.dispatch(notifications.encode_event("b", "q", "started"))
+    hub.dispatch("not an event")
+
+    # Every subscriber gets an event once
+    assert by_task.events.qsize() == 1
+    assert by_queue.events.qsize() == 2
+
+    hub.unsubscribe(by_queue)
+    hub.unsubscribe(by_task)
+    assert not hub.subscribers
+
+
+@patch("backtick.notifications.settings.BACKTICK_EVENTS_BUFFER_SIZE", 2)
+def test_subscriber_overflow():
+    subscriber = notifications.Subscriber(frozenset({"a"}), frozenset())
+    for status in ("queued", "started", "finished"):
+        subscriber.send(notifications.encode_event("a", "q", status))
+
+    # A client that falls behind gets its subscription closed
+    assert json.loads(subscriber.events.get_nowait())["status"] == "started"
+    assert subscriber.events.get_nowait() is None
+
+
+@pytest.mark.integration()
+def test_stream_task_events(queue):
+    job = queue.enqueue(task_ok)
+    worker = rq.SimpleWorker(
+        [queue], connection=queue.connection, job_class=notifications.NotifyingJob
+    )
+
+    statuses = []
+    subscribed = threading.Event()
+
+    async def follow():
+        async for event in notifications.stream([job.id, "missing"], []):
+            statuses.append(json.loads(event)["status"])
+            if len(statuses) == 2:
+                subscribed.set()
+
+    # rq workers only run in the main thread
+    follower = threading.Thread(target=asyncio.run, args=(follow(),))
+    follower.start()
+    assert subscribed.wait(5)
+    worker.work(burst=True)
+    follower.join(5)
+
+    assert not follower.is_alive()
+    assert statuses == ["queued", "not_found", "started", "finished"]
+
+
+@pytest.mark.integration()
+def test_stream_queue_events(queue, mock_settings):
+    jobs = [queue.enqueue(task_ok) for _ in range(2)]
+
+    async def follow():
+        events = notifications.stream([], [queue.name])
+        # Wait for the subscription before cancelling the jobs
+        pending = asyncio.create_task(anext(events))
+        await asyncio.sleep(0.1)
+
+        with patch("backtick.dispatch.settings", mock_settings):
+            await dispatch.cancel_tasks_bulk_async(
+                unschedule_request_dto=FakeUnscheduleRequestDTO(
+                    task_ids=[job.id for job in jobs], enqueue_dependents=False
+                )
+            )
+        received = [await pending, await anext(events)]
+        await events.aclose()
+        return [json.loads(event) for event in received]
+
+    events = asyncio.run(asyncio.wait_for(follow(), 10))
+    assert events == [
+        {"task_id": job.id, "queue": queue.name, "status": "canceled"} for job in jobs
+    ]
@@ -0,0 +1,224 @@
+import dataclasses
+import datetime
+import json
+from unittest.mock import patch
+
+import pytest
+import redis
+import rq
+
+from backtick import dispatch, payloads, task_registry, utils
+from backtick import worker as backtick_worker
+
+KWARGS = {"items": list(range(2000))}
+
+
+@utils.task("backtick-test-payloads")
+def task_sum(*, items):
+    return sum(items)
+
+
+@pytest.fixture()
+def _payload_settings(tmp_path, request):
+    """Offload kwargs above 1 KB, to Redis or to a temporary directory."""
+
+    with (
+        patch("backtick.payloads.settings.BACKTICK_PAYLOAD_OFFLOAD_THRESHOLD", 1024),
+        patch(
+            "backtick.payloads.settings.BACKTICK_PAYLOAD_DIR",
+            str(tmp_path) if getattr(request, "param", None) == "dir" else None,
+        ),
+    ):
+        yield
+
+
+@pytest.mark.usefixtures("_payload_settings")
+def test_prepare():
+    payload = payloads.prepare(KWARGS)
+    assert payload is not None
+    assert payload.digest == payloads.prepare(dict(reversed(KWARGS.items()))).digest
+    assert len(payload.data) < len(json.dumps(KWARGS))
+
+    # Small and non JSON kwargs stay in the jobs
+    assert payloads.prepare({"items": [1, 2, 3]}) is None
+    assert payloads.prepare({"items": set(range(2000))}) is None
+
+    with patch("backtick.payloads.settings.BACKTICK_PAYLOAD_OFFLOAD_THRESHOLD", None):
+        assert payloads.prepare(KWARGS) is None
+
+
+@pytest.mark.integration()
+@pytest.mark.parametrize("_payload_settings", ["redis", "dir"], indirect=True)
+@pytest.mark.usefixtures("_payload_settings")
+def test_store_and_release():
+    connection = utils.get_redis()
+    payload = payloads.prepare(KWARGS)
+    key = f"{payloads.KEY_PREFIX}{payload.digest}"
+    job_ids = ["backtick-test-payload-1", "backtick-test-payload-2"]
+
+    with connection.pipeline() as pipeline:
+        payloads.buffer_store(pipeline, payload, len(job_ids))
+        for job_id in job_ids:
+            pipeline.hset(
+                rq.job.Job.key_for(job_id), payloads.REF_FIELD, payload.digest
+            )
+        pipeline.execute()
+
+    assert payloads.load(connection, payload.digest) == KWARGS
+    assert int(connection.get(f"{key}:refs")) == 2
+
+    # A job only releases its reference once
+    payloads.release(connection, [job_ids[0]])
+    payloads.release(connection, [job_ids[0]])
+    assert payloads.load(connection, payload.digest) == KWARGS
+
+    payloads.release(connection, [job_ids[1]])
+    with pytest.raises(LookupError):
+        payloads.load(connection, payload.digest)
+    assert not connection.exists(key, f"{key}:refs")
+
+    connection.delete(*map(rq.job.Job.key_for, job_ids))
+
+
+@pytest.mark.integration()
+@pytest.mark.usefixtures("_payload_settings")
+def test_run_offloaded_jobs(mock_settings):
+    connection = utils.get_redis()
+    spec = task_registry.TaskSpec.from_func("task_sum", task_sum)
+    queue = spec.get_queue()
+    dt = datetime.datetime.now(tz=datetime.timezone.utc) + datetime.timedelta(hours=1)
+
+    # Three jobs over two pipelines share a single payload
+    with patch("backtick.dispatch.settings", mock_settings):
+        job_ids = dispatch.schedule_jobs_bulk(
+            queue=queue, spec=spec, datetimes=[dt] * 3, kwargs=KWARGS
+        )
+
+    digest = payloads.prepare(KWARGS).digest
+    key = f"{payloads.KEY_PREFIX}{digest}"
+    assert int(connection.get(f"{key}:refs")) == 3
+
+    jobs = [queue.fetch_job(job_id) for job_id in job_ids]
+    assert all(job.payload_ref == digest and job.kwargs == {} for job in jobs)
+
+    for job in jobs:
+        queue.enqueue_job(job)
+    worker = backtick_worker.SimpleWorker(
+        [queue], connection=connection, job_class=payloads.PayloadJob
+    )
+    worker.work(burst=True)
+
+    for job_id in job_ids:
+        job = queue.fetch_job(job_id)
+        assert job.get_status() == rq.job.JobStatus.FINISHED
+        assert job.return_value() == sum(KWARGS["items"])
+        assert job.payload_ref is None
+        # The offloaded kwargs aren't written back to the job
+        assert job.kwargs == {}
+
+    assert not connection.exists(key, f"{key}:refs")
+
+    queue.delete(delete_jobs=True)
+    connection.delete(rq.registry.ScheduledJobRegistry(queue=queue).key)
+
+
+@pytest.mark.integration()
+@pytest.mark.usefixtures("_payload_settings")
+def test_enqueue_offloaded_jobs():
+    connection = utils.get_redis()
+    spec = task_registry.TaskSpec.from_func("task_sum", task_sum)
+    queue = spec.get_queue()
+    job_id = dispatch._enqueue_job(queue=queue, spec=spec, kwargs=KWARGS)
+
+    # Jobs with dependencies are offloaded too, and deferred by rq
+    dependent_spec = dataclasses.replace(
+        spec, enqueue_options={**spec.enqueue_options, "depends_on": job_id}
+    )
+    dependent_id = dispatch._enqueue_job(
+        queue=queue, spec=dependent_spec, kwargs=KWARGS
+    )
+
+    digest = payloads.prepare(KWARGS).digest
+    key = f"{payloads.KEY_PREFIX}{digest}"
+    assert int(connection.get(f"{key}:refs")) == 2
+
+    job, dependent = queue.fetch_job(job_id), queue.fetch_job(dependent_id)
+    assert job.get_status() == rq.job.JobStatus.QUEUED
+    assert dependent.get_status() == rq.job.JobStatus.DEFERRED
+    assert all(
+        job.payload_ref == digest and job.kwargs == {} for job in (job, dependent)
+    )
+
+    worker = backtick_worker.SimpleWorker(
+        [queue], connection=connection, job_class=payloads.PayloadJob
+    )
+    worker.work(burst=True)
+
+    for job_id in (job_id, dependent_id):
+        assert queue.fetch_job(job_id).return_value() == sum(KWARGS["items"])
+    assert not connection.exists(key, f"{key}:refs")
+
+    queue.delete(delete_jobs=True)
+
+
+@pytest.mark.integration()
+@pytest.mark.usefixtures("_payload_settings")
+def test_keep_payload_of_unfinished_jobs():
+    connection = utils.get_redis()
+    spec = task_registry.TaskSpec.from_func("task_sum", task_sum)
+    queue = spec.get_queue()
+    job_id = dispatch._enqueue_job(queue=queue, spec=spec, kwargs=KWARGS)
+
+    # The job ran, but rq failed to mark it as finished
+    with patch.object(
+        rq.SimpleWorker, "handle_job_success", side_effect=redis.ConnectionError
+    ):
+        worker = backtick_worker.SimpleWorker(
+            [queue], connection=connection, job_class=payloads.PayloadJob
+        )
+        worker.work(burst=True)
+
+    digest = payloads.prepare(KWARGS).digest
+    assert queue.fetch_job(job_id).payload_ref == digest
+    assert payloads.load(connection, digest) == KWARGS
+
+    payloads.release(connection, [job_id])
+    queue.delete(delete_jobs=True)
+    connection.delete(rq.registry.FailedJobRegistry(queue=queue).key)
+
+
+@pytest.mark.integration()
+@pytest.mark.parametrize("_payload_settings", ["redis", "dir"], indirect=True)
+@pytest.mark.usefixtures("_payload_settings")
+def test_keep_payload_across_chunks(mock_settings):
+    connection = utils.get_redis()
+    spec = task_registry.TaskSpec.from_func("task_sum", task_sum)
+    queue = spec.get_queue()
+    dt = datetime.datetime.now(tz=datetime.timezone.utc) + datetime.timedelta(hours=1)
+    create_job = dispatch._create_job
+    created = []
+
+    def run_first_chunk(*args, **kwargs):
+        # The jobs of the first chunk run and release the payload before the second
+        # chunk is written
+        if len(created) == mock_settings.BACKTICK_PIPELINE_CHUNK_SIZE:
+            payloads.release(connection, created)
+        job = create_job(*args, **kwargs)
+        created.append(job.id)
+        return job
+
+    with (
+        patch("backtick.dispatch.settings", mock_settings),
+        patch("backtick.dispatch._create_job", side_effect=run_first_chunk),
+    ):
+        job_ids = dispatch.schedule_jobs_bulk(
+            queue=queue, spec=spec, datetimes=[dt] * 3, kwargs=KWARGS
+        )
+
+    digest = payloads.prepare(KWARGS).digest
+    assert queue.fetch_job(job_ids[-1]).payload_ref == digest
+    assert payloads.load(connection, digest) == KWARGS
+
+    payloads.release(connection, job_ids)
+    queue.delete(delete_jobs=True)
+    connection.delete(rq.registry.ScheduledJobRegistry(queue=queue).key)
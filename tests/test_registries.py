@@ -0,0 +1,135 @@
+import asyncio
+import datetime
+from unittest.mock import patch
+
+import pytest
+import rq
+
+from backtick import notifications, registries, scheduler, utils
+
+QUEUE_NAME = "backtick-test-registries"
+NOW = datetime.datetime(2030, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def task_ok():
+    return "result"
+
+
+def task_other():
+    return "result"
+
+
+@pytest.fixture()
+def queue():
+    queue = rq.Queue(
+        QUEUE_NAME,
+        connection=utils.get_redis(),
+        job_class=notifications.NotifyingJob,
+    )
+    yield queue
+    queue.delete(delete_jobs=True)
+    queue.connection.delete(
+        rq.registry.ScheduledJobRegistry(queue=queue).key,
+        *queue.connection.scan_iter(f"{scheduler.KEY_PREFIX}{QUEUE_NAME}:*"),
+    )
+
+
+def list_all(limit, **kwargs):
+    """Read every page of the scheduled registry."""
+
+    jobs, cursor = [], None
+    while True:
+        page = asyncio.run(
+            registries.list_registry_async(
+                queue_name=QUEUE_NAME,
+                registry=registries.Registry.SCHEDULED,
+                cursor=cursor,
+                limit=limit,
+                **kwargs,
+            )
+        )
+        assert len(page.results) <= limit
+        jobs += page.results
+        if page.next_cursor is None:
+            return jobs
+        cursor = page.next_cursor
+
+
+def test_cursor():
+    cursor = registries.encode_cursor("1.5", "a:b")
+    assert registries.decode_cursor(cursor) == ("1.5", "a:b")
+
+    invalid_cursors = [
+        "not a cursor",
+        registries.encode_cursor("score", "a"),
+        *(registries.encode_cursor(score, "a") for score in ("nan", "inf", "-inf")),
+    ]
+    for invalid in invalid_cursors:
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            registries.decode_cursor(invalid)
+
+
+@pytest.mark.integration()
+@patch(
+    "backtick.registries.settings.BACKTICK_TASKS",
+    {"task_ok": f"{__name__}.task_ok"},
+)
+def test_list_scheduled(queue):
+    jobs = [
+        queue.enqueue_at(NOW + datetime.timedelta(seconds=i // 2), task_ok)
+        for i in range(5)
+    ]
+    other = queue.enqueue_at(NOW, task_other)
+    by_time = sorted(
+        [*jobs, other],
+        key=lambda job: (job is not other and jobs.index(job) // 2, job.id),
+    )
+
+    # Ties are ordered by id and never repeated or skipped across pages
+    listed = list_all(limit=2)
+    assert [job.task_id for job in listed] == [job.id for job in by_time]
+    assert listed[0].at == NOW
+    assert listed[0].status == "scheduled"
+
+    # Only the jobs of a task
+    listed = list_all(limit=2, task_name="task_ok")
+    assert [job.task_id for job in listed] == [
+        job.id for job in by_time if job is not other
+    ]
+    assert {job.task_name for job in listed} == {"task_ok"}
+
+    # Only the jobs of a time window
+    listed = list_all(
+        limit=10,
+        after=NOW + datetime.timedelta(seconds=1),
+        before=(NOW + datetime.timedelta(seconds=1)).replace(tzinfo=None),
+    )
+    assert sorted(job.task_id for job in listed) == sorted(job.id for job in jobs[2:4])
+
+
+@pytest.mark.integration()
+@patch("backtick.registries.settings.BACKTICK_SCHEDULER_SHARDS", 3)
+@patch("backtick.scheduler.settings.BACKTICK_SCHEDULER_SHARDS", 3)
+@patch("backtick.registries.settings.BACKTICK_SCHEDULER_BUCKET_SECONDS", 10)
+@patch("backtick.scheduler.settings.BACKTICK_SCHEDULER_BUCKET_SECONDS", 10)
+def test_list_sharded_scheduled(queue):
+    # Jobs of rq's registry and of every shard, across buckets, with ties
+    registry_jobs = [queue.enqueue_at(NOW, task_ok) for _ in range(3)]
+    sharded = {}
+    connection = queue.connection
+    with connection.pipeline() as pipeline:
+        for i in range(12):
+            job = queue.create_job(task_ok)
+            timestamp = NOW.timestamp() + (i % 4) * 5
+            pipeline.hset(job.key, mapping=job.to_dict())
+            scheduler.buffer_scheduled_job(pipeline, QUEUE_NAME, job.id, timestamp)
+            sharded[job.id] = timestamp
+        pipeline.execute()
+
+    expected = sorted(
+        [(NOW.timestamp(), job.id) for job in registry_jobs]
+        + [(timestamp, job_id) for job_id, timestamp in sharded.items()]
+    )
+    for limit in (1, 4, 100):
+        listed = list_all(limit=limit)
+        assert [(job.at.timestamp(), job.task_id) for job in listed] == expected
@@ -0,0 +1,196 @@
+import datetime
+import time
+from contextlib import ExitStack
+from unittest.mock import patch
+
+import prometheus_client
+import pytest
+import rq
+
+from backtick import dispatch, scheduler, task_registry, utils
+
+QUEUE_NAME = "backtick-test-sharded"
+
+
+@utils.task(QUEUE_NAME, "default")
+def task_ok():
+    return "result"
+
+
+@pytest.fixture()
+def sharded_settings(mock_settings):
+    mock_settings.BACKTICK_QUEUES = {"default": QUEUE_NAME}
+    mock_settings.BACKTICK_SCHEDULER_SHARDS = 4
+    mock_settings.BACKTICK_SCHEDULER_BUCKET_SECONDS = 60
+    mock_settings.BACKTICK_SCHEDULER_LEASE_TTL = 30
+    mock_settings.BACKTICK_SCHEDULER_INTERVAL = 1
+
+    with ExitStack() as stack:
+        stack.enter_context(patch("backtick.dispatch.settings", mock_settings))
+        stack.enter_context(patch("backtick.scheduler.settings", mock_settings))
+        yield mock_settings
+
+    connection = utils.get_redis()
+    keys = connection.keys(f"{scheduler.KEY_PREFIX}{QUEUE_NAME}*")
+    keys += connection.keys(f"{scheduler.LEASE_KEY_PREFIX}{QUEUE_NAME}*")
+    connection.delete(scheduler.SCHEDULERS_KEY, *keys)
+    rq.Queue(QUEUE_NAME, connection=connection).delete(delete_jobs=True)
+
+
+def test_buffer_scheduled_job(sharded_settings, mock_redis):
+    with patch("backtick.scheduler.shard_for", return_value=3):
+        scheduler.buffer_scheduled_job(mock_redis, "queue1", "job1", 1_000_030)
+
+    bucket = 1_000_030 // 60
+    assert mock_redis.zadd.call_args_list[0].args == (
+        f"backtick:scheduled:queue1:3:{bucket}",
+        {"job1": 1_000_030},
+    )
+    assert mock_redis.zadd.call_args_list[1].args == (
+        "backtick:scheduled:queue1:3",
+        {str(bucket): bucket * 60},
+    )
+    # The job is already due, so the schedulers are woken up
+    mock_redis.publish.assert_called_once_with(scheduler.WAKEUP_CHANNEL, str(1_000_030))
+
+
+def test_buffer_scheduled_job_later(sharded_settings, mock_redis):
+    timestamp = time.time() + 3600
+    scheduler.buffer_scheduled_job(mock_redis, "queue1", "job1", timestamp)
+
+    assert mock_redis.zadd.call_args_list[0].args[1] == {"job1": timestamp}
+    mock_redis.publish.assert_not_called()
+
+
+@pytest.mark.integration()
+def test_move_due_jobs(sharded_settings):
+    now = datetime.datetime.now(tz=datetime.timezone.utc)
+    past = [now - datetime.timedelta(minutes=i) for i in range(1, 4)]
+    future = [now + datetime.timedelta(hours=1)] * 2
+
+    connection = utils.get_redis()
+    queue = rq.Queue(QUEUE_NAME, connection=connection)
+    spec = task_registry.TaskSpec.from_func("task_ok", task_ok)
+    due_ids = dispatch.schedule_jobs_bulk(
+        queue=queue, spec=spec, datetimes=past, kwargs={}
+    )
+    future_ids = dispatch.schedule_jobs_bulk(
+        queue=queue, spec=spec, datetimes=future, kwargs={}
+    )
+
+    # The jobs are sharded instead of being added to rq's registry
+    assert queue.scheduled_job_registry.count == 0
+    assert list(scheduler.bucket_keys(connection, QUEUE_NAME))
+
+    # A cancelled job is dropped instead of being enqueued
+    rq.cancel_job(due_ids[0], connection=connection)
+
+    sharded_scheduler = scheduler.ShardedScheduler(connection=connection)
+    sharded_scheduler.balance_leases()
+    assert len(sharded_scheduler.leases) == 4
+
+    labels = {"queue": QUEUE_NAME}
+    observed = prometheus_client.REGISTRY.get_sample_value(
+        "backtick_scheduler_lateness_seconds_count", labels
+    )
+    assert sharded_scheduler.move_due_jobs() == 2
+    assert (
+        prometheus_client.REGISTRY.get_sample_value(
+            "backtick_scheduler_lateness_seconds_count", labels
+        )
+        == (observed or 0) + 2
+    )
+    assert sorted(queue.get_job_ids()) == sorted(due_ids[1:])
+    for job_id in due_ids[1:]:
+        job = rq.job.Job.fetch(job_id, connection)
+        assert job.get_status() == rq.job.JobStatus.QUEUED
+        assert job.enqueued_at is not None
+        lateness = scheduler.get_lateness(connection, job_id)
+        assert lateness is not None
+        assert lateness >= 60
+    assert len(sharded_scheduler.lateness) == 2
+
+    # The future jobs stay until they're due
+    assert sharded_scheduler.move_due_jobs() == 0
+    for job_id in future_ids:
+        job = rq.job.Job.fetch(job_id, connection)
+        assert job.get_status() == rq.job.JobStatus.SCHEDULED
+
+    sharded_scheduler.stop()
+
+
+@pytest.mark.integration()
+def test_balance_leases(sharded_settings):
+    connection = utils.get_redis()
+    scheduler_1 = scheduler.ShardedScheduler(connection=connection, name="s1")
+    scheduler_2 = scheduler.ShardedScheduler(connection=connection, name="s2")
+
+    scheduler_1.balance_leases()
+    assert len(scheduler_1.leases) == 4
+
+    # The second scheduler waits for the first one to give away its extra shards
+    scheduler_2.balance_leases()
+    assert scheduler_2.leases == set()
+    scheduler_1.balance_leases()
+    scheduler_2.balance_leases()
+    assert len(scheduler_1.leases) == len(scheduler_2.leases) == 2
+    assert scheduler_1.leases.isdisjoint(scheduler_2.leases)
+
+    # The shards of a stopped scheduler are taken over
+    scheduler_1.stop()
+    scheduler_2.balance_leases()
+    assert len(scheduler_2.leases) == 4
+
+    scheduler_2.stop()
+
+
+@pytest.mark.integration()
+def test_next_due_at(sharded_settings):
+    connection = utils.get_redis()
+    queue = rq.Queue(QUEUE_NAME, connection=connection)
+    spec = task_registry.TaskSpec.from_func("task_ok", task_ok)
+    sharded_scheduler = scheduler.ShardedScheduler(connection=connection)
+    sharded_scheduler.balance_leases()
+    assert sharded_scheduler.next_due_at() is None
+
+    # The sub-second part of the datetimes is kept
+    now = datetime.datetime.now(tz=datetime.timezone.utc)
+    datetimes = [
+        now + datetime.timedelta(seconds=10, milliseconds=250),
+        now + datetime.timedelta(minutes=5),
+    ]
+    dispatch.schedule_jobs_bulk(queue=queue, spec=spec, datetimes=datetimes, kwargs={})
+    assert sharded_scheduler.next_due_at() == pytest.approx(
+        datetimes[0].timestamp(), abs=1e-3
+    )
+
+    sharded_scheduler.stop()
+
+
+@pytest.mark.integration()
+def test_wait_wakeup(sharded_settings):
+    sharded_settings.BACKTICK_SCHEDULER_INTERVAL = 5
+
+    connection = utils.get_redis()
+    sharded_scheduler = scheduler.ShardedScheduler(connection=connection)
+    sharded_scheduler.balance_leases()
+    wakeup = connection.pubsub(ignore_subscribe_messages=True)
+    wakeup.subscribe(scheduler.WAKEUP_CHANNEL)
+    wakeup.get_message(timeout=1)
+
+    # Scheduling a job due sooner than the next pass cuts the wait short
+    with connection.pipeline() as pipeline:
+        scheduler.buffer_scheduled_job(pipeline, QUEUE_NAME, "job1", time.time() + 1.5)
+        pipeline.execute()
+
+    start = time.monotonic()
+    sharded_scheduler.wait(wakeup)
+    assert time.monotonic() - start < 0.5
+
+    # Without wakeups, the wait ends when the earliest job is due
+    start = time.monotonic()
+    sharded_scheduler.wait(wakeup)
+    assert 0.5 < time.monotonic() - start < 2
+
+    wakeup.close()
+    sharded_scheduler.stop()
@@ -0,0 +1,100 @@
+import pickle
+from unittest.mock import patch
+
+import pytest
+import rq
+from rq.serializers import DefaultSerializer
+
+from backtick import serializers, utils
+
+PAYLOAD = (
+    "backtick.tasks.make_request",
+    None,
+    (),
+    {"url": "https://example.com", "data": {"items": list(range(500))}},
+)
+
+
+@utils.task("backtick-test-serializers", serializer="compact")
+def task_compact(*, items):
+    return {"count": len(items)}
+
+
+@pytest.mark.parametrize("format", ["pickle", "json", "msgpack"])
+@pytest.mark.parametrize("compression", [None, "zlib", "zstd", "lz4"])
+def test_round_trip(format, compression):
+    serializer = serializers.CompactSerializer(format, compression)
+    data = serializer.dumps(PAYLOAD)
+
+    # Any serializer reads the payload, whatever it writes itself
+    for reader in (serializer, serializers.CompactSerializer()):
+        func_name, instance, args, kwargs = reader.loads(data)
+        assert (func_name, instance, list(args), kwargs) == (
+            PAYLOAD[0],
+            PAYLOAD[1],
+            [],
+            PAYLOAD[3],
+        )
+
+
+def test_compression_threshold():
+    serializer = serializers.CompactSerializer("json", "zlib", 64)
+
+    small = serializer.dumps({"a": 1})
+    assert small[:4] == serializers.MAGIC + bytes(
+        (serializers.FORMATS["json"], serializers.CODECS["none"])
+    )
+
+    large = serializer.dumps(PAYLOAD)
+    assert large[3] == serializers.CODECS["zlib"]
+    assert len(large) < len(serializers.CompactSerializer("json").dumps(PAYLOAD))
+
+
+def test_pickle_compatibility():
+    # The default serializer writes the same bytes as rq's and reads rq's payloads
+    serializer = serializers.CompactSerializer()
+    assert serializer.dumps(PAYLOAD) == DefaultSerializer.dumps(PAYLOAD)
+    assert serializer.loads(pickle.dumps(PAYLOAD)) == PAYLOAD
+
+
+def test_missing_package_fallback():
+    with patch("backtick.serializers.importlib.util.find_spec", return_value=None):
+        serializer = serializers.CompactSerializer("msgpack", "zstd")
+
+    assert serializer.format == "json"
+    assert serializer.compression == "zlib"
+
+    with pytest.raises(ValueError, match="Unknown serializer format"):
+        serializers.CompactSerializer("yaml")
+
+
+@pytest.mark.integration()
+def test_run_compact_job():
+    settings = {"compact": {"format": "json", "compression": "zlib"}}
+    connection = utils.get_redis()
+
+    with (
+        patch("backtick.utils.settings.BACKTICK_SERIALIZERS", settings),
+        patch.dict("backtick.utils._serializer_cache", clear=True),
+    ):
+        queue = rq.Queue(
+            "backtick-test-serializers",
+            connection=connection,
+            serializer=utils.get_serializer("compact"),
+        )
+        job = queue.enqueue(task_compact, kwargs={"items": list(range(2000))})
+
+        # A worker with the default serializer runs the job
+        worker = rq.SimpleWorker(
+            [queue], connection=connection, serializer=utils.get_serializer()
+        )
+        worker.work(burst=True)
+
+        job = rq.job.Job.fetch(
+            job.id, connection=connection, serializer=utils.get_serializer()
+        )
+        assert job.get_status() == rq.job.JobStatus.FINISHED
+        assert job.return_value() == {"count": 2000}
+        assert job.kwargs == {"items": list(range(2000))}
+
+        queue.delete(delete_jobs=True)
@@ -0,0 +1,103 @@
+from unittest.mock import patch
+
+import pytest
+import rq
+
+from backtick import task_registry, utils
+
+
+@utils.task("queue1", timeout=30, at_front=True)
+def task_kwargs(*, a: int, b: str = "b"):
+    pass
+
+
+@utils.task("queue1")
+def task_positional(a: int):
+    pass
+
+
+##########################################
+# Test TaskSpec
+##########################################
+
+
+def test_task_spec_from_func():
+    spec = task_registry.TaskSpec.from_func("task1", task_kwargs)
+
+    assert spec.name == "task1"
+    assert spec.func is task_kwargs
+    assert spec.queue == "queue1"
+    assert spec.queue_class == rq.Queue
+    assert spec.connection is None
+    assert spec.serializer is None
+    assert spec.get_queue().serializer is utils.get_serializer()
+    assert spec.required == {"a"}
+    assert spec.optional == {"b"}
+    assert spec.keyword_only is True
+    assert spec.enqueue_options["timeout"] == 30
+    assert spec.enqueue_options["at_front"] is True
+    assert set(spec.enqueue_options) == set(task_registry.ENQUEUE_OPTIONS)
+
+
+def test_task_spec_keyword_only():
+    spec = task_registry.TaskSpec.from_func("task1", task_positional)
+    assert spec.keyword_only is False
+
+
+def test_task_spec_check_kwargs():
+    spec = task_registry.TaskSpec.from_func("task1", task_kwargs)
+
+    assert spec.check_kwargs({"a": 1}) is True
+    assert spec.check_kwargs({"a": 1, "b": "c"}) is True
+    assert spec.check_kwargs({"b": "c"}) is False
+    assert spec.check_kwargs({"a": 1, "c": "d"}) is False
+
+
+##########################################
+# Test TaskRegistry
+##########################################
+
+
+def test_task_registry():
+    registry = task_registry.TaskRegistry(
+        {
+            "task1": "tests.test_task_registry.task_kwargs",
+            "task2": "tests.test_task_registry.invalid_func_name",
+        }
+    )
+
+    assert "task1" in registry
+    assert "task2" in registry
+    assert "task3" not in registry
+    assert [spec.name for spec in registry] == ["task1"]
+    assert registry.get("task1").func is task_kwargs
+
+    with pytest.raises(ValueError, match="Callable invalid_func_name not found"):
+        registry.get("task2")
+
+    with pytest.raises(KeyError):
+        registry.get("task3")
+
+
+@pytest.mark.usefixtures("_mock_task_registry")
+def test_get_registry_is_memoized(mock_settings):
+    with patch(
+        "backtick.task_registry.utils.discover_task", return_value=task_kwargs
+    ) as discover_task:
+        registry = task_registry.get_registry()
+        assert task_registry.get_registry() is registry
+        assert discover_task.call_count == len(mock_settings.BACKTICK_TASKS)
+
+
+@pytest.mark.usefixtures("_mock_task_registry")
+def test_reload_registry(mock_settings):
+    with patch("backtick.task_registry.utils.discover_task", return_value=task_kwargs):
+        registry = task_registry.get_registry()
+        assert "task3" not in registry
+
+        mock_settings.BACKTICK_TASKS["task3"] = "tests.test_task_registry.task_kwargs"
+        reloaded = task_registry.reload_registry()
+
+        assert reloaded is not registry
+        assert task_registry.get_registry() is reloaded
+        assert "task3" in reloaded
@@ -0,0 +1,167 @@
+import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+import rq
+from fastapi.testclient import TestClient
+
+from backtick import dto, notifications, tracing, utils, views, worker
+from backtick.async_worker import AsyncWorker
+
+TRACEPARENT = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+
+def task_ok():
+    return "result"
+
+
+async def async_task_ok():
+    return "result"
+
+
+@pytest.fixture()
+def exporter():
+    exporter = tracing.InMemoryExporter()
+    tracing.set_exporter(exporter)
+    yield exporter
+    tracing._cache.clear()
+
+
+@pytest.fixture()
+def queue():
+    queue = rq.Queue(
+        "backtick-test-tracing",
+        connection=utils.get_redis(),
+        job_class=notifications.NotifyingJob,
+    )
+    yield queue
+    queue.delete(delete_jobs=True)
+
+
+def spans_by_name(exporter):
+    return {span.name: span for span in exporter.spans}
+
+
+def test_disabled():
+    tracing.set_exporter(None)
+    try:
+        meta = {"key": "value"}
+        with tracing.span("operation") as span:
+            assert span is None
+            assert tracing.current_span() is None
+            assert tracing.inject(meta) is meta
+    finally:
+        tracing._cache.clear()
+
+
+def test_span(exporter):
+    def fail():
+        with tracing.span("child") as child:
+            assert tracing.current_span() is child
+            raise ValueError("fail")
+
+    with tracing.span("parent", key="value") as parent:
+        with pytest.raises(ValueError, match="fail"):
+            fail()
+        meta = tracing.inject({"key": "value"}, scheduled_at=datetime.datetime.now())
+
+    assert tracing.current_span() is None
+    assert [span.name for span in exporter.spans] == ["child", "parent"]
+    child = exporter.spans[0]
+    assert child.trace_id == parent.trace_id
+    assert child.parent_id == parent.span_id
+    assert child.error == "ValueError('fail')"
+    assert parent.parent_id is None
+    assert parent.attributes == {"key": "value"}
+    assert parent.duration >= child.duration > 0
+    assert meta["key"] == "value"
+    assert meta[tracing.TRACEPARENT] == parent.traceparent
+    assert tracing.SCHEDULED_AT in meta
+
+    # A trace context is continued, an invalid one starts a new trace
+    with tracing.span("remote", TRACEPARENT) as remote:
+        assert remote.trace_id == TRACEPARENT.split("-")[1]
+        assert remote.parent_id == TRACEPARENT.split("-")[2]
+    with tracing.span("invalid", "00-invalid") as invalid:
+        assert invalid.parent_id is None
+
+
+def test_exporter_error(exporter):
+    failing = MagicMock(spec=tracing.InMemoryExporter)
+    failing.export.side_effect = ConnectionError
+    tracing.set_exporter(failing)
+
+    with tracing.span("operation") as span:
+        pass
+
+    failing.export.assert_called_once_with([span])
+
+
+@patch(
+    "backtick.tracing.settings.BACKTICK_TRACING_EXPORTER",
+    "backtick.tracing.InMemoryExporter",
+)
+def test_get_exporter():
+    tracing._cache.clear()
+    try:
+        assert isinstance(tracing.get_exporter(), tracing.InMemoryExporter)
+    finally:
+        tracing._cache.clear()
+
+
+@pytest.mark.integration()
+@pytest.mark.parametrize(
+    ("worker_class", "func"),
+    [
+        (worker.Worker, task_ok),
+        (worker.SimpleWorker, task_ok),
+        (AsyncWorker, async_task_ok),
+    ],
+)
+def test_job_trace(exporter, queue, worker_class, func):
+    scheduled_at = datetime.datetime.now(tz=datetime.timezone.utc)
+    with tracing.span("schedule") as root:
+        job = queue.enqueue(func, meta=tracing.inject(None, scheduled_at))
+    exporter.clear()
+
+    worker_class(
+        [queue], connection=queue.connection, job_class=notifications.NotifyingJob
+    ).work(burst=True)
+
+    spans = spans_by_name(exporter)
+    assert set(spans) == {"job.promotion", "job.queued", "job.execute"}
+    for span in spans.values():
+        assert span.trace_id == root.trace_id
+        assert span.parent_id == root.span_id
+        assert span.end_ns >= span.start_ns
+    assert spans["job.execute"].attributes == {
+        "job.id": job.id,
+        "job.func_name": f"{__name__}.{func.__name__}",
+        "job.queue": queue.name,
+        "job.status": "finished",
+    }
+
+
+@patch(
+    "backtick.views.dispatch.cancel_tasks_async",
+    new=AsyncMock(
+        side_effect=lambda **_: dto.UnscheduleResponseDTO(
+            task_ids=[tracing.current_span().name], message="message"
+        )
+    ),
+)
+def test_request_trace(exporter, mock_settings):
+    with patch("backtick.dto.settings", mock_settings):
+        response = TestClient(views.app).post(
+            "/unschedule",
+            json={"task_ids": ["task1"], "enqueue_dependents": False},
+            headers={"traceparent": TRACEPARENT},
+        )
+
+    # The handler runs in the span of the request
+    assert response.json()["task_ids"] == ["HTTP POST"]
+    spans = spans_by_name(exporter)
+    root = spans["HTTP POST /unschedule"]
+    assert root.trace_id == TRACEPARENT.split("-")[1]
+    assert root.attributes["http.status_code"] == 200
+    assert spans["unschedule.validation"].parent_id == root.span_id
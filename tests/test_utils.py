@@ -1,5 +1,15 @@
+import asyncio
+import http.server
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+import httpx
 import pytest
 import redis
+import redis.asyncio
 import rq
 
 from backtick import utils
@@ -116,7 +126,85 @@ def test_check_func_kwargs_match_kwargs_with_no_kwargs():
 
 def test_get_redis():
     redis_conn_1 = utils.get_redis()
-    assert utils._cache["r"] == redis_conn_1
+    assert utils._cache["default"] == redis_conn_1
+    assert utils.get_redis("default") is redis_conn_1
+
+
+def test_get_redis_pool_options():
+    connections = {
+        "blocking": {
+            "url": "redis://localhost:6379/1",
+            "max_connections": 8,
+            "blocking": True,
+            "blocking_timeout": 3,
+            "socket_timeout": 10,
+            "health_check_interval": 15,
+        },
+        "plain": {"url": "redis://localhost:6379/2", "max_connections": 4},
+    }
+
+    with (
+        patch("backtick.utils.settings.BACKTICK_REDIS_CONNECTIONS", connections),
+        patch.dict("backtick.utils._cache", clear=True),
+    ):
+        pool = utils.get_redis("blocking").connection_pool
+        assert isinstance(pool, redis.BlockingConnectionPool)
+        assert pool.max_connections == 8
+        assert pool.timeout == 3
+        assert pool.connection_kwargs["db"] == 1
+        assert pool.connection_kwargs["socket_timeout"] == 10
+        assert pool.connection_kwargs["health_check_interval"] == 15
+
+        pool = utils.get_redis("plain").connection_pool
+        assert not isinstance(pool, redis.BlockingConnectionPool)
+        assert pool.max_connections == 4
+
+        with pytest.raises(KeyError):
+            utils.get_redis("unknown")
+
+
+def test_resolve_connection():
+    connection = redis.Redis()
+    assert utils.resolve_connection(connection) is connection
+    assert utils.resolve_connection("default") is utils.get_redis()
+    assert utils.resolve_connection(None) is utils.get_redis()
+
+
+def test_get_redis_after_fork():
+    redis_conn_1 = utils.get_redis()
+    http_client_1 = utils.get_http_client()
+
+    read_fd, write_fd = os.pipe()
+    if (pid := os.fork()) == 0:  # pragma: no cover
+        # The child must not reuse the pools of the parent
+        os.write(write_fd, b"1" if utils.get_redis() is not redis_conn_1 else b"0")
+        os.write(
+            write_fd, b"1" if utils.get_http_client() is not http_client_1 else b"0"
+        )
+        os._exit(0)
+
+    os.waitpid(pid, 0)
+    assert os.read(read_fd, 2) == b"11"
+    assert utils.get_redis() is redis_conn_1
+    assert utils.get_http_client() is http_client_1
+
+
+def test_get_async_redis():
+    async def get_clients():
+        return utils.get_async_redis(), utils.get_async_redis("default")
+
+    client_1, client_2 = asyncio.run(get_clients())
+    pool = client_1.connection_pool
+    sync_pool = utils.get_redis().connection_pool
+
+    assert client_1 is client_2
+    assert isinstance(pool, redis.asyncio.BlockingConnectionPool)
+    assert pool.max_connections == sync_pool.max_connections
+    assert pool.connection_kwargs == sync_pool.connection_kwargs
+
+    # Every event loop gets its own client
+    client_3, _ = asyncio.run(get_clients())
+    assert client_3 is not client_1
 
 
 ##########################################
@@ -124,6 +212,122 @@ def test_get_redis():
 ##########################################
 
 
+class SlowHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        time.sleep(0.2)
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def http_server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+HTTP_CLIENTS = {
+    "default": {
+        "http2": True,
+        "timeout": 5,
+        "max_connections": 8,
+        "max_keepalive_connections": 4,
+        "keepalive_expiry": 10,
+        "max_connections_per_host": 2,
+    },
+}
+
+
+def test_get_http_client():
+    with (
+        patch("backtick.utils.settings.BACKTICK_HTTP_CLIENTS", HTTP_CLIENTS),
+        patch.dict("backtick.utils._http_cache", clear=True),
+        patch("backtick.utils.importlib.util.find_spec", return_value=None),
+    ):
+        client = utils.get_http_client()
+        assert client is utils.get_http_client("default")
+        assert client.timeout == httpx.Timeout(5)
+
+        transport = client._transport
+        assert isinstance(transport, utils.HostLimitedTransport)
+        assert transport._max_connections_per_host == 2
+        assert transport._pool._max_connections == 8
+        assert transport._pool._max_keepalive_connections == 4
+        assert transport._pool._keepalive_expiry == 10
+
+        # HTTP/2 is skipped without the h2 package
+        assert transport._pool._http2 is False
+
+        with pytest.raises(KeyError):
+            utils.get_http_client("unknown")
+
+
+def test_get_http_client_per_host_limit(http_server):
+    with (
+        patch("backtick.utils.settings.BACKTICK_HTTP_CLIENTS", HTTP_CLIENTS),
+        patch.dict("backtick.utils._http_cache", clear=True),
+    ):
+        client = utils.get_http_client()
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(4) as executor:
+            responses = list(executor.map(client.get, [http_server] * 4))
+
+        # At most 2 of the 4 slow requests ran at the same time
+        assert time.perf_counter() - start >= 0.4
+        assert [r.text for r in responses] == ["ok"] * 4
+
+
+def test_get_async_http_client(http_server):
+    async def get_clients():
+        client = utils.get_async_http_client()
+        start = time.perf_counter()
+        responses = await asyncio.gather(*(client.get(http_server) for _ in range(4)))
+        elapsed = time.perf_counter() - start
+        return client, utils.get_async_http_client("default"), responses, elapsed
+
+    with patch("backtick.utils.settings.BACKTICK_HTTP_CLIENTS", HTTP_CLIENTS):
+        client_1, client_2, responses, elapsed = asyncio.run(get_clients())
+
+        assert client_1 is client_2
+        assert isinstance(client_1._transport, utils.AsyncHostLimitedTransport)
+        assert [r.text for r in responses] == ["ok"] * 4
+        assert elapsed >= 0.4
+
+        # Every event loop gets its own client
+        client_3, *_ = asyncio.run(get_clients())
+        assert client_3 is not client_1
+
+
+def test_get_serializer():
+    settings = {"compact": {"format": "json", "compression": "zlib"}}
+
+    with (
+        patch("backtick.utils.settings.BACKTICK_SERIALIZERS", settings),
+        patch.dict("backtick.utils._serializer_cache", clear=True),
+    ):
+        serializer = utils.get_serializer("compact")
+        assert serializer is utils.get_serializer("compact")
+        assert serializer.format == "json"
+        assert serializer.compression == "zlib"
+
+        # Without a name, the serializer writes rq's pickle format
+        assert utils.get_serializer().format == "pickle"
+
+        with pytest.raises(KeyError):
+            utils.get_serializer("unknown")
+
+
 def test_task():
     # Arrange
     expected_queue = "my_queue"
@@ -159,6 +363,7 @@ def test_task():
         retry=expected_retry,
         on_success=expected_on_success,
         on_failure=expected_on_failure,
+        serializer="compact",
     )
     def foo_task(*, x):
         return x * 2
@@ -178,6 +383,49 @@ def test_task():
     assert foo_task.on_success == expected_on_success
     assert foo_task.on_failure == expected_on_failure
     assert foo_task.queue_class == rq.Queue
+    assert foo_task.serializer == "compact"
+    assert foo_task.rate_limit is None
+    assert foo_task.rate_limit_burst == 1
+    assert foo_task.max_concurrency is None
+
+
+def test_task_rate_limit():
+    @utils.task(queue="my_queue", rate_limit="100/s", rate_limit_burst=20)
+    def foo_task():
+        pass
+
+    assert foo_task.rate_limit == "100/s"
+    assert foo_task.rate_limit_burst == 20
+
+    with pytest.raises(ValueError, match="Invalid rate limit"):
+        utils.task(queue="my_queue", rate_limit="100")
+    with pytest.raises(ValueError, match="burst must be at least 1"):
+        utils.task(queue="my_queue", rate_limit="100/s", rate_limit_burst=0)
+
+
+def test_task_max_concurrency():
+    @utils.task(queue="my_queue", max_concurrency=5)
+    def foo_task():
+        pass
+
+    assert foo_task.max_concurrency == 5
+
+    with pytest.raises(ValueError, match="max concurrency must be at least 1"):
+        utils.task(queue="my_queue", max_concurrency=0)
+
+
+@pytest.mark.parametrize(
+    ("rate", "expected"),
+    [("100/s", 100), ("6000/m", 100), ("1.5/h", 1.5 / 3600), (" 2/s ", 2)],
+)
+def test_parse_rate(rate, expected):
+    assert utils.parse_rate(rate) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("rate", ["100", "0/s", "-1/s", "100/d", "/s"])
+def test_parse_rate_invalid(rate):
+    with pytest.raises(ValueError, match="Invalid rate limit"):
+        utils.parse_rate(rate)
 
 
 ##########################################
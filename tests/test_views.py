@@ -1,22 +1,29 @@
 import datetime
 from http import HTTPStatus
-from unittest.mock import patch
+from unittest.mock import AsyncMock, patch
 
+import pytest
 from fastapi.testclient import TestClient
 
-from backtick import dto, views
+from backtick import dto, registries, settings, utils, views
 
 client = TestClient(views.app)
 
 
+@pytest.mark.usefixtures("_mock_task_registry")
 @patch(
-    "backtick.views.dispatch.submit_tasks",
-    new=lambda **kwargs: dto.ScheduleResponseDTO(
-        task_ids=["task1", "task2"],
-        message="message",
+    "backtick.views.dispatch.submit_tasks_async",
+    new=AsyncMock(
+        return_value=dto.ScheduleResponseDTO(
+            task_ids=["task1", "task2"],
+            message="message",
+        )
     ),
 )
-@patch("backtick.dto.utils.discover_task", new=lambda name: lambda: None)
+@patch(
+    "backtick.task_registry.utils.discover_task",
+    new=lambda name: utils.task("default")(lambda: None),
+)
 def test_schedule_ok(mock_settings):
     """Test schedule."""
 
@@ -39,10 +46,12 @@ def test_schedule_ok(mock_settings):
 
 
 @patch(
-    "backtick.views.dispatch.cancel_tasks",
-    new=lambda **kwargs: dto.UnscheduleResponseDTO(
-        task_ids=["task1", "task2"],
-        message="message",
+    "backtick.views.dispatch.cancel_tasks_async",
+    new=AsyncMock(
+        return_value=dto.UnscheduleResponseDTO(
+            task_ids=["task1", "task2"],
+            message="message",
+        )
     ),
 )
 def test_unschedule_ok(mock_settings):
@@ -57,3 +66,220 @@ def test_unschedule_ok(mock_settings):
         json_response = response.json()
         assert json_response["task_ids"] == ["task1", "task2"]
         assert json_response["message"] == "message"
+
+
+@patch(
+    "backtick.views.dispatch.cancel_tasks_bulk_async",
+    new=AsyncMock(
+        return_value=dto.BulkUnscheduleResponseDTO(
+            results=[
+                dto.UnscheduleItemDTO(task_id="task1", status="canceled"),
+                dto.UnscheduleItemDTO(task_id="task2", status="not_found"),
+            ],
+            message="1 of 2 tasks unscheduled",
+        )
+    ),
+)
+def test_unschedule_bulk_ok(mock_settings):
+    """Test bulk unschedule."""
+
+    with patch("backtick.dto.settings", mock_settings):
+        response = client.post(
+            "/unschedule/bulk",
+            json={"task_ids": ["task1", "task2"], "enqueue_dependents": False},
+        )
+        assert response.status_code == HTTPStatus.OK
+        json_response = response.json()
+        assert json_response["results"] == [
+            {"task_id": "task1", "status": "canceled"},
+            {"task_id": "task2", "status": "not_found"},
+        ]
+        assert json_response["message"] == "1 of 2 tasks unscheduled"
+
+
+@patch(
+    "backtick.views.dispatch.submit_tasks_batch_async",
+    new=AsyncMock(
+        return_value=dto.BatchScheduleResponseDTO(
+            results=[
+                dto.BatchScheduleItemDTO(task_ids=["task1"]),
+                dto.BatchScheduleItemDTO(error="Task task3 is not registered"),
+            ],
+            message="1 of 2 tasks scheduled",
+        )
+    ),
+)
+def test_schedule_batch_ok(mock_settings):
+    """Test schedule batch."""
+
+    with patch("backtick.dto.settings", mock_settings):
+        response = client.post(
+            "/schedule/batch",
+            json={
+                "requests": [
+                    {"task_name": "task1", "kwargs": {}},
+                    {"task_name": "task3", "kwargs": {}},
+                ]
+            },
+        )
+        assert response.status_code == HTTPStatus.OK
+        json_response = response.json()
+        assert json_response["results"] == [
+            {"task_ids": ["task1"], "error": None},
+            {"task_ids": [], "error": "Task task3 is not registered"},
+        ]
+        assert json_response["message"] == "1 of 2 tasks scheduled"
+
+
+def test_schedule_batch_too_large(mock_settings):
+    """Test schedule batch."""
+
+    with patch("backtick.dto.settings", mock_settings):
+        response = client.post(
+            "/schedule/batch",
+            json={"requests": [{"task_name": "task1"}] * 4},
+        )
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.usefixtures("_mock_task_registry")
+@patch(
+    "backtick.task_registry.utils.discover_task",
+    new=lambda name: utils.task("default")(lambda: None),
+)
+def test_schedule_idempotency_key_too_long(mock_settings):
+    """Test schedule with an invalid idempotency key."""
+
+    with patch("backtick.dto.settings", mock_settings):
+        response = client.post(
+            "/schedule",
+            json={"task_name": "task1", "kwargs": {}, "idempotency_key": "k" * 256},
+        )
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@patch(
+    "backtick.views.dispatch.get_task_statuses_async",
+    new=AsyncMock(
+        return_value=[
+            dto.TaskStatusDTO(task_id="task1", status="finished", result={"a": 1}),
+            dto.TaskStatusDTO(task_id="task2", status="not_found"),
+        ]
+    ),
+)
+def test_tasks_ok():
+    """Test tasks."""
+
+    response = client.get("/tasks", params={"task_ids": ["task1", "task2"]})
+    assert response.status_code == HTTPStatus.OK
+    results = response.json()["results"]
+    assert [result["status"] for result in results] == ["finished", "not_found"]
+    assert results[0]["result"] == {"a": 1}
+    assert response.headers["cache-control"].startswith("max-age=")
+
+    # The same statuses aren't sent again
+    etag = response.headers["etag"]
+    response = client.get(
+        "/tasks",
+        params={"task_ids": ["task1", "task2"]},
+        headers={"If-None-Match": etag},
+    )
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers["etag"] == etag
+    assert not response.content
+
+
+@patch(
+    "backtick.views.dispatch.get_task_statuses_async",
+    new=AsyncMock(return_value=[dto.TaskStatusDTO(task_id="a", status="not_found")]),
+)
+def test_task_not_found():
+    """Test task."""
+
+    response = client.get("/tasks/a")
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_tasks_too_many():
+    """Test tasks."""
+
+    task_ids = ["a"] * (settings.BACKTICK_STATUS_MAX_TASKS + 1)
+    response = client.get("/tasks", params={"task_ids": task_ids})
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+async def fake_stream(task_ids, queues):
+    yield '{"task_id": "a", "queue": "default", "status": "started"}'
+    yield None
+
+
+@patch("backtick.views.notifications.stream", new=fake_stream)
+def test_task_events():
+    """Test task events."""
+
+    response = client.get("/tasks/events", params={"task_ids": ["a"]})
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text == (
+        'data: {"task_id": "a", "queue": "default", "status": "started"}\n\n'
+        ": keep-alive\n\n"
+    )
+
+    response = client.get("/tasks/events")
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_registry_queue_not_found():
+    """Test registry."""
+
+    response = client.get("/queues/missing/registries/failed")
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_registry_invalid():
+    """Test registry."""
+
+    queue_name = next(iter(settings.BACKTICK_QUEUES.values()))
+    response = client.get(f"/queues/{queue_name}/registries/missing")
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+    for cursor in ("invalid", registries.encode_cursor("nan", "a")):
+        response = client.get(
+            f"/queues/{queue_name}/registries/failed", params={"cursor": cursor}
+        )
+        assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+        assert response.json()["title"] == "Unprocessable Entity"
+
+
+@patch(
+    "backtick.views.dispatch.requeue_failed_tasks_async",
+    new=AsyncMock(
+        return_value=dto.RequeueResponseDTO(task_ids=["a"], message="message")
+    ),
+)
+def test_requeue_ok():
+    """Test requeue."""
+
+    response = client.post("/requeue", json={"exception_types": ["ValueError"]})
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()["task_ids"] == ["a"]
+
+
+def test_requeue_not_ok():
+    """Test requeue."""
+
+    response = client.post("/requeue", json={"queues": ["missing"]})
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@patch("backtick.metrics.QueueCollector.collect", new=lambda self: iter(()))
+def test_metrics():
+    """Test metrics."""
+
+    client.get("/tasks/a")
+    response = client.get("/metrics")
+    assert response.status_code == HTTPStatus.OK
+    assert (
+        'backtick_http_request_duration_seconds_count{method="GET",'
+        'route="/tasks/{task_id}",status="404"}' in response.text
+    )
@@ -0,0 +1,86 @@
+import multiprocessing
+import signal
+import time
+from unittest.mock import patch
+
+import pytest
+
+from backtick import utils, worker
+
+started = multiprocessing.get_context("fork").SimpleQueue()
+
+
+def _exit_worker(queue_names, with_scheduler, no_fork, async_jobs, serializer):
+    started.put(with_scheduler)
+
+
+def _idle_worker(queue_names, with_scheduler, no_fork, async_jobs, serializer):
+    time.sleep(30)
+
+
+@patch("backtick.worker.run_worker", new=_exit_worker)
+def test_supervisor_restarts_workers():
+    supervisor = worker.WorkerSupervisor(3, ["default"], with_scheduler=True)
+    supervisor.check_workers()
+
+    processes = dict(supervisor._processes)
+    assert len(processes) == 3
+
+    for process in processes.values():
+        process.join(5)
+
+    # Only the first worker runs the scheduler
+    assert sorted(started.get() for _ in range(3)) == [False, False, True]
+
+    # The exited workers are replaced, keeping the scheduler on the first slot
+    supervisor.check_workers()
+    assert all(supervisor._processes[slot] is not processes[slot] for slot in range(3))
+
+    supervisor.stopping = True
+    supervisor.stop()
+    assert sorted(started.get() for _ in range(3)) == [False, False, True]
+
+
+@patch("backtick.worker.run_worker", new=_idle_worker)
+def test_supervisor_stops_workers():
+    supervisor = worker.WorkerSupervisor(2, ["default"], with_scheduler=False)
+    supervisor.check_workers()
+    processes = list(supervisor._processes.values())
+    assert all(p.is_alive() for p in processes)
+
+    supervisor.request_stop(signal.SIGTERM, None)
+    supervisor.stop(timeout=5)
+
+    assert not any(p.is_alive() for p in processes)
+    assert [p.exitcode for p in processes] == [-signal.SIGTERM, -signal.SIGTERM]
+
+    # No worker is restarted once stopping
+    supervisor.check_workers()
+    assert supervisor._processes == {}
+
+
+@pytest.mark.parametrize(
+    ("no_fork", "async_jobs", "worker_class"),
+    [
+        (False, None, "backtick.worker.Worker"),
+        (True, None, "backtick.worker.SimpleWorker"),
+        (False, 10, "backtick.worker.AsyncWorker"),
+    ],
+)
+def test_run_worker(no_fork, async_jobs, worker_class):
+    with patch(worker_class) as mock_worker:
+        worker.run_worker(
+            ["default"], with_scheduler=True, no_fork=no_fork, async_jobs=async_jobs
+        )
+        mock_worker.return_value.work.assert_called_once_with(with_scheduler=True)
+        assert mock_worker.call_args.kwargs["serializer"] is utils.get_serializer()
+
+
+@pytest.mark.usefixtures("_mock_task_registry")
+def test_preload_tasks():
+    with patch(
+        "backtick.task_registry.utils.discover_task",
+        return_value=utils.task("default")(lambda: None),
+    ) as mock_discover_task:
+        worker.preload_tasks()
+        assert mock_discover_task.call_count == 2